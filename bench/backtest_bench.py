@@ -0,0 +1,54 @@
+"""Timings for src/signals/backtest.py on 10-year daily histories.
+
+    python -m bench.backtest_bench [--symbols 500] [--bars 2520] [--loop 2]
+
+The per-day baseline runs compute_signals on every prefix of --loop histories (what running the
+digest on each day would cost) and is scaled to the universe. Equivalence with compute_signals is
+checked on small inputs by bench/check_backtest.py.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from bench.check_backtest import per_day_signals, random_history
+from src.signals.backtest import backtest
+from src.signals.scoring import signal_params
+from src.utils.config import load_yaml
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--symbols", type=int, default=500)
+    ap.add_argument("--bars", type=int, default=2520)  # ~10 years of sessions
+    ap.add_argument("--loop", type=int, default=2, help="symbols timed day by day with compute_signals")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    params = signal_params(load_yaml("configs/settings.yml")["thresholds"])
+    rng = np.random.default_rng(args.seed)
+    histories = [random_history(rng, f"S{i:04d}", args.bars) for i in range(args.symbols)]
+
+    t0 = time.perf_counter()
+    for hist in histories[: args.loop]:
+        per_day_signals(hist, params)
+    t_loop = (time.perf_counter() - t0) / max(1, args.loop)
+
+    t0 = time.perf_counter()
+    result = backtest(histories, params)
+    t_bt = time.perf_counter() - t0
+    print(f"backtest: {args.symbols} symbols x {args.bars} bars in {t_bt:.2f}s, {len(result)} transitions")
+    print(f"compute_signals per day: {t_loop:.2f}s per symbol -> ~{t_loop * args.symbols:.0f}s for the universe "
+          f"({t_loop * args.symbols / t_bt:.0f}x)")
+    print(f"  {'baseline':>16s} {'':6s}  20d {result.baseline[20]:+.2%}")
+    for row in result.summary():
+        print(f"  {row['transition']:>16s} {row['events']:6d}  20d {row['ret_20d']:+.2%}  dd {row['dd_20d']:.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Equivalence check for src/signals/backtest.py on small inputs (runs in CI, a few seconds).
+
+    python -m bench.check_backtest
+
+compute_signals is called on every prefix of a few short histories (what running the digest
+on each of those days would have said). The backtest must agree on every day's level, and
+on every transition's day, levels, reason, close and forward return / drawdown. Histories of different
+lengths (one too short to score) share chunks, so the padded panel path is covered too.
+A 10-year history with 80-session flat stretches checks that window sums keep their
+precision late in a long series (close == MA exactly, zero MA slope). Both the configured
+thresholds and a looser set are checked. Exits non-zero on any
+disagreement. Timings live in bench/backtest_bench.py.
+"""
+from __future__ import annotations
+
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.market import PriceHistory
+from src.signals.backtest import LEVEL_NONE, MIN_BARS, backtest, signal_levels
+from src.signals.panel import LEVEL_NAMES
+from src.signals.scoring import compute_signals, signal_params
+from src.utils.config import load_yaml
+
+LENGTHS = (MIN_BARS - 1, MIN_BARS, 75, 140, 260)
+LONG_BARS = 2520
+FLAT_STARTS = (580, 1400, 2300)
+FLAT_BARS = 80
+HORIZONS = (5, 20)
+
+
+def random_history(rng: np.random.Generator, symbol: str, bars: int) -> PriceHistory:
+    # Regime changes so every transition kind shows up
+    drift = np.repeat(rng.normal(0.0, 0.004, bars // 60 + 1), 60)[:bars]
+    c = np.cumprod(1 + drift + rng.normal(0.0003, 0.02, bars)) * rng.uniform(2, 300)
+    hl = c * rng.uniform(0.002, 0.05, bars) * np.where(rng.random(bars) < 0.03, 4.0, 1.0)
+    t = np.busday_offset(np.datetime64("2010-01-04"), np.arange(bars)).astype("datetime64[D]").astype(np.int64)
+    return PriceHistory(symbol, t, c, c + hl / 2, c - hl / 2, c, np.full(bars, 1e6))
+
+
+def flat_history(rng: np.random.Generator, symbol: str) -> PriceHistory:
+    """A long random walk whose close stands still for FLAT_BARS sessions at FLAT_STARTS."""
+    hist = random_history(rng, symbol, LONG_BARS)
+    c = hist.c.copy()
+    for start in FLAT_STARTS:
+        c[start: start + FLAT_BARS] = c[start - 1]
+    return PriceHistory(symbol, hist.t, c, np.maximum(hist.h, c), np.minimum(hist.l, c), c, hist.v)
+
+
+def per_day_signals(hist: PriceHistory, params: dict) -> Tuple[np.ndarray, Dict[int, str]]:
+    """(level per bar, {epoch day: reason}) from compute_signals on every prefix."""
+    df = hist.to_frame()
+    levels = np.full(len(hist), LEVEL_NONE)
+    reasons: Dict[int, str] = {}
+    for i in range(MIN_BARS - 1, len(hist)):
+        sig = compute_signals(hist.symbol, df.iloc[: i + 1], **params)
+        levels[i] = LEVEL_NAMES.index(sig.risk_level)
+        reasons[int(hist.t[i])] = sig.reason
+    return levels, reasons
+
+
+def check(histories: List[PriceHistory], params: dict, chunk: int = 256) -> Tuple[List[str], int]:
+    """(errors, transitions checked)."""
+    errors: List[str] = []
+    result = backtest(histories, params, horizons=HORIZONS, chunk=chunk)
+    events = {(s, int(d)): k for k, (s, d) in enumerate(zip(result.symbol, result.day))}
+    seen = 0
+    for hist in histories:
+        want, reasons = per_day_signals(hist, params)
+        levels, _ = signal_levels(hist.c, hist.h, hist.l, params)
+        bad = int((levels != want).sum())
+        if bad:
+            errors.append(f"{hist.symbol}: {bad} of {len(hist)} days differ from compute_signals")
+        for i in range(1, len(hist)):
+            if want[i - 1] == LEVEL_NONE or want[i] == want[i - 1]:
+                continue
+            seen += 1
+            day = int(hist.t[i])
+            when = f"{hist.symbol} {pd.Timestamp(day, unit='D').date()}"
+            k = events.pop((hist.symbol, day), None)
+            if k is None:
+                errors.append(f"{when}: missing {LEVEL_NAMES[want[i - 1]]}->{LEVEL_NAMES[want[i]]}")
+                continue
+            if (result.prev[k], result.level[k]) != (want[i - 1], want[i]):
+                errors.append(f"{when}: transition {result.prev[k]}->{result.level[k]}, want {want[i - 1]}->{want[i]}")
+            if result.reason[k] != reasons[day] or result.close[k] != hist.c[i]:
+                errors.append(f"{when}: reason or close differs")
+            for j, hz in enumerate(HORIZONS):
+                ret, dd = np.nan, np.nan
+                if i + hz < len(hist):
+                    ret = hist.c[i + hz] / hist.c[i] - 1.0
+                    dd = min(hist.c[i + 1: i + hz + 1].min() / hist.c[i] - 1.0, 0.0)
+                if not np.allclose(result.fwd_return[k, j], ret, rtol=1e-12, equal_nan=True):
+                    errors.append(f"{when}: {hz}-bar return {result.fwd_return[k, j]}, want {ret}")
+                if not np.allclose(result.fwd_drawdown[k, j], dd, rtol=1e-12, equal_nan=True):
+                    errors.append(f"{when}: {hz}-bar drawdown {result.fwd_drawdown[k, j]}, want {dd}")
+    errors += [f"{s} {pd.Timestamp(d, unit='D').date()}: unexpected transition" for s, d in events]
+    return errors, seen
+
+
+def main() -> int:
+    configured = signal_params(load_yaml("configs/settings.yml")["thresholds"])
+    loose = dict(configured, drawdown_warn_pct=0.05, drawdown_critical_pct=0.12,
+                 require_conditions_for_warn=1, vol_spike_is_info_only=False)
+    rng = np.random.default_rng(5)
+    histories = [random_history(rng, f"S{i}", n) for i, n in enumerate(LENGTHS)]
+    flat = flat_history(rng, "FLAT")
+    errors: List[str] = []
+    seen = 0
+    for name, params in (("configured", configured), ("loose", loose)):
+        for batch, chunk in ((histories, 3), ([flat], 256)):
+            errs, n = check(batch, params, chunk=chunk)
+            errors += [f"{name}: {e}" for e in errs]
+            seen += n
+    if seen < 10:
+        errors.append(f"only {seen} transitions: the fixtures no longer exercise the rules")
+    for e in errors[:20]:
+        print(f"MISMATCH {e}")
+    print("backtest: " + ("FAILED" if errors else "ok") + f" ({len(LENGTHS) + 1} histories, {seen} transitions)")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
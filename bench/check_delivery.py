@@ -0,0 +1,188 @@
+"""Delivery check: digests sent to the local SendGrid stand-in (runs in CI, ~10s).
+
+    python -m bench.check_delivery
+
+1. send_digests() alone: identical digests share one request with one personalization per
+   address, distinct digests get their own, and batches split at MAX_PERSONALIZATIONS.
+2. A full run (`python -m src.app`, not a dry run) for three recipients against the
+   stand-ins: two with the same lists and thresholds, one with its own lists and a
+   drawdown_critical_pct of 0 (every scored symbol CRITICAL). Each mailed digest must hold
+   that recipient's own rows (bucket_rows) and research cards (research_for).
+Exits non-zero on any failure.
+"""
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from html import unescape
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+from bench.e2e_bench import REPO, make_workdir
+from bench.standins import StandIns, universe
+from src.notify import sendgrid_email
+from src.render.email_template import STYLES
+
+FROM_EMAIL = "digest@example.com"
+
+# Two recipients with identical digests, one of their own
+SHARED = {"conviction": ["AMZN", "GOOGL"], "risky_watchlist": ["TSLA", "NVDA", "META", "COIN", "MRNA"]}
+RECIPIENTS = [
+    {"email": "ann@example.com", "watchlists": SHARED},
+    {"email": "ben@example.com", "watchlists": SHARED},
+    {
+        "email": "cat@example.com",
+        "watchlists": {"conviction": ["AMD"], "risky_watchlist": ["TSLA", "PLTR"]},
+        "thresholds": {"drawdown_critical_pct": 0.0},
+    },
+]
+
+
+def _to(message: Dict[str, Any]) -> List[List[str]]:
+    # Addresses per personalization, sorted (the SDK prepends each new personalization)
+    return sorted([t["email"] for t in p.get("to", [])] for p in message.get("personalizations", []))
+
+
+def _html(message: Dict[str, Any]) -> str:
+    return next((c["value"] for c in message.get("content", []) if c.get("type") == "text/html"), "")
+
+
+def _subject(message: Dict[str, Any]) -> str:
+    subjects = {p.get("subject") for p in message.get("personalizations", [])} | {message.get("subject")}
+    subjects.discard(None)
+    return subjects.pop() if len(subjects) == 1 else ""
+
+
+def check_grouping(standins: StandIns) -> List[str]:
+    errors: List[str] = []
+    digests = [
+        ("a@example.com", "S1", "<p>one</p>"),
+        ("b@example.com", "S2", "<p>two</p>"),
+        ("c@example.com", "S1", "<p>one</p>"),
+        ("d@example.com", "S1", "<p>one, but not quite</p>"),
+    ]
+    standins.reset_counts()
+    made = sendgrid_email.send_digests(digests)
+    got = sorted((_subject(m), _html(m), _to(m)) for m in standins.mail)
+    want = sorted([
+        ("S1", "<p>one</p>", [["a@example.com"], ["c@example.com"]]),
+        ("S2", "<p>two</p>", [["b@example.com"]]),
+        ("S1", "<p>one, but not quite</p>", [["d@example.com"]]),
+    ])
+    if made != 3 or got != want:
+        errors.append(f"grouping: {made} requests, got {got}")
+    if any(m.get("from", {}).get("email") != FROM_EMAIL for m in standins.mail):
+        errors.append("grouping: wrong from address")
+
+    standins.reset_counts()
+    limit = sendgrid_email.MAX_PERSONALIZATIONS
+    sendgrid_email.MAX_PERSONALIZATIONS = 2
+    try:
+        made = sendgrid_email.send_digests([(f"r{i}@example.com", "S", "<p>x</p>") for i in range(5)])
+    finally:
+        sendgrid_email.MAX_PERSONALIZATIONS = limit
+    sizes = [len(_to(m)) for m in standins.mail]
+    addresses = sorted(a for m in standins.mail for p in _to(m) for a in p)
+    if made != 3 or sizes != [2, 2, 1] or addresses != [f"r{i}@example.com" for i in range(5)]:
+        errors.append(f"split: {made} requests of {sizes} personalizations")
+    return errors
+
+
+def _sections(html: str) -> Dict[str, str]:
+    # Section heading -> its HTML, up to the next heading
+    parts = re.split(r"<h3[^>]*>(.*?)</h3>", html)
+    return {unescape(parts[i]): parts[i + 1] for i in range(1, len(parts) - 1, 2)}
+
+
+def _rows(section: str) -> Dict[str, str]:
+    # {symbol: risk} from a risk table (Symbol, Close, Risk, Summary)
+    out = {}
+    for tr in re.findall(r"<tbody>.*?</tbody>", section, re.S)[:1]:
+        for row in re.findall(r"<tr>(.*?)</tr>", tr, re.S):
+            cells = [unescape(c) for c in re.findall(r"<td[^>]*>(.*?)</td>", row, re.S)]
+            out[cells[0]] = cells[2]
+    return out
+
+
+def _cards(section: str) -> List[str]:
+    return [unescape(s) for s in re.findall(rf"<div style='{re.escape(STYLES['s_sym'])}'>(.*?)</div>", section)]
+
+
+def check_digest(r: Dict[str, Any], html: str) -> List[str]:
+    errors: List[str] = []
+    who = r["email"]
+    wl = r["watchlists"]
+    sec = _sections(html)
+    holdings = _rows(sec.get("Your holdings", ""))
+    risky = _rows(sec.get("Risky watchlist", ""))
+    if list(holdings) != wl["conviction"]:
+        errors.append(f"{who}: holdings rows {list(holdings)}, want {wl['conviction']}")
+    if list(risky) != wl["risky_watchlist"]:
+        errors.append(f"{who}: risky rows {list(risky)}, want {wl['risky_watchlist']}")
+    if r.get("thresholds", {}).get("drawdown_critical_pct") == 0.0 and set(risky.values()) != {"CRITICAL"}:
+        errors.append(f"{who}: own thresholds not applied, risky levels {risky}")
+    flagged = [s for s, risk in risky.items() if risk in ("WARN", "CRITICAL")]
+    want = list(dict.fromkeys(wl["conviction"] + flagged))
+    cards = _cards(sec.get("Research pack (fundamentals + links + news)", ""))
+    if cards != want:
+        errors.append(f"{who}: research cards {cards}, want {want}")
+    return errors
+
+
+def check_run(standins: StandIns, root: Path) -> List[str]:
+    wd = make_workdir(root, 40, 6000.0)
+    with open(wd / "configs" / "recipients.yml", "w", encoding="utf-8") as f:
+        yaml.safe_dump({"recipients": RECIPIENTS}, f, sort_keys=False)
+    env = dict(os.environ)
+    env.pop("DRY_RUN", None)
+    env.update(standins.env())
+    env.update({
+        "FINNHUB_API_KEY": "check",
+        "SENDGRID_API_KEY": "check",
+        "FROM_EMAIL": FROM_EMAIL,
+        "PYTHONPATH": os.pathsep.join([str(REPO), env.get("PYTHONPATH", "")]).rstrip(os.pathsep),
+    })
+    standins.reset_counts()
+    proc = subprocess.run([sys.executable, "-m", "src.app"], cwd=wd, env=env, capture_output=True, text=True, timeout=300)
+    if proc.returncode != 0:
+        return [f"run: exit {proc.returncode}\n{proc.stdout[-2000:]}{proc.stderr[-2000:]}"]
+
+    errors: List[str] = []
+    by_address = {a: m for m in standins.mail for p in _to(m) for a in p}
+    groups = sorted(sorted(a for p in _to(m) for a in p) for m in standins.mail)
+    if groups != [["ann@example.com", "ben@example.com"], ["cat@example.com"]]:
+        errors.append(f"run: requests went to {groups}")
+    if any(len(p) != 1 for m in standins.mail for p in _to(m)):
+        errors.append("run: a personalization has more than one address")
+    for r in RECIPIENTS:
+        message = by_address.get(r["email"])
+        if message is None:
+            errors.append(f"run: nothing sent to {r['email']}")
+            continue
+        errors += check_digest(r, _html(message))
+    return errors
+
+
+def main() -> int:
+    root = Path(tempfile.mkdtemp(prefix="stockshark-check-"))
+    try:
+        with StandIns(universe(40)) as standins:
+            os.environ.update({"SENDGRID_HOST": standins.env()["SENDGRID_HOST"], "SENDGRID_API_KEY": "check", "FROM_EMAIL": FROM_EMAIL})
+            errors = check_grouping(standins)
+            errors += check_run(standins, root)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    for e in errors:
+        print(f"FAIL {e}")
+    print("delivery: " + ("FAILED" if errors else "ok") + f" ({len(RECIPIENTS)} recipients)")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Equivalence check for src/signals/kernels.py on small inputs (runs in CI, a few seconds).
+
+    python -m bench.check_kernels
+
+Each kernel is compared against the batch indicator in src/signals/indicators.py evaluated
+on every prefix of the series, for series shorter and longer than the windows, and for a
+2D panel whose columns start trading on different days (leading NaN padding).
+Exits non-zero if any kernel disagrees. Timings live in bench/kernels_bench.py.
+"""
+from __future__ import annotations
+
+import sys
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.signals import kernels
+from src.signals.indicators import drawdown_from_recent_high, sma, slope
+
+# Series lengths around the windows below (10, 20, 50); in the panel they end on the same
+# row, so every shorter series gets a different amount of leading padding
+LENGTHS = (3, 9, 20, 49, 50, 51, 180)
+
+
+def random_series(rng: np.random.Generator, bars: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    c = np.cumprod(1 + rng.normal(0.0003, 0.02, bars)) * rng.uniform(2, 300)
+    hl = c * rng.uniform(0.002, 0.05, bars)
+    return c, c + hl / 2, c - hl / 2
+
+
+def loop_range_ratio(h: np.ndarray, lo: np.ndarray, window: int = 20, min_periods: int = 10) -> np.ndarray:
+    rng = np.abs(h - lo)
+    out = np.full(len(rng), np.nan)
+    for i in range(len(rng)):
+        r = rng[max(0, i - window + 1): i + 1]
+        if len(r) >= min_periods and r.mean() > 0:
+            out[i] = r[-1] / r.mean()
+    return out
+
+
+def _differ(got: np.ndarray, want: np.ndarray, rtol: float = 1e-9, atol: float = 1e-9) -> int:
+    return int(np.sum(~np.isclose(got, want, rtol=rtol, atol=atol, equal_nan=True)))
+
+
+def check_equivalence(c: np.ndarray, h: np.ndarray, lo: np.ndarray) -> List[str]:
+    s = pd.Series(c)
+    errors: List[str] = []
+
+    def close(name: str, got: np.ndarray, want: np.ndarray, rtol: float = 1e-9, atol: float = 1e-9) -> None:
+        bad = _differ(got, want, rtol, atol)
+        if bad:
+            errors.append(f"{name}: {bad} bars differ")
+
+    close("rolling_sma(50)", kernels.rolling_sma(c, 50), sma(s, 50).to_numpy())
+    close("rolling_slope(10)", kernels.rolling_slope(c, 10),
+          np.array([slope(s.iloc[: i + 1], 10) for i in range(len(s))]), rtol=1e-7, atol=1e-8)
+    close("rolling_drawdown(20)", kernels.rolling_drawdown(c, 20),
+          np.array([drawdown_from_recent_high(s.iloc[: i + 1], 20) for i in range(len(s))]))
+    close("rolling_range_ratio(20)", kernels.rolling_range_ratio(h, lo, 20), loop_range_ratio(h, lo, 20))
+    mom = np.full(len(c), np.nan)
+    mom[20:] = c[20:] / c[:-20] - 1.0
+    close("momentum(20)", kernels.momentum(c, 20), mom)
+    return errors
+
+
+def check_panel(columns: List[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> List[str]:
+    """A padded column of a 2D call must equal the 1D call on its own (shorter) series."""
+    n = max(len(c) for c, _, _ in columns)
+    panel = [np.full((n, len(columns)), np.nan) for _ in range(3)]
+    for j, series in enumerate(columns):
+        for k, x in enumerate(series):
+            panel[k][n - len(x):, j] = x
+    pc, ph, pl = panel
+    cases = {
+        "rolling_sma(50)": (lambda c, h, lo: kernels.rolling_sma(c, 50)),
+        "rolling_slope(10)": (lambda c, h, lo: kernels.rolling_slope(c, 10)),
+        "rolling_drawdown(20)": (lambda c, h, lo: kernels.rolling_drawdown(c, 20)),
+        "rolling_range_ratio(20)": (lambda c, h, lo: kernels.rolling_range_ratio(h, lo, 20)),
+        "momentum(20)": (lambda c, h, lo: kernels.momentum(c, 20)),
+    }
+    errors: List[str] = []
+    for name, fn in cases.items():
+        got = fn(pc, ph, pl)
+        for j, (c, h, lo) in enumerate(columns):
+            bad = _differ(got[n - len(c):, j], fn(c, h, lo))
+            if bad:
+                errors.append(f"{name} panel column {j} ({len(c)} bars): {bad} bars differ")
+    return errors
+
+
+def main() -> int:
+    rng = np.random.default_rng(11)
+    errors: List[str] = []
+    columns = []
+    for bars in LENGTHS:
+        c, h, lo = random_series(rng, bars)
+        errors += [f"{bars} bars: {e}" for e in check_equivalence(c, h, lo)]
+        columns.append((c, h, lo))
+    errors += check_panel(columns)
+    for e in errors:
+        print(f"MISMATCH {e}")
+    print("kernels: " + ("FAILED" if errors else "ok") + f" ({len(LENGTHS)} series, 1D and panel)")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
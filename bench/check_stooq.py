@@ -0,0 +1,222 @@
+"""Fixture check for src/data/stooq.py: response parsing and bulk ingest (runs in CI, ~1s).
+
+    python -m bench.check_stooq
+
+Covers the "No data" reply, the rate-limit page, duplicate / unsorted / close-less rows,
+the bulk files' <DATE> conversion, iter_bulk's member selection and ingest_bulk's
+since/checked bookkeeping against a small archive written here. StooqClient.download fetches
+that archive from a local server sending it plain, gzip- and deflate-encoded, and must save the
+zip itself each time. Exits non-zero on any failure.
+"""
+from __future__ import annotations
+
+import gzip
+import sys
+import tempfile
+import threading
+import zipfile
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from src.data.price_store import PriceStore, merge_arrays, to_epoch_day
+from src.data.stooq import StooqClient, StooqError, days_from_civil, ingest_bulk, iter_bulk, parse_bulk_txt, parse_daily_csv
+
+BULK_HEADER = "<TICKER>,<PER>,<DATE>,<TIME>,<OPEN>,<HIGH>,<LOW>,<CLOSE>,<VOL>,<OPENINT>"
+
+
+def _days(*isodates: str) -> List[int]:
+    return [to_epoch_day(date.fromisoformat(d)) for d in isodates]
+
+
+def check_daily_csv() -> List[str]:
+    errors: List[str] = []
+    for body in (b"No data", b"No data\r\n", b"", b"  \n"):
+        if len(parse_daily_csv(body)):
+            errors.append(f"{body!r}: expected no bars")
+    try:
+        parse_daily_csv(b"<html><body>Exceeded the daily hits limit</body></html>")
+        errors.append("rate-limit page: no StooqError")
+    except StooqError as e:
+        if "Exceeded the daily hits limit" not in str(e):
+            errors.append(f"rate-limit page: error {e!r} does not carry the page text")
+
+    # Out of order, 2024-01-03 twice (the later row wins), one row without a close
+    bars = parse_daily_csv(
+        b"Date,Open,High,Low,Close,Volume\n"
+        b"2024-01-04,4,4.5,3.5,4.2,400\n"
+        b"2024-01-02,2,2.5,1.5,2.2,200\n"
+        b"2024-01-03,3,3.5,2.5,3.2,300\n"
+        b"2024-01-05,5,5.5,4.5,,500\n"
+        b"2024-01-03,3,3.6,2.6,3.3,310\n"
+    )
+    if bars.t.tolist() != _days("2024-01-02", "2024-01-03", "2024-01-04"):
+        errors.append(f"daily csv days: {bars.t.tolist()}")
+    if bars.c.tolist() != [2.2, 3.3, 4.2] or bars.v.tolist() != [200, 310, 400]:
+        errors.append(f"daily csv values: c={bars.c.tolist()} v={bars.v.tolist()}")
+    if bars.t.dtype != np.int64 or bars.c.dtype != np.float64:
+        errors.append(f"daily csv dtypes: {bars.t.dtype}, {bars.c.dtype}")
+
+    # Indices come without a Volume column
+    bars = parse_daily_csv(b"Date,Open,High,Low,Close\n2024-01-02,1,2,0.5,1.5\n")
+    if len(bars) != 1 or not np.isnan(bars.v).all():
+        errors.append(f"no-volume csv: v={bars.v.tolist()}")
+    return errors
+
+
+def check_bulk_dates() -> List[str]:
+    errors: List[str] = []
+    # Every day across leap years, the 1900/2000 century rules and the epoch
+    days = np.arange(np.datetime64("1899-12-25"), np.datetime64("2030-01-10"), dtype="datetime64[D]")
+    ymd = np.char.replace(days.astype(str), "-", "").astype(np.int64)
+    got = days_from_civil(ymd)
+    want = days.astype(np.int64)
+    if not np.array_equal(got, want):
+        bad = int(np.argmax(got != want))
+        errors.append(f"days_from_civil({ymd[bad]}) = {got[bad]}, want {want[bad]}")
+
+    bars = parse_bulk_txt((
+        f"{BULK_HEADER}\n"
+        "AAA.US,D,20240229,000000,1,2,0.5,1.5,1000,0\n"
+        "AAA.US,D,20240227,000000,1,2,0.5,1.2,900,0\n"
+        "AAA.US,D,20240301,000000,1,2,0.5,1.7,1100,0\n"
+        "AAA.US,D,20240229,000000,1,2,0.5,1.6,1050,0\n"
+    ).encode())
+    if bars.t.tolist() != _days("2024-02-27", "2024-02-29", "2024-03-01") or bars.c.tolist() != [1.2, 1.6, 1.7]:
+        errors.append(f"bulk member: t={bars.t.tolist()} c={bars.c.tolist()}")
+    if len(parse_bulk_txt(b"")) or len(parse_bulk_txt(f"{BULK_HEADER}\n".encode())):
+        errors.append("empty bulk member: expected no bars")
+    return errors
+
+
+def _member(symbol: str, rows: List[tuple]) -> str:
+    lines = [BULK_HEADER] + [f"{symbol}.US,D,{d.replace('-', '')},000000,{c},{c},{c},{c},100,0" for d, c in rows]
+    return "\n".join(lines) + "\n"
+
+
+def _archive(path: Path) -> None:
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("data/daily/us/nasdaq stocks/1/", "")
+        z.writestr("data/daily/us/nasdaq stocks/1/aaa.us.txt", _member("AAA", [("2024-01-02", 10), ("2024-01-03", 11)]))
+        z.writestr("data/daily/us/nyse stocks/2/bbb.us.txt", _member("BBB", [("2024-01-02", 20), ("2024-01-04", 21)]))
+        z.writestr("data/daily/us/nyse stocks/2/ccc.us.txt", f"{BULK_HEADER}\n")
+        z.writestr("data/daily/uk/lse stocks/1/ddd.uk.txt", _member("DDD", [("2024-01-02", 30)]))
+
+
+def check_ingest(root: Path) -> List[str]:
+    errors: List[str] = []
+    archive = root / "bulk.zip"
+    _archive(archive)
+
+    got = sorted(s for s, _ in iter_bulk(archive))
+    if got != ["AAA", "BBB", "CCC"]:
+        errors.append(f"iter_bulk members: {got}")
+    got = [s for s, _ in iter_bulk(archive, ["bbb"])]
+    if got != ["BBB"]:
+        errors.append(f"iter_bulk with symbols: {got}")
+
+    store = PriceStore(root / "prices")
+    # AAA was fetched over the CSV path: since 2023-12-01, checked through 2024-01-03, with a
+    # revised 2024-01-03 bar the archive must replace
+    cached = {"t": np.array(_days("2023-12-29", "2024-01-03"), dtype=np.int64)}
+    cached.update({col: np.array([9.0, 99.0]) for col in ("o", "h", "l", "c", "v")})
+    store.save("AAA", merge_arrays(None, cached, since=_days("2023-12-01")[0], checked=_days("2024-01-03")[0]))
+
+    as_of = date(2024, 1, 5)
+    counts = ingest_bulk(archive, store, as_of=as_of)
+    if counts != {"symbols": 2, "rows": 4, "empty": 1}:
+        errors.append(f"ingest counts: {counts}")
+    aaa, bbb = store.load("AAA"), store.load("BBB")
+    if store.load("CCC") is not None or store.load("DDD") is not None:
+        errors.append("ingest stored an empty or non-US member")
+    if aaa is None or bbb is None:
+        return errors + ["ingest: AAA or BBB missing from the store"]
+    if aaa.t.tolist() != _days("2023-12-29", "2024-01-02", "2024-01-03") or aaa.c.tolist() != [9.0, 10.0, 11.0]:
+        errors.append(f"ingest merge: t={aaa.t.tolist()} c={aaa.c.tolist()}")
+    # Archives hold full histories: requested from the epoch on, checked through as_of
+    for name, hist in (("AAA", aaa), ("BBB", bbb)):
+        if hist.since != 0 or hist.checked != to_epoch_day(as_of):
+            errors.append(f"ingest {name}: since={hist.since} checked={hist.checked}")
+        if not hist.is_fresh(as_of) or hist.is_fresh(as_of + timedelta(days=3)):
+            errors.append(f"ingest {name}: freshness around {as_of} is wrong")
+
+    # Without as_of each symbol is checked through its own last bar; an older as_of never
+    # moves checked back
+    store2 = PriceStore(root / "prices2")
+    ingest_bulk(archive, store2)
+    ingest_bulk(archive, store2, symbols=["BBB"], as_of=date(2024, 1, 1))
+    for name, last in (("AAA", "2024-01-03"), ("BBB", "2024-01-04")):
+        hist = store2.load(name)
+        if hist is None or hist.checked != _days(last)[0]:
+            errors.append(f"ingest {name} without as_of: checked={hist.checked if hist else None}")
+    return errors
+
+
+ENCODINGS = {"identity": lambda b: b, "gzip": gzip.compress, "deflate": zlib.compress}
+
+
+def _archive_server(body: bytes) -> ThreadingHTTPServer:
+    # Serves `body` at /<encoding>, compressed with that Content-Encoding
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            encoding = self.path.strip("/")
+            if encoding not in ENCODINGS:
+                self.send_error(404)
+                return
+            data = ENCODINGS[encoding](body)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check_download(root: Path) -> List[str]:
+    errors: List[str] = []
+    archive = root / "served.zip"
+    _archive(archive)
+    body = archive.read_bytes()
+    server = _archive_server(body)
+    client = StooqClient()
+    try:
+        for encoding in ENCODINGS:
+            dest = root / "download" / f"{encoding}.zip"
+            try:
+                client.download(f"http://127.0.0.1:{server.server_address[1]}/{encoding}", dest)
+            except Exception as e:
+                errors.append(f"download ({encoding}): {e!r}")
+                continue
+            if dest.read_bytes() != body:
+                errors.append(f"download ({encoding}): saved {dest.stat().st_size} bytes, not the {len(body)}-byte archive")
+            elif sorted(s for s, _ in iter_bulk(dest)) != ["AAA", "BBB", "CCC"]:
+                errors.append(f"download ({encoding}): iter_bulk read the wrong members")
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    return errors
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory(prefix="stockshark-check-") as tmp:
+        errors = check_daily_csv() + check_bulk_dates() + check_ingest(Path(tmp)) + check_download(Path(tmp))
+    for e in errors:
+        print(f"FAIL {e}")
+    print("stooq: " + ("FAILED" if errors else "ok"))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
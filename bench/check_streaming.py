@@ -0,0 +1,112 @@
+"""Equivalence check for src/signals/streaming.py (runs in CI, a few seconds).
+
+    python -m bench.check_streaming
+
+A SignalState is fed each history one bar at a time. After every bar its signal is compared
+with compute_signals on the series seen so far (level, reason, close), and its moving average
+with pandas' rolling mean. Halfway through, the state goes through to_dict() -> JSON ->
+from_dict() and the last few bars are replayed, which must be ignored. The long history with flat stretches from check_backtest
+covers the resyncs of the running sums. A state with non-default slope/range windows must
+come back from save_states/load_states with the same windows and the same signals.
+Exits non-zero on any disagreement.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from bench.check_backtest import flat_history, random_history
+from src.data.market import PriceHistory
+from src.signals.scoring import compute_signals, signal_params
+from src.signals.streaming import SignalState, load_states, save_states
+from src.utils.config import load_yaml
+
+LENGTHS = (12, 75, 260)
+REPLAYED = 5  # bars fed again after the round-trip
+
+
+def _windows(params: dict) -> dict:
+    return {k: params[k] for k in ("trend_ma_days", "momentum_days", "drawdown_days")}
+
+
+def _thresholds(params: dict) -> dict:
+    return {k: v for k, v in params.items() if k not in _windows(params)}
+
+
+def _round_trip(state: SignalState) -> SignalState:
+    return SignalState.from_dict(json.loads(json.dumps(state.to_dict())))
+
+
+def check_stream(hist: PriceHistory, param_sets: List[dict]) -> List[str]:
+    errors: List[str] = []
+    df = hist.to_frame()
+    ma = df["c"].rolling(param_sets[0]["trend_ma_days"]).mean().to_numpy()
+    state = SignalState(hist.symbol, **_windows(param_sets[0]))
+    half = len(hist) // 2
+    for i in range(len(hist)):
+        if i == half:
+            state = _round_trip(state)
+            replay = zip(hist.t[i - REPLAYED: i], hist.h[i - REPLAYED: i], hist.l[i - REPLAYED: i], hist.c[i - REPLAYED: i])
+            if state.update_many((int(d), h, lo, c) for d, h, lo, c in replay):
+                errors.append(f"{hist.symbol}: replayed bars were applied after the round-trip")
+        state.update(int(hist.t[i]), hist.h[i], hist.l[i], hist.c[i])
+        got_ma = np.nan if state.ma.value is None else state.ma.value
+        if not np.isclose(got_ma, ma[i], rtol=1e-12, atol=0.0, equal_nan=True):
+            errors.append(f"{hist.symbol} bar {i}: moving average {got_ma}, want {ma[i]}")
+        for params in param_sets:
+            want = compute_signals(hist.symbol, df.iloc[: i + 1], **params)
+            got = state.signal(**_thresholds(params))
+            if got is None or (got.risk_level, got.reason, got.last_close) != (want.risk_level, want.reason, want.last_close):
+                day = pd.Timestamp(int(hist.t[i]), unit="D").date()
+                errors.append(f"{hist.symbol} {day} (bar {i}): {got and got.risk_level} vs {want.risk_level}")
+    return errors
+
+
+def check_windows(hist: PriceHistory, params: dict) -> List[str]:
+    # Non-default windows can't be compared with compute_signals; the restored state must
+    # carry them and keep scoring like the state that never left memory
+    errors: List[str] = []
+    bars = [(int(d), h, lo, c) for d, h, lo, c in zip(hist.t, hist.h, hist.l, hist.c)]
+    kept = SignalState(hist.symbol, **_windows(params), slope_window=7, range_window=15)
+    kept.update_many(bars[:100])
+    with tempfile.TemporaryDirectory(prefix="stockshark-check-") as tmp:
+        path = os.path.join(tmp, "states.json")
+        save_states(path, {hist.symbol: kept})
+        restored = load_states(path)[hist.symbol]
+    windows = (restored.slope_window, restored.range_window, restored.ma_slope.window, restored.rng.window)
+    if windows != (7, 15, 7, 15):
+        errors.append(f"restored windows {windows}, want (7, 15, 7, 15)")
+    for bar in bars[100:]:
+        kept.update(*bar)
+        restored.update(*bar)
+        a, b = kept.signal(**_thresholds(params)), restored.signal(**_thresholds(params))
+        if (a.risk_level, a.reason) != (b.risk_level, b.reason):
+            errors.append(f"restored state with windows (7, 15) differs at {pd.Timestamp(bar[0], unit='D').date()}")
+            break
+    return errors
+
+
+def main() -> int:
+    configured = signal_params(load_yaml("configs/settings.yml")["thresholds"])
+    loose = dict(configured, drawdown_warn_pct=0.05, drawdown_critical_pct=0.12,
+                 require_conditions_for_warn=1, vol_spike_is_info_only=False)
+    rng = np.random.default_rng(9)
+    histories = [random_history(rng, f"S{i}", n) for i, n in enumerate(LENGTHS)] + [flat_history(rng, "FLAT")]
+    errors: List[str] = []
+    for hist in histories:
+        errors += check_stream(hist, [configured, loose])
+    errors += check_windows(histories[2], configured)
+    for e in errors[:20]:
+        print(f"MISMATCH {e}")
+    print("streaming: " + ("FAILED" if errors else "ok") + f" ({len(histories)} histories, bar by bar)")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Full digest runs (DRY_RUN=1) against local stand-in providers at several universe sizes.
+
+    python -m bench.e2e_bench [--sizes 100,1000,10000] [--latency-ms 20] [--error-rate 0.01]
+                              [--rate-429 0.02] [--warm] [--json out.json]
+
+Each size runs `python -m src.app` in a fresh process with its own cache directory and the
+whole listing screened in one rotation shard. Reported per run: wall time, peak RSS of the
+app process, requests served per provider, injected faults and the app's own run report
+(stage timings, per-endpoint p50/p95, cache hit rates). --warm repeats each size on the
+caches the first run left behind.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+from bench.standins import Faults, StandIns, universe
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+def make_workdir(root: Path, size: int, finnhub_cpm: float) -> Path:
+    # The app reads configs/*.yml relative to its cwd: give each run its own copy
+    wd = root / f"n{size}"
+    (wd / "configs").mkdir(parents=True, exist_ok=True)
+    with open(REPO / "configs" / "settings.yml", "r", encoding="utf-8") as f:
+        settings = yaml.safe_load(f) or {}
+    settings.setdefault("cache", {})["dir"] = str(wd / "cache")
+    settings.setdefault("sub5", {}).update({"max_universe": size, "rotation_shards": 1})
+    # The stand-in has no quota; the real one would dominate every number below
+    settings.setdefault("finnhub", {})["calls_per_minute"] = finnhub_cpm
+    settings.setdefault("metrics", {})["report_path"] = str(wd / "run_report.json")
+    with open(wd / "configs" / "settings.yml", "w", encoding="utf-8") as f:
+        yaml.safe_dump(settings, f, sort_keys=False)
+    shutil.copy(REPO / "configs" / "watchlists.yml", wd / "configs" / "watchlists.yml")
+    return wd
+
+
+def _run_app(wd: Path, env: Dict[str, str]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    with open(wd / "app.log", "w", encoding="utf-8") as log:
+        proc = subprocess.Popen([sys.executable, "-m", "src.app"], cwd=wd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives this child's own rusage (ru_maxrss is KiB on Linux)
+        _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    report = {}
+    try:
+        with open(wd / "run_report.json", "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (FileNotFoundError, ValueError):
+        pass
+    return {
+        "exit_code": proc.returncode,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024.0, 1),
+        "report": report,
+    }
+
+
+def _summary(size: int, label: str, res: Dict[str, Any]) -> str:
+    rep = res["report"]
+    calls = res["served"]
+    hits = {k: v.get("hit_rate") for k, v in (rep.get("caches") or {}).items()}
+    path = (rep.get("critical_path") or {}).get("stages", [])
+    return (
+        f"{size:>6} {label:<5} exit={res['exit_code']} wall={res['wall_s']:.1f}s rss={res['peak_rss_mb']:.0f}MB "
+        f"served={calls} faults={res['injected']} cache_hit={hits} critical={'>'.join(path)}"
+    )
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench.e2e_bench")
+    p.add_argument("--sizes", default="100,1000,10000")
+    p.add_argument("--latency-ms", type=float, default=20.0)
+    p.add_argument("--jitter-ms", type=float, default=10.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--rate-429", type=float, default=0.0)
+    p.add_argument("--finnhub-cpm", type=float, default=6000.0, help="client rate limit for the run")
+    p.add_argument("--warm", action="store_true", help="also time a second run on warm caches")
+    p.add_argument("--keep", action="store_true", help="keep the work directories (logs, caches)")
+    p.add_argument("--json", default=None, help="write all results here")
+    args = p.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    faults = Faults(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, rate_429=args.rate_429,
+    )
+    root = Path(tempfile.mkdtemp(prefix="stockshark-bench-"))
+    results: List[Dict[str, Any]] = []
+    failed = False
+    try:
+        for size in sizes:
+            with StandIns(universe(size), faults) as standins:
+                wd = make_workdir(root, size, args.finnhub_cpm)
+                env = dict(os.environ)
+                env.update(standins.env())
+                env.update({
+                    "DRY_RUN": "1",
+                    "FINNHUB_API_KEY": "bench",
+                    "PYTHONPATH": os.pathsep.join([str(REPO), env.get("PYTHONPATH", "")]).rstrip(os.pathsep),
+                })
+                for label in (["cold", "warm"] if args.warm else ["cold"]):
+                    standins.reset_counts()
+                    res = _run_app(wd, env)
+                    res.update({"size": size, "run": label, "served": dict(standins.counts), "injected": dict(standins.injected)})
+                    results.append(res)
+                    failed = failed or res["exit_code"] != 0
+                    print(_summary(size, label, res), flush=True)
+                    if res["exit_code"] != 0:
+                        print(f"       see {wd / 'app.log'}", flush=True)
+                        args.keep = True
+    finally:
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=1, default=str)
+        if args.keep:
+            print(f"work dir: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
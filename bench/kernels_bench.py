@@ -0,0 +1,77 @@
+"""Timings for src/signals/kernels.py on 10-year daily histories.
+
+    python -m bench.kernels_bench [--symbols 500] [--bars 2520]
+
+Each kernel is timed against the batch indicator in src/signals/indicators.py evaluated
+on every prefix of the series (what a per-bar loop would compute today). Equivalence is
+checked by bench/check_kernels.py.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bench.check_kernels import loop_range_ratio, random_series
+from src.signals import kernels
+from src.signals.indicators import drawdown_from_recent_high, sma, slope
+
+
+def _timed(fn: Callable[[], object], repeat: int = 3) -> Tuple[float, object]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--symbols", type=int, default=500)
+    ap.add_argument("--bars", type=int, default=2520)  # ~10 years of sessions
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    c, h, lo = random_series(rng, args.bars)
+
+    s = pd.Series(c)
+    rows = []
+    t_loop, _ = _timed(lambda: [slope(s.iloc[: i + 1], 10) for i in range(len(s))], repeat=1)
+    t_kern, _ = _timed(lambda: kernels.rolling_slope(c, 10))
+    rows.append(("slope(10), 1 series", t_loop, t_kern))
+    t_loop, _ = _timed(lambda: [drawdown_from_recent_high(s.iloc[: i + 1], 20) for i in range(len(s))], repeat=1)
+    t_kern, _ = _timed(lambda: kernels.rolling_drawdown(c, 20))
+    rows.append(("drawdown(20), 1 series", t_loop, t_kern))
+    t_loop, _ = _timed(lambda: loop_range_ratio(h, lo, 20), repeat=1)
+    t_kern, _ = _timed(lambda: kernels.rolling_range_ratio(h, lo, 20))
+    rows.append(("range ratio(20), 1 series", t_loop, t_kern))
+
+    # Panel: per-symbol pandas rolling vs one 2D kernel call
+    cols = [random_series(rng, args.bars) for _ in range(args.symbols)]
+    panel_c = np.column_stack([x[0] for x in cols])
+    frames = [pd.Series(x[0]) for x in cols]
+    t_loop, _ = _timed(lambda: [sma(f, 50) for f in frames], repeat=1)
+    t_kern, _ = _timed(lambda: kernels.rolling_sma(panel_c, 50))
+    rows.append((f"sma(50), {args.symbols} symbols", t_loop, t_kern))
+    t_kern, _ = _timed(lambda: kernels.rolling_slope(panel_c, 12))
+    rows.append((f"slope(12), {args.symbols} symbols", float("nan"), t_kern))
+    t_kern, _ = _timed(lambda: kernels.rolling_drawdown(panel_c, 20))
+    rows.append((f"drawdown(20), {args.symbols} symbols", float("nan"), t_kern))
+
+    print(f"\n{'case':34s} {'baseline s':>11s} {'kernel s':>10s} {'speedup':>9s}")
+    for name, base, kern in rows:
+        if base == base and kern > 0:
+            print(f"{name:34s} {base:11.4f} {kern:10.4f} {base / kern:8.0f}x")
+        else:
+            print(f"{name:34s} {'-':>11s} {kern:10.4f} {'-':>9s}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
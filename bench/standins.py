@@ -0,0 +1,281 @@
+"""Local stand-ins for every data provider the digest talks to, on one HTTP server.
+
+    /finnhub/...                  Finnhub REST (quote, stock/profile2, stock/metric, company-news)
+    /stooq/q/d/l/?s=..&d1=..&d2=  Stooq daily CSV
+    /stooq/db/d/?b=d_us_txt       Stooq bulk daily archive (zip) of the whole universe
+    /rss/rss/search?q=...         Google News RSS
+    /symbols/nasdaqlisted.txt     Nasdaq symbol directory (otherlisted.txt is header-only)
+    POST /sendgrid/v3/mail/send   SendGrid mail send; requests are kept in StandIns.mail
+
+Point the app at it with StandIns.env() (FINNHUB_BASE_URL, STOOQ_BASE_URL, NEWS_RSS_BASE_URL,
+SYMBOL_DIRECTORY_BASE_URL, SENDGRID_HOST). Data is synthetic and deterministic per symbol; latency, 5xx
+errors and 429s are injected per request.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import io
+import json
+import random
+import sys
+import threading
+import time
+import zipfile
+import zlib
+
+import numpy as np
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 20.0     # mean added latency per request
+    jitter_ms: float = 10.0      # uniform +/- around the mean
+    error_rate: float = 0.0      # fraction of requests answered with a 500
+    rate_429: float = 0.0        # fraction of Finnhub requests answered with a 429
+    retry_after_s: float = 0.2   # Retry-After sent with each 429
+    seed: int = 7
+
+
+def universe(n: int) -> List[str]:
+    # Four-letter tickers: stable, unique and shaped like real ones
+    out = []
+    for i in range(n):
+        k, s = i, ""
+        for _ in range(4):
+            s = chr(ord("A") + k % 26) + s
+            k //= 26
+        out.append(s)
+    return out
+
+
+def _seed(symbol: str) -> int:
+    return zlib.crc32(symbol.upper().encode("utf-8"))
+
+
+def _price_path(symbol: str, days: int) -> np.ndarray:
+    # ~30% of symbols trade under $5 so the screener has work to do
+    seed = _seed(symbol)
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.8, 4.5) if seed % 10 < 3 else rng.uniform(8, 400)
+    return base * np.cumprod(1 + rng.normal(0.0003, 0.025, days))
+
+
+EPOCH = date(2000, 1, 3)  # a Monday; every symbol's synthetic history starts here
+
+
+def stooq_csv(symbol: str, d1: date, d2: date) -> str:
+    days = np.busday_count(EPOCH, d2 + timedelta(days=1))
+    if days <= 0:
+        return "No data"
+    closes = _price_path(symbol, int(days))
+    rng = np.random.default_rng(_seed(symbol) + 1)
+    rows = ["Date,Open,High,Low,Close,Volume"]
+    bdays = np.busday_offset(np.datetime64(EPOCH), np.arange(days), roll="forward")
+    first = int(np.searchsorted(bdays, np.datetime64(d1)))
+    vols = rng.integers(50_000, 5_000_000, int(days))
+    for i in range(first, int(days)):
+        c = closes[i]
+        rows.append(f"{bdays[i]},{c * 0.995:.4f},{c * 1.02:.4f},{c * 0.98:.4f},{c:.4f},{vols[i]}")
+    return "\n".join(rows) if len(rows) > 1 else "No data"
+
+
+def bulk_archive(symbols: List[str], as_of: date) -> bytes:
+    # Stooq's d_us_txt.zip layout: data/daily/us/<market>/<n>/<symbol>.us.txt, bars up to as_of
+    days = int(np.busday_count(EPOCH, as_of + timedelta(days=1)))
+    bdays = np.busday_offset(np.datetime64(EPOCH), np.arange(days), roll="forward")
+    ymd = np.char.replace(bdays.astype(str), "-", "")
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for i, s in enumerate(symbols):
+            closes = _price_path(s, days)
+            vols = np.random.default_rng(_seed(s) + 1).integers(50_000, 5_000_000, days)
+            rows = ["<TICKER>,<PER>,<DATE>,<TIME>,<OPEN>,<HIGH>,<LOW>,<CLOSE>,<VOL>,<OPENINT>"] + [
+                f"{s}.US,D,{d},000000,{c * 0.995:.4f},{c * 1.02:.4f},{c * 0.98:.4f},{c:.4f},{v},0"
+                for d, c, v in zip(ymd, closes, vols)
+            ]
+            z.writestr(f"data/daily/us/nasdaq stocks/{i // 1000 + 1}/{s.lower()}.us.txt", "\n".join(rows) + "\n")
+    return buf.getvalue()
+
+
+def rss_xml(query: str, items: int = 4) -> str:
+    rng = random.Random(_seed(query))
+    words = ["FDA approval", "partnership", "contract", "launch", "earnings", "guidance", "AI chip"]
+    entries = "".join(
+        f"<item><title>{query.split()[0]} {rng.choice(words)} #{i}</title>"
+        f"<link>https://example.com/{zlib.crc32(query.encode())}/{i}</link>"
+        f"<source url=\"https://example.com\">Example Wire</source></item>"
+        for i in range(items)
+    )
+    return f"<?xml version=\"1.0\"?><rss version=\"2.0\"><channel><title>{query}</title>{entries}</channel></rss>"
+
+
+def symbol_file(symbols: List[str]) -> str:
+    header = "Symbol|Security Name|Market Category|Test Issue|Financial Status|Round Lot Size|ETF|NextShares"
+    rows = [f"{s}|{s} Corp|Q|N|N|100|N|N" for s in symbols]
+    return "\n".join([header] + rows + [f"File Creation Time: {len(symbols)}|||||||"]) + "\n"
+
+
+def finnhub_payload(path: str, symbol: str) -> object:
+    rng = np.random.default_rng(_seed(symbol) + 2)
+    if path == "/quote":
+        c = float(_price_path(symbol, 30)[-1])
+        return {"c": round(c, 4), "pc": round(c / (1 + rng.normal(0, 0.02)), 4), "h": c * 1.01, "l": c * 0.99}
+    if path == "/stock/profile2":
+        return {"name": f"{symbol} Corp", "finnhubIndustry": "Technology", "marketCapitalization": float(rng.uniform(50, 5e5))}
+    if path == "/stock/metric":
+        return {"metric": {
+            "peTTM": float(rng.uniform(5, 80)),
+            "psTTM": float(rng.uniform(0.5, 25)),
+            "operatingMarginTTM": float(rng.uniform(-0.2, 0.4)),
+            "netMarginTTM": float(rng.uniform(-0.2, 0.3)),
+            "revenueGrowthTTM": float(rng.uniform(-0.2, 0.5)),
+            "epsGrowthTTM": float(rng.uniform(-0.5, 0.5)),
+            "totalDebtToEquityAnnual": float(rng.uniform(0, 3)),
+        }}
+    if path == "/company-news":
+        return []
+    return {}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients abandon connections on timeouts / shutdown; that's not a server problem
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+class StandIns:
+    def __init__(self, symbols: List[str], faults: Optional[Faults] = None, host: str = "127.0.0.1", port: int = 0):
+        self.symbols = symbols
+        self.faults = faults or Faults()
+        self.counts: Dict[str, int] = {}
+        self.injected = {"errors": 0, "rate_limited": 0}
+        self.mail: List[Dict[str, Any]] = []
+        self._bulk: Optional[bytes] = None  # built on first request; ~70ms per symbol
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.faults.seed)
+        self.server = _Server((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        return {
+            "FINNHUB_BASE_URL": f"{self.base}/finnhub",
+            "STOOQ_BASE_URL": f"{self.base}/stooq",
+            "NEWS_RSS_BASE_URL": f"{self.base}/rss",
+            "SYMBOL_DIRECTORY_BASE_URL": f"{self.base}/symbols",
+            "SENDGRID_HOST": f"{self.base}/sendgrid",
+        }
+
+    def start(self) -> "StandIns":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.counts = {}
+            self.injected = {"errors": 0, "rate_limited": 0}
+            self.mail = []
+
+    def __enter__(self) -> "StandIns":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _fault(self, provider: str) -> Optional[int]:
+        f = self.faults
+        with self._lock:
+            self.counts[provider] = self.counts.get(provider, 0) + 1
+            delay = max(0.0, f.latency_ms + self._rng.uniform(-f.jitter_ms, f.jitter_ms)) / 1000.0
+            roll = self._rng.random()
+        time.sleep(delay)
+        if provider == "finnhub":
+            if roll < f.rate_429:
+                with self._lock:
+                    self.injected["rate_limited"] += 1
+                return 429
+            roll -= f.rate_429
+        if 0 <= roll < f.error_rate:
+            with self._lock:
+                self.injected["errors"] += 1
+            return 500
+        return None
+
+    def _handler(self):
+        standins = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _send(self, status: int, body: str | bytes, ctype: str, headers: Optional[Dict[str, str]] = None) -> None:
+                data = body if isinstance(body, bytes) else body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+                provider = url.path.strip("/").split("/", 1)[0]
+                status = standins._fault(provider)
+                if status == 429:
+                    return self._send(429, "{}", "application/json", {"Retry-After": f"{standins.faults.retry_after_s:g}"})
+                if status:
+                    return self._send(status, "error", "text/plain")
+
+                if provider == "finnhub":
+                    path = url.path[len("/finnhub"):]
+                    body = json.dumps(finnhub_payload(path, qs.get("symbol", "")))
+                    return self._send(200, body, "application/json")
+                if provider == "stooq" and url.path.startswith("/stooq/db/d"):
+                    with standins._lock:
+                        if standins._bulk is None:
+                            standins._bulk = bulk_archive(standins.symbols, date.today())
+                    return self._send(200, standins._bulk, "application/zip")
+                if provider == "stooq":
+                    sym = qs.get("s", "").split(".")[0].upper()
+                    d1 = datetime.strptime(qs["d1"], "%Y%m%d").date()
+                    d2 = datetime.strptime(qs["d2"], "%Y%m%d").date()
+                    return self._send(200, stooq_csv(sym, d1, d2), "text/csv")
+                if provider == "rss":
+                    return self._send(200, rss_xml(qs.get("q", "")), "application/rss+xml")
+                if provider == "symbols":
+                    if url.path.endswith("nasdaqlisted.txt"):
+                        return self._send(200, symbol_file(standins.symbols), "text/plain")
+                    return self._send(200, symbol_file([]).replace("Symbol|", "ACT Symbol|", 1), "text/plain")
+                return self._send(404, "not found", "text/plain")
+
+            def do_POST(self) -> None:
+                # SendGrid answers 202 with an empty body; faults don't apply to delivery
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if urlparse(self.path).path != "/sendgrid/v3/mail/send":
+                    return self._send(404, "not found", "text/plain")
+                with standins._lock:
+                    standins.counts["sendgrid"] = standins.counts.get("sendgrid", 0) + 1
+                    standins.mail.append(json.loads(body or b"{}"))
+                return self._send(202, "", "application/json")
+
+        return Handler
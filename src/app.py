@@ -1,22 +1,32 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import os
 
 from src.utils.config import load_yaml
 from src.utils.dates import now_in_tz
+from src.data.cassette import active_cassette, replaying
 from src.data.finnhub_client import FinnhubClient
-from src.data.market import fetch_daily_history, fetch_quotes
-from src.signals.scoring import compute_signals
+from src.data.price_panel import PricePanel, refresh_panel
+from src.data.price_store import PriceStore
+from src.data.run_context import RunContext
+from src.data.fetch_pool import FetchPool, result_or
+from src.pipeline.dag import Pipeline, PipelineRun, Stage, Unavailable, upstream
+from src.utils.metrics import metrics
+from src.signals.panel import compute_signals_panel, price_panel
+from src.signals.scoring import signal_params
 from src.render.email_template import render_email
-from src.notify.sendgrid_email import send_email
+from src.notify.recipients import Recipient, load_recipients, union
+from src.notify.sendgrid_email import send_digests
 
-from src.data.fundamentals import fetch_fundamentals
-from src.data.news import fetch_cnbc_mentions, fetch_web_buzz
+from src.data.fundamentals import refresh_fundamentals
+from src.data.fundamentals_store import FundamentalsStore
+from src.data.news import NewsCache, set_news_cache
 from src.render.research_links import research_links
 
-from src.data.symbol_directory import fetch_us_listed_symbols
-from src.universe.sub5_screener import build_sub5_candidates
+from src.data.symbol_directory import load_symbol_table
+from src.universe.sub5_screener import rank_candidates, run_sub5_funnel
+from src.universe.rotation import ScreenerResultStore, plan_rotation
 
 
 def _safe_pct_change(quote: Dict[str, Any]) -> float:
@@ -43,9 +53,18 @@ def _sort_focus(items: List[Dict[str, str]]) -> List[Dict[str, str]]:
     return sorted(items, key=lambda x: priority.get(x.get("risk", "OK"), 9))
 
 
-def main() -> None:
-    watchlists = load_yaml("configs/watchlists.yml")
+def main(targets: Optional[List[str]] = None) -> PipelineRun:
     settings = load_yaml("configs/settings.yml")
+    with FetchPool.from_settings(settings) as pool:
+        return _run(settings, pool, targets)
+
+
+def _run(settings: Dict[str, Any], pool: FetchPool, targets: Optional[List[str]] = None) -> PipelineRun:
+    # targets: run only these stages and what they read (src/cli.py); None = the whole digest
+    metrics.reset()
+    metrics_cfg = settings.get("metrics", {}) or {}
+    render_budgets = (settings.get("render", {}) or {}).get("budget_bytes", {}) or {}
+    watchlists = load_yaml("configs/watchlists.yml")
 
     tz_name = settings["digest"]["timezone"]
     lookback_days = int(settings["digest"]["lookback_days"])
@@ -54,53 +73,97 @@ def main() -> None:
 
     instagram_handle = (settings.get("social", {}) or {}).get("instagram_handle", "")
 
-    core = watchlists.get("core", [])
-    conviction = watchlists.get("conviction", [])
-    risky = watchlists.get("risky_watchlist", [])
-    signal_etfs = watchlists.get("signals_etfs", [])
+    # One digest per recipient, all rendered from one fetch of the union of their symbols
+    recipients = load_recipients("configs/recipients.yml", watchlists, th, os.getenv("TO_EMAIL"))
+
+    cache_dir = (settings.get("cache", {}) or {}).get("dir", ".cache")
+    price_store = PriceStore(os.path.join(cache_dir, "prices"))
+    panel_cfg = settings.get("panel", {}) or {}
+    fundamentals_store = FundamentalsStore.from_settings(settings, cache_dir)
+    news_cfg = settings.get("news", {}) or {}
+    news_cache = NewsCache(os.path.join(cache_dir, "news"), ttl_minutes=float(news_cfg.get("ttl_minutes", 360)))
+    set_news_cache(news_cache)
+    # One parse pool for every news batch of the run, closed with the fetch pool
+    parse_workers = int(news_cfg.get("parse_workers", 2))
+    news_batch_opts = {
+        "max_workers": pool.limits.get("news", 6),
+        "parser": pool.processes("news-parse", parse_workers) if parse_workers > 0 else None,
+        "parse_workers": 0,  # without that pool, parse in-thread rather than a pool per batch
+        "feed_timeout": float(news_cfg.get("feed_timeout_s", 10)),
+        "batch_timeout": float(news_cfg.get("batch_timeout_s", 45)),
+    }
+
+    market_symbols = union(recipients, "core", "signals_etfs")
+    finnhub_cfg = settings.get("finnhub", {}) or {}
+    client = FinnhubClient(
+        calls_per_minute=float(finnhub_cfg.get("calls_per_minute", 60)),
+        max_retries=int(finnhub_cfg.get("max_retries", 4)),
+    )
+
+    finnhub_async_conc = int((settings.get("concurrency", {}) or {}).get("finnhub_async", 32))
+
+    # Every provider call below goes through this run-scoped memo
+    ctx = RunContext(
+        client,
+        pool,
+        price_store=price_store,
+        fundamentals_store=fundamentals_store,
+        finnhub_concurrency=finnhub_async_conc,
+        news_options=news_batch_opts,
+        panel=PricePanel.open(os.path.join(cache_dir, "panel")) if panel_cfg.get("enabled", True) else None,
+    )
 
-    market_symbols = list(dict.fromkeys(core + signal_etfs))
-    client = FinnhubClient()
+    pipeline_cfg = settings.get("pipeline", {}) or {}
+    timeouts = pipeline_cfg.get("timeouts_s", {}) or {}
 
     # ------------------ Market pulse ------------------
-    quotes = fetch_quotes(client, market_symbols)
-    market_pulse: List[Dict[str, str]] = []
-    for s in market_symbols:
-        q = quotes.get(s, {})
-        chg = _safe_pct_change(q)
-        last = q.get("c", "")
-        note = "Risk-on proxy" if s in signal_etfs else "Core index"
-        market_pulse.append(
-            {
+    def market_pulse_stage() -> Dict[str, Dict[str, str]]:
+        quotes = ctx.quotes(market_symbols)
+        market_pulse: Dict[str, Dict[str, str]] = {}
+        for s in market_symbols:
+            q = quotes.get(s, {})
+            chg = _safe_pct_change(q)
+            last = q.get("c", "")
+            market_pulse[s] = {
                 "symbol": s,
                 "last": f"{float(last):.2f}" if isinstance(last, (int, float)) else str(last),
                 "chg": f"{chg * 100:.2f}%",
-                "note": note,
             }
-        )
+        return market_pulse
+
+    def market_rows(market_pulse: Dict[str, Dict[str, str]], r: Recipient) -> List[Dict[str, str]]:
+        signal_etfs = r.symbols("signals_etfs")
+        return [
+            dict(market_pulse[s], note="Risk-on proxy" if s in signal_etfs else "Core index")
+            for s in dict.fromkeys(r.symbols("core") + signal_etfs)
+        ]
 
     # ------------------ Signals ------------------
-    def run_bucket(symbols: List[str]) -> List[Dict[str, str]]:
+    # Recipients with the same thresholds share one scoring pass
+    threshold_sets = {r.thresholds_key: signal_params(r.thresholds) for r in recipients}
+
+    def run_bucket(key: str) -> Dict[Any, Dict[str, Dict[str, str]]]:
+        # {thresholds_key: {symbol: row}} over every recipient's `key` list, fetched once
+        symbols = union(recipients, key)
+        histories = ctx.histories(symbols, lookback_days)
+        panel = price_panel(histories)
+        return {
+            tkey: dict(zip(symbols, score_bucket(symbols, histories, panel, params)))
+            for tkey, params in threshold_sets.items()
+        }
+
+    def score_bucket(symbols: List[str], histories: List[Any], panel: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, str]]:
         out: List[Dict[str, str]] = []
-        for s in symbols:
-            hist = fetch_daily_history(client, s, lookback_days=lookback_days)
+
+        # Score the whole bucket in one vectorized pass
+        signals = compute_signals_panel(panel["c"], panel["h"], panel["l"], **params) if not panel["c"].empty else {}
+
+        for s, hist in zip(symbols, histories):
             if not hist:
                 out.append({"symbol": s, "close": "n/a", "risk": "n/a", "reason": "No price history returned"})
                 continue
 
-            sig = compute_signals(
-                symbol=s,
-                df=hist.df,
-                trend_ma_days=int(th["trend_ma_days"]),
-                momentum_days=int(th["momentum_days"]),
-                drawdown_days=int(th["drawdown_days"]),
-                drawdown_warn_pct=float(th["drawdown_warn_pct"]),
-                drawdown_critical_pct=float(th["drawdown_critical_pct"]),
-                vol_spike_multiplier=float(th["vol_spike_multiplier"]),
-                require_conditions_for_warn=int(th.get("require_conditions_for_warn", 2)),
-                vol_spike_is_info_only=bool(th.get("vol_spike_is_info_only", True)),
-                momentum_warn_pct=float(th.get("momentum_warn_pct", -0.06)),
-            )
+            sig = signals.get(s)
 
             if not sig:
                 out.append({"symbol": s, "close": "n/a", "risk": "n/a", "reason": "Signal computation failed"})
@@ -124,95 +187,232 @@ def main() -> None:
             )
         return out
 
-    holdings = run_bucket(conviction)
-    risky_out = run_bucket(risky)
-
-    triggered = [x for x in (holdings + risky_out) if x.get("risk") in ("WARN", "CRITICAL")]
-    top_focus = _sort_focus(triggered)[:5]
-
     # ------------------ Research pack symbols ------------------
-    flagged_risky = [x["symbol"] for x in risky_out if x.get("risk") in ("WARN", "CRITICAL")]
-    research_symbols = list(dict.fromkeys(conviction + flagged_risky))
-
-    fundamentals_by_symbol: dict[str, dict[str, str]] = {}
-    links_by_symbol: dict[str, dict[str, str]] = {}
-    news_by_symbol: dict[str, dict[str, list[dict[str, str]]]] = {}
-
-    for sym in research_symbols:
-        links_by_symbol[sym] = research_links(sym, instagram_handle=instagram_handle or None)
-
-        f = fetch_fundamentals(client, sym)
-        if f:
-            fundamentals_by_symbol[sym] = {
-                "name": f.name,
-                "industry": f.industry,
-                "market_cap": f"{f.market_cap:.1f}B" if isinstance(f.market_cap, (int, float)) else "n/a",
-                "pe": f"{f.pe_ttm:.1f}" if f.pe_ttm is not None else "n/a",
-                "ps": f"{f.ps_ttm:.1f}" if f.ps_ttm is not None else "n/a",
-                "ev_ebitda": f"{f.ev_ebitda:.1f}" if f.ev_ebitda is not None else "n/a",
-                "op_margin": f"{f.operating_margin*100:.1f}%" if f.operating_margin is not None else "n/a",
-                "net_margin": f"{f.net_margin*100:.1f}%" if f.net_margin is not None else "n/a",
-                "rev_growth": f"{f.revenue_growth_yoy*100:.1f}%" if f.revenue_growth_yoy is not None else "n/a",
-                "eps_growth": f"{f.eps_growth_yoy*100:.1f}%" if f.eps_growth_yoy is not None else "n/a",
-                "debt_eq": f"{f.debt_to_equity:.2f}" if f.debt_to_equity is not None else "n/a",
-                "stance": f.stance,
-                "stance_reason": f.stance_reason,
-            }
-        else:
-            fundamentals_by_symbol[sym] = {"name": sym, "industry": "", "stance": "n/a", "stance_reason": "No fundamentals returned"}
+    def bucket_rows(bucket: Dict[Any, Dict[str, Dict[str, str]]], r: Recipient, key: str) -> List[Dict[str, str]]:
+        rows = bucket[r.thresholds_key]
+        return [rows[s] for s in dict.fromkeys(r.symbols(key))]
+
+    def research_for(risky: Any, r: Recipient) -> List[str]:
+        # Without the risky bucket the pack still covers the conviction names
+        risky_out = [] if isinstance(risky, Unavailable) else bucket_rows(risky, r, "risky_watchlist")
+        flagged_risky = [x["symbol"] for x in risky_out if x.get("risk") in ("WARN", "CRITICAL")]
+        return list(dict.fromkeys(r.symbols("conviction") + flagged_risky))
+
+    def research_stage(risky: Any) -> Dict[str, Any]:
+        research_symbols = list(dict.fromkeys(s for r in recipients for s in research_for(risky, r)))
+
+        fundamentals_by_symbol: dict[str, dict[str, str]] = {}
+        links_by_symbol: dict[str, dict[str, str]] = {}
+        news_by_symbol: dict[str, dict[str, list[dict[str, str]]]] = {}
+
+        news_max = int(news_cfg.get("max_items", 4))
+        funds_fut = pool.submit("finnhub", ctx.fundamentals, research_symbols)
+        news = ctx.news(research_symbols, news_max)
+
+        funds = result_or(funds_fut) or [None] * len(research_symbols)
+
+        for sym, f in zip(research_symbols, funds):
+            links_by_symbol[sym] = research_links(sym, instagram_handle=instagram_handle or None)
+
+            if f:
+                fundamentals_by_symbol[sym] = {
+                    "name": f.name,
+                    "industry": f.industry,
+                    "market_cap": f"{f.market_cap:.1f}B" if isinstance(f.market_cap, (int, float)) else "n/a",
+                    "pe": f"{f.pe_ttm:.1f}" if f.pe_ttm is not None else "n/a",
+                    "ps": f"{f.ps_ttm:.1f}" if f.ps_ttm is not None else "n/a",
+                    "ev_ebitda": f"{f.ev_ebitda:.1f}" if f.ev_ebitda is not None else "n/a",
+                    "op_margin": f"{f.operating_margin*100:.1f}%" if f.operating_margin is not None else "n/a",
+                    "net_margin": f"{f.net_margin*100:.1f}%" if f.net_margin is not None else "n/a",
+                    "rev_growth": f"{f.revenue_growth_yoy*100:.1f}%" if f.revenue_growth_yoy is not None else "n/a",
+                    "eps_growth": f"{f.eps_growth_yoy*100:.1f}%" if f.eps_growth_yoy is not None else "n/a",
+                    "debt_eq": f"{f.debt_to_equity:.2f}" if f.debt_to_equity is not None else "n/a",
+                    "stance": f.stance,
+                    "stance_reason": f.stance_reason,
+                }
+            else:
+                fundamentals_by_symbol[sym] = {"name": sym, "industry": "", "stance": "n/a", "stance_reason": "No fundamentals returned"}
 
-        try:
-            cnbc = fetch_cnbc_mentions(sym, max_items=int((settings.get("news", {}) or {}).get("max_items", 4)))
-        except Exception:
-            cnbc = []
-        try:
-            buzz = fetch_web_buzz(sym, max_items=int((settings.get("news", {}) or {}).get("max_items", 4)))
-        except Exception:
-            buzz = []
+            news_by_symbol[sym] = {
+                feed: [{"title": h.title, "link": h.link, "source": h.source} for h in news[sym][feed]]
+                for feed in ("cnbc", "buzz")
+            }
 
-        news_by_symbol[sym] = {
-            "cnbc": [{"title": h.title, "link": h.link, "source": h.source} for h in cnbc],
-            "buzz": [{"title": h.title, "link": h.link, "source": h.source} for h in buzz],
+        return {
+            "research_symbols": research_symbols,
+            "links_by_symbol": links_by_symbol,
+            "news_by_symbol": news_by_symbol,
+            "fundamentals_by_symbol": fundamentals_by_symbol,
         }
 
     # ------------------ ITERATIVE sub-$5 screener ------------------
     # Pull the live US symbol list from Nasdaq Trader symbol directory files. :contentReference[oaicite:4]{index=4}
     # Then screen sub-$5 + rank by fundamentals + news/innovation.
     sub5_cfg = settings.get("sub5", {}) or {}
-    sub5_max_universe = int(sub5_cfg.get("max_universe", 800))   # limit runtime
+    sub5_max_universe = int(sub5_cfg.get("max_universe", 800))   # symbols screened per run
     sub5_top_n = int(sub5_cfg.get("top_n", 10))
 
-    all_listed = fetch_us_listed_symbols(include_etfs=False)
-    # Keep a manageable slice (you can later randomize or rotate if you want broader coverage)
-    universe_symbols = [x.symbol for x in all_listed][:sub5_max_universe]
-
-    sub5 = build_sub5_candidates(client, universe_symbols, max_out=sub5_top_n)
+    def symbols_stage() -> List[str]:
+        # Cached locally; downloaded at most once a day. Tickers that appeared or vanished since
+        # the last refresh get their cached prices dropped (a reused ticker is a new company).
+        symbol_table, symbol_diff = load_symbol_table(os.path.join(cache_dir, "symbols"))
+        ctx.invalidate_prices(symbol_diff.changed)
+        return symbol_table.symbols(include_etfs=False)
+
+    def screen_stage(symbols: List[str]) -> List[Dict[str, str]]:
+        # Rotate through the whole listing: each symbol has a fixed shard, each day screens one
+        # shard, and the ranking merges today's shard with recent results from the others.
+        today = now_in_tz(tz_name).date()
+        rotation_shards = sub5_cfg.get("rotation_shards")
+        plan = plan_rotation(
+            symbols,
+            per_run=sub5_max_universe,
+            day=today,
+            n_shards=int(rotation_shards) if rotation_shards else None,
+        )
+        print(f"sub5 rotation: shard {plan.shard + 1}/{plan.n_shards}, {len(plan.symbols)} of {len(symbols)} symbols")
+
+        funnel = run_sub5_funnel(
+            client,
+            plan.symbols,
+            max_out=sub5_top_n,
+            enrich_top_k=int(sub5_cfg.get("enrich_top_k", 40)),
+            context=ctx,
+        )
+        for stage in funnel.stages:
+            print(f"sub5 {stage.summary()}")
+
+        sub5_results = ScreenerResultStore(os.path.join(cache_dir, "sub5_results.json"))
+        sub5_results.record(plan.symbols, funnel.scored, today)
+        sub5_results.prune(today, max_age_days=plan.n_shards)
+        sub5_results.save()
+        return rank_candidates(
+            sub5_results.recent_candidates(today, max_age_days=plan.n_shards, universe=symbols),
+            sub5_top_n,
+        )
 
     # ------------------ Render + send ------------------
-    now_dt = now_in_tz(tz_name)
-    email = render_email(
-        subject_dt=now_dt,
-        tz_name=tz_name,
-        sections={
-            "market_pulse": market_pulse,
-            "top_focus": top_focus,
-            "holdings": holdings,
-            "risky": risky_out,
-            "triggered": triggered,
-            "research_symbols": research_symbols,
-            "links_by_symbol": links_by_symbol,
-            "news_by_symbol": news_by_symbol,
-            "fundamentals_by_symbol": fundamentals_by_symbol,
-            "sub5": sub5,
-        },
-    )
-
-    if os.getenv("DRY_RUN", "0") == "1":
-        print(email["subject"])
-        print(email["html"][:3000])
-        return
-
-    send_email(subject=email["subject"], html=email["html"])
+    def render_stage(market_pulse: Any, holdings: Any, risky: Any, research: Any, sub5: Any) -> List[Dict[str, str]]:
+        # Runs with whatever finished: unavailable sections say so instead of holding the email
+        unavailable = {
+            name: value.reason
+            for name, value in (("market_pulse", market_pulse), ("holdings", holdings), ("risky", risky),
+                                ("research", research), ("sub5", sub5))
+            if isinstance(value, Unavailable)
+        }
+        research_pack = {} if "research" in unavailable else research
+        now_dt = now_in_tz(tz_name)
+        footer = {"footer": metrics.footer()} if metrics_cfg.get("email_footer") else {}
+
+        digests: List[Dict[str, str]] = []
+        for r in recipients:
+            holdings_rows = [] if "holdings" in unavailable else bucket_rows(holdings, r, "conviction")
+            risky_rows = [] if "risky" in unavailable else bucket_rows(risky, r, "risky_watchlist")
+
+            triggered = [x for x in (holdings_rows + risky_rows) if x.get("risk") in ("WARN", "CRITICAL")]
+            top_focus = _sort_focus(triggered)[:5]
+
+            research_symbols = [] if "research" in unavailable else research_for(risky, r)
+            pack = {
+                key: {s: research_pack[key][s] for s in research_symbols}
+                for key in ("links_by_symbol", "news_by_symbol", "fundamentals_by_symbol")
+            } if research_pack else {}
+
+            rendered = render_email(
+                subject_dt=now_dt,
+                tz_name=tz_name,
+                sections={
+                    **footer,
+                    "market_pulse": [] if "market_pulse" in unavailable else market_rows(market_pulse, r),
+                    "top_focus": top_focus,
+                    "holdings": holdings_rows,
+                    "risky": risky_rows,
+                    "triggered": triggered,
+                    "research_symbols": research_symbols,
+                    "links_by_symbol": pack.get("links_by_symbol", {}),
+                    "news_by_symbol": pack.get("news_by_symbol", {}),
+                    "fundamentals_by_symbol": pack.get("fundamentals_by_symbol", {}),
+                    "sub5": [] if "sub5" in unavailable else sub5,
+                    "unavailable": unavailable,
+                },
+                budgets=render_budgets,
+            )
+            digests.append(dict(rendered, to=r.email))
+        return digests
+
+    def send_stage(render: List[Dict[str, str]]) -> bool:
+        # A replayed run renders yesterday's data: never mail it
+        if os.getenv("DRY_RUN", "0") == "1" or replaying():
+            for d in render:
+                if len(render) > 1:
+                    print(f"To: {d['to']}")
+                print(d["subject"])
+                print(d["html"][:3000])
+            return False
+        sent = send_digests([(d["to"], d["subject"], d["html"]) for d in render])
+        print(f"Sent {len(render)} digest(s) in {sent} SendGrid request(s)")
+        return True
+
+    # Quotes, both signal buckets, the research pack and the symbol directory + screener are
+    # independent branches; the run takes as long as the slowest one, not their sum.
+    stages = [
+        Stage("market_pulse", market_pulse_stage, timeout_s=timeouts.get("market_pulse")),
+        Stage("holdings", lambda: run_bucket("conviction"), timeout_s=timeouts.get("holdings")),
+        Stage("risky", lambda: run_bucket("risky_watchlist"), timeout_s=timeouts.get("risky")),
+        Stage("research", research_stage, inputs=("risky",), timeout_s=timeouts.get("research"), partial=True),
+        Stage("symbols", symbols_stage, timeout_s=timeouts.get("symbols")),
+        Stage("sub5", screen_stage, inputs=("symbols",), timeout_s=timeouts.get("sub5")),
+        Stage(
+            "render", render_stage, inputs=("market_pulse", "holdings", "risky", "research", "sub5"),
+            timeout_s=timeouts.get("render"), partial=True,
+        ),
+        Stage("send", send_stage, inputs=("render",), timeout_s=timeouts.get("send")),
+    ]
+    if targets:
+        stages = upstream(stages, targets)
+    pipeline = Pipeline(stages)
+    run = pipeline.run()
+    for r in sorted(run.results.values(), key=lambda r: r.started):
+        detail = f" ({r.error})" if r.error else ""
+        print(f"stage {r.name}: {r.status} at +{r.started:.2f}s, {r.seconds:.2f}s{detail}")
+        metrics.stage(r.name, r.seconds, r.status)
+    path, path_s = run.critical_path(pipeline.stages)
+    print(f"pipeline: {run.seconds:.2f}s wall, critical path {' -> '.join(path)} ({path_s:.2f}s)")
+
+    # Stale fundamentals were served above; revalidate them now that the digest is out
+    stale = fundamentals_store.deferred()
+    refreshed = refresh_fundamentals(client, fundamentals_store, stale, max_concurrency=finnhub_async_conc)
+    tape = active_cassette()
+
+    # Copy the sessions this run stored into the panel, so later runs for the same session
+    # (re-runs, weekends, holidays) read them from the map instead of the store
+    panel_sessions = None
+    if panel_cfg.get("enabled", True):
+        try:
+            panel_sessions = len(refresh_panel(os.path.join(cache_dir, "panel"), price_store, int(panel_cfg.get("days", 400))))
+        except OSError as e:
+            print(f"price panel: refresh failed ({e}); runs read the store until the next refresh")
+
+    # One line for the log; the per-provider counters all go to the run report
+    print(f"Run summary: {metrics.footer()} · fundamentals revalidated {refreshed}/{len(stale)}")
+    report_path = metrics_cfg.get("report_path", os.path.join(cache_dir, "run_report.json"))
+    metrics.write_json(report_path, extra={
+        "critical_path": {"stages": path, "seconds": round(path_s, 3)},
+        "unavailable": run.unavailable(),
+        "run_context": ctx.report(),
+        "finnhub_client": client.stats.snapshot(),
+        "news_cache": dict(news_cache.stats),
+        "fundamentals_store": dict(fundamentals_store.stats),
+        "fundamentals_revalidated": {"refreshed": refreshed, "stale": len(stale)},
+        "price_panel_sessions": panel_sessions,
+        "cassette": tape.summary() if tape is not None else None,
+    })
+    print(f"Run report: {report_path}")
+
+    # A digest that could not be rendered or sent is a failed run
+    if "send" in run.results and isinstance(run.value("send"), Unavailable):
+        raise RuntimeError(f"Digest not sent: {run.value('send').reason}")
+    return run
 
 
 if __name__ == "__main__":
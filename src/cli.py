@@ -0,0 +1,197 @@
+"""Command line entry point: the whole digest or any part of it.
+
+    python -m src.cli pulse | signals | research | screen   print those stages' output (JSON)
+    python -m src.cli render [--html-dir DIR]               render without sending
+    python -m src.cli send                                  the full run (same as python -m src.app)
+    python -m src.cli warm [--max-calls N]                  warm the fundamentals store
+    python -m src.cli ingest [ARCHIVE] [--as-of DAY]        load a Stooq bulk archive into the price store
+    python -m src.cli panel [--rebuild]                     refresh the memory-mapped price panel
+    python -m src.cli backtest [--symbols A,B] [--since D]   replay the risk rules over the stored history
+    python -m src.cli imports                               import-time budget check
+
+Only the standard library is imported here; each command imports what it runs, and the
+heavy providers (feedparser, sendgrid) load on first use.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+# command -> (pipeline stages it runs, help)
+STAGE_COMMANDS: Dict[str, Tuple[List[str], str]] = {
+    "pulse": (["market_pulse"], "market pulse quotes"),
+    "signals": (["holdings", "risky"], "holdings and risky watchlist signals"),
+    "research": (["research"], "research pack (fundamentals, links, news)"),
+    "screen": (["sub5"], "sub-$5 screener"),
+    "render": (["render"], "render every recipient's digest without sending it"),
+    "send": (["send"], "the full digest run"),
+}
+
+# module -> (cumulative import budget in ms, modules it must not pull in)
+IMPORT_BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "src.cli": (100.0, ("yaml", "requests", "aiohttp", "numpy", "pandas", "feedparser", "sendgrid")),
+    "src.app": (1000.0, ("feedparser", "sendgrid")),
+}
+
+
+def _run_stages(command: str, args: argparse.Namespace) -> int:
+    from src.app import main
+    from src.pipeline.dag import Unavailable
+
+    targets = STAGE_COMMANDS[command][0]
+    run = main(targets)
+    if command == "send":
+        return 0
+
+    out: Dict[str, Any] = {t: run.value(t) for t in targets}
+    failed = any(isinstance(v, Unavailable) for v in out.values())
+    if command == "render" and not failed:
+        if args.html_dir:
+            os.makedirs(args.html_dir, exist_ok=True)
+            for d in out["render"]:
+                path = os.path.join(args.html_dir, f"{d['to'] or 'digest'}.html")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(d["html"])
+                print(f"wrote {path}")
+        out["render"] = [{"to": d["to"], "subject": d["subject"], "bytes": len(d["html"].encode("utf-8"))} for d in out["render"]]
+    for t in ("holdings", "risky"):
+        if t in out and isinstance(out[t], dict):
+            # {thresholds: {symbol: row}}: one entry per distinct recipient threshold set
+            sets = list(out[t].values())
+            out[t] = sets[0] if len(sets) == 1 else {f"thresholds #{i + 1}": rows for i, rows in enumerate(sets)}
+    print(json.dumps(out, indent=1, default=_jsonable))
+    return 1 if failed else 0
+
+
+def _jsonable(value: Any) -> Any:
+    # Unavailable and other dataclass stage outputs
+    if hasattr(value, "__dataclass_fields__"):
+        return {k: getattr(value, k) for k in value.__dataclass_fields__}
+    return str(value)
+
+
+def _ingest(args: argparse.Namespace) -> int:
+    from src.data.stooq import main
+
+    main(
+        ["ingest"] + ([args.source] if args.source else [])
+        + (["--symbols", args.symbols] if args.symbols else [])
+        + (["--as-of", args.as_of] if args.as_of else [])
+    )
+    return 0
+
+
+def _panel(args: argparse.Namespace) -> int:
+    from src.data.price_panel import main
+
+    main(["--rebuild"] if args.rebuild else [])
+    return 0
+
+
+def _backtest(args: argparse.Namespace) -> int:
+    from src.signals.backtest import main
+
+    main(
+        (["--symbols", args.symbols] if args.symbols else [])
+        + (["--since", args.since] if args.since else [])
+        + (["--horizons", args.horizons] if args.horizons else [])
+        + (["--events-csv", args.events_csv] if args.events_csv else [])
+    )
+    return 0
+
+
+def _warm(args: argparse.Namespace) -> int:
+    from src.data.fundamentals_store import main
+
+    main((["--max-calls", str(args.max_calls)] if args.max_calls is not None else []) + (["--watchlists-only"] if args.watchlists_only else []))
+    return 0
+
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(module: str) -> Tuple[float, List[str], List[Tuple[float, str]]]:
+    """(cumulative ms, every module loaded, top-level imports by cumulative ms) for a cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    # -X importtime lists children before their parent; a depth-0 line closes a subtree
+    subtree: List[Tuple[int, float, str]] = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if not m:
+            continue
+        cumulative_ms, depth, name = int(m.group(2)) / 1000.0, len(m.group(3)) // 2, m.group(4)
+        if depth > 0:
+            subtree.append((depth, cumulative_ms, name))
+        elif name == module:
+            direct = sorted(((ms, n) for d, ms, n in subtree if d == 1), reverse=True)
+            return cumulative_ms, [n for _, _, n in subtree], direct
+        else:
+            subtree = []
+    raise RuntimeError(f"no import timing for {module}")
+
+
+def _imports(args: argparse.Namespace) -> int:
+    failed = False
+    for module, (budget_ms, forbidden) in IMPORT_BUDGETS.items():
+        budget_ms *= args.scale
+        total, loaded, direct = import_profile(module)
+        roots = {name.split(".")[0] for name in loaded}
+        leaked = [m for m in forbidden if m in roots]
+        ok = total <= budget_ms and not leaked
+        failed = failed or not ok
+        print(f"{module}: {total:.0f}ms (budget {budget_ms:.0f}ms){'' if ok else '  FAIL'}")
+        if leaked:
+            print(f"  imports {', '.join(leaked)} at load time")
+        for ms, name in direct[:5]:
+            print(f"  {ms:7.1f}ms  {name}")
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Stockshark digest")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in STAGE_COMMANDS.items():
+        p = sub.add_parser(name, help=help_text)
+        if name == "render":
+            p.add_argument("--html-dir", default=None, help="also write one <recipient>.html per digest here")
+    p = sub.add_parser("warm", help="warm the fundamentals store outside the digest run")
+    p.add_argument("--max-calls", type=int, default=None)
+    p.add_argument("--watchlists-only", action="store_true")
+    p = sub.add_parser("ingest", help="load a Stooq bulk daily archive (path or URL) into the price store")
+    p.add_argument("source", nargs="?", default=None)
+    p.add_argument("--symbols", default=None, help="comma-separated symbols to keep (default: all)")
+    p.add_argument("--as-of", default=None, help="archive session, YYYY-MM-DD")
+    p = sub.add_parser("panel", help="append new sessions and symbols to the price panel")
+    p.add_argument("--rebuild", action="store_true")
+    p = sub.add_parser("backtest", help="replay the WARN/CRITICAL rules over the stored price history")
+    p.add_argument("--symbols", default=None)
+    p.add_argument("--since", default=None, help="YYYY-MM-DD")
+    p.add_argument("--horizons", default=None, help="forward windows in bars (default 5,20,60)")
+    p.add_argument("--events-csv", default=None)
+    p = sub.add_parser("imports", help="check cold import times against their budgets")
+    p.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow machines)")
+    args = parser.parse_args(argv)
+
+    if args.command == "warm":
+        return _warm(args)
+    if args.command == "ingest":
+        return _ingest(args)
+    if args.command == "panel":
+        return _panel(args)
+    if args.command == "backtest":
+        return _backtest(args)
+    if args.command == "imports":
+        return _imports(args)
+    return _run_stages(args.command, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
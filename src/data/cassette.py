@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+import asyncio
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# HTTP_CASSETTE=record|replay turns the tape on; everything else is optional
+MODES = ("record", "replay")
+DEFAULT_PATH = "cassettes/http.sqlite"
+
+# Never part of a key (secrets)
+SECRET_PARAMS = ("token",)
+# Request window params: a replay on a later day falls back to the newest recording
+# of the same request without them
+WINDOW_PARAMS = ("d1", "d2", "from", "to")
+
+# Response headers worth keeping (conditional GETs, Retry-After)
+KEPT_HEADERS = ("ETag", "Last-Modified", "Content-Type", "Retry-After")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    provider    TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    route       TEXT NOT NULL,
+    status      INTEGER NOT NULL,
+    headers     TEXT NOT NULL,
+    body        BLOB NOT NULL,
+    latency_s   REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (provider, key)
+);
+CREATE INDEX IF NOT EXISTS responses_route ON responses (provider, route, recorded_at);
+"""
+
+
+class CassetteMiss(LookupError):
+    """Replay asked for a request that was never recorded."""
+
+
+class ReplayedError(RuntimeError):
+    """A recorded failure (HTTP error status, or status 0 for a transport error), raised again on replay."""
+
+    def __init__(self, provider: str, key: str, status: int):
+        super().__init__(f"{provider} {key}: recorded status {status}")
+        self.status = status
+
+
+@dataclass
+class Recorded:
+    status: int            # 0 = the request itself failed
+    body: bytes
+    headers: Dict[str, str]
+    latency_s: float
+
+
+def request_key(path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    # (key, route): the exact request, and the same request minus its date window
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k not in SECRET_PARAMS)
+    key = f"{path}?{urlencode(items)}" if items else path
+    route_items = [(k, v) for k, v in items if k not in WINDOW_PARAMS]
+    route = f"{path}?{urlencode(route_items)}" if route_items else path
+    return key, route
+
+
+def status_of(error: BaseException) -> int:
+    # HTTP status behind a client exception; 0 for transport errors
+    status = getattr(error, "status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return int(status) if status else 0
+
+
+class Cassette:
+    """Every provider response of a run in one SQLite file, for offline replays.
+
+    - record: calls go out as usual; each final outcome (after the client's own retries)
+      is stored per (provider, request), bodies zlib-compressed, newest recording wins
+    - replay: nothing touches the network; recorded bodies come back, recorded failures
+      raise ReplayedError and unrecorded requests raise CassetteMiss (raw transports
+      get status 0 instead, like a request that got no response). With
+      latency_scale > 0 each reply waits its recorded latency times that factor.
+    """
+
+    def __init__(self, path: str | os.PathLike, mode: str, latency_scale: float = 0.0, commit_every: int = 200):
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {MODES}, got {mode!r}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = max(0.0, float(latency_scale))
+        self.commit_every = max(1, int(commit_every))
+        if mode == "replay" and not self.path.exists():
+            raise FileNotFoundError(f"no cassette at {self.path}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        if mode == "record":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=OFF")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"recorded": 0, "replayed": 0, "fallbacks": 0, "misses": 0}
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def record(self, provider: str, path: str, params: Optional[Dict[str, Any]], rec: Recorded) -> None:
+        key, route = request_key(path, params)
+        headers = {h: rec.headers[h] for h in KEPT_HEADERS if rec.headers.get(h)}
+        row = (provider, key, route, int(rec.status), json.dumps(headers), zlib.compress(rec.body, 6), float(rec.latency_s), time.time())
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+            self.stats["recorded"] += 1
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._db.commit()
+                self._pending = 0
+
+    def lookup(self, provider: str, path: str, params: Optional[Dict[str, Any]] = None) -> Recorded:
+        key, route = request_key(path, params)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, latency_s FROM responses WHERE provider = ? AND key = ?",
+                (provider, key),
+            ).fetchone()
+            if row is None and route != key:
+                row = self._db.execute(
+                    "SELECT status, headers, body, latency_s FROM responses WHERE provider = ? AND route = ? "
+                    "ORDER BY recorded_at DESC LIMIT 1",
+                    (provider, route),
+                ).fetchone()
+                if row is not None:
+                    self.stats["fallbacks"] += 1
+            if row is None:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"{provider} {key} is not on the cassette")
+            self.stats["replayed"] += 1
+        status, headers, body, latency_s = row
+        return Recorded(status=status, body=zlib.decompress(body), headers=json.loads(headers), latency_s=latency_s)
+
+    def _delay(self, rec: Recorded) -> float:
+        return rec.latency_s * self.latency_scale
+
+    def play(self, provider: str, path: str, params: Optional[Dict[str, Any]] = None) -> Recorded:
+        rec = self.lookup(provider, path, params)
+        if self._delay(rec) > 0:
+            time.sleep(self._delay(rec))
+        return rec
+
+    async def play_async(self, provider: str, path: str, params: Optional[Dict[str, Any]] = None) -> Recorded:
+        rec = self.lookup(provider, path, params)
+        if self._delay(rec) > 0:
+            await asyncio.sleep(self._delay(rec))
+        return rec
+
+    def call(
+        self,
+        provider: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        fetch: Callable[[], Tuple[int, bytes, Dict[str, str]]],
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        # Raw transports: fetch() returns (status, body, headers) and does not raise
+        if self.replaying:
+            try:
+                rec = self.play(provider, path, params)
+            except CassetteMiss:
+                # Neither may a miss: callers already handle status 0 as a failed request
+                return 0, b"", {}
+            return rec.status, rec.body, dict(rec.headers)
+        t0 = time.perf_counter()
+        status, body, headers = fetch()
+        self.record(provider, path, params, Recorded(status, body, headers, time.perf_counter() - t0))
+        return status, body, headers
+
+    def call_json(self, provider: str, path: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> Any:
+        # JSON clients: fetch() returns the decoded payload or raises after its retries
+        if self.replaying:
+            return _payload(provider, path, params, self.play(provider, path, params))
+        t0 = time.perf_counter()
+        try:
+            payload = fetch()
+        except Exception as e:
+            self.record(provider, path, params, Recorded(status_of(e), b"", {}, time.perf_counter() - t0))
+            raise
+        self.record(provider, path, params, Recorded(200, _dumps(payload), {}, time.perf_counter() - t0))
+        return payload
+
+    async def call_json_async(
+        self,
+        provider: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        if self.replaying:
+            return _payload(provider, path, params, await self.play_async(provider, path, params))
+        t0 = time.perf_counter()
+        try:
+            payload = await fetch()
+        except Exception as e:
+            self.record(provider, path, params, Recorded(status_of(e), b"", {}, time.perf_counter() - t0))
+            raise
+        self.record(provider, path, params, Recorded(200, _dumps(payload), {}, time.perf_counter() - t0))
+        return payload
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, mode=self.mode, path=str(self.path))
+
+
+def _dumps(payload: Any) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _payload(provider: str, path: str, params: Optional[Dict[str, Any]], rec: Recorded) -> Any:
+    if rec.status != 200:
+        raise ReplayedError(provider, request_key(path, params)[0], rec.status)
+    return json.loads(rec.body)
+
+
+_active: Optional[Cassette] = None
+_active_lock = threading.Lock()
+_configured = False
+
+
+def active_cassette() -> Optional[Cassette]:
+    """The process-wide cassette from HTTP_CASSETTE / HTTP_CASSETTE_PATH / HTTP_CASSETTE_LATENCY, or None."""
+    global _active, _configured
+    if _configured:
+        return _active
+    with _active_lock:
+        if not _configured:
+            mode = (os.getenv("HTTP_CASSETTE") or "").strip().lower()
+            if mode:
+                _active = Cassette(
+                    os.getenv("HTTP_CASSETTE_PATH") or DEFAULT_PATH,
+                    mode,
+                    latency_scale=float(os.getenv("HTTP_CASSETTE_LATENCY") or 0),
+                )
+                atexit.register(_active.close)
+            _configured = True
+    return _active
+
+
+def replaying() -> bool:
+    tape = active_cassette()
+    return tape is not None and tape.replaying
+
+
+def set_cassette(tape: Optional[Cassette]) -> None:
+    # Explicit override (bench/, scripts); None turns recording/replay off
+    global _active, _configured
+    with _active_lock:
+        _active, _configured = tape, True
+
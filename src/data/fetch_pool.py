@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+import multiprocessing
+import threading
+
+T = TypeVar("T")
+
+# Conservative defaults; override per provider under `concurrency:` in configs/settings.yml
+DEFAULT_CONCURRENCY: Dict[str, int] = {
+    "stooq": 8,
+    "finnhub": 4,
+    "news": 6,
+}
+
+
+class FetchPool:
+    """One bounded thread pool per data provider.
+
+    Work for different providers runs side by side; each provider never sees more than
+    its configured number of in-flight requests.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = dict(DEFAULT_CONCURRENCY)
+        for k, v in (limits or {}).items():
+            self.limits[k] = max(1, int(v))
+        self._executors: Dict[str, Executor] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "FetchPool":
+        return cls(settings.get("concurrency", {}) or {})
+
+    def _executor(self, provider: str) -> ThreadPoolExecutor:
+        with self._lock:
+            ex = self._executors.get(provider)
+            if ex is None:
+                ex = ThreadPoolExecutor(
+                    max_workers=self.limits.get(provider, 1),
+                    thread_name_prefix=f"fetch-{provider}",
+                )
+                self._executors[provider] = ex
+            return ex
+
+    def processes(self, name: str, workers: int) -> Optional[ProcessPoolExecutor]:
+        """A process pool kept for the whole run (None when processes are unavailable).
+
+        Workers come from a forkserver, never a fork of this process: by the time work
+        arrives it runs fetch threads and event loops whose locks a fork could copy held.
+        """
+        with self._lock:
+            ex = self._executors.get(name)
+            if ex is None:
+                try:
+                    ex = ProcessPoolExecutor(max_workers=max(1, int(workers)), mp_context=process_context())
+                except (OSError, NotImplementedError, ValueError):
+                    return None
+                self._executors[name] = ex
+            return ex
+
+    def submit(self, provider: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+        return self._executor(provider).submit(fn, *args, **kwargs)
+
+    def map(self, provider: str, fn: Callable[[Any], T], items: Iterable[Any], default: Any = None) -> List[T]:
+        # Results come back in input order; a failing item yields `default` instead of
+        # aborting the whole batch.
+        futures = [self.submit(provider, fn, x) for x in items]
+        return [result_or(f, default) for f in futures]
+
+    def close(self) -> None:
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for ex in executors:
+            ex.shutdown(wait=True)
+
+    def __enter__(self) -> "FetchPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def process_context() -> multiprocessing.context.BaseContext:
+    # forkserver where the platform has it (Linux, macOS), spawn elsewhere
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def result_or(future: Future, default: Any = None) -> Any:
+    try:
+        return future.result()
+    except Exception:
+        return default
@@ -0,0 +1,180 @@
+from __future__ import annotations
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import aiohttp
+
+from src.data.cassette import active_cassette, replaying
+from src.data.finnhub_client import (
+    DEFAULT_CALLS_PER_MINUTE,
+    RETRY_STATUSES,
+    ClientStats,
+    FinnhubClient,
+    backoff_delay,
+    finnhub_base_url,
+    retry_after_seconds,
+    shared_limiter,
+)
+from src.utils.metrics import metrics
+
+T = TypeVar("T")
+
+
+class FinnhubHTTPError(RuntimeError):
+    def __init__(self, status: int, url: str):
+        super().__init__(f"Finnhub HTTP {status} for {url}")
+        self.status = status
+
+
+class AsyncFinnhubClient:
+    """asyncio sibling of FinnhubClient: same endpoints, same retry rules, same rate limit.
+
+    Use as `async with AsyncFinnhubClient() as c: ...`; the aiohttp session is bound to
+    the running event loop.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: int = 20,
+        calls_per_minute: float = DEFAULT_CALLS_PER_MINUTE,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        max_concurrency: int = 32,
+        base_url: Optional[str] = None,
+        stats: Optional[ClientStats] = None,
+    ):
+        self.api_key = api_key or os.getenv("FINNHUB_API_KEY") or ("replay" if replaying() else None)
+        if not self.api_key:
+            raise RuntimeError("FINNHUB_API_KEY is not set")
+        self.timeout = timeout
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.base_url = (base_url or finnhub_base_url()).rstrip("/")
+        # Same bucket as any sync FinnhubClient using this key
+        self.limiter = shared_limiter(self.api_key, calls_per_minute)
+        self.stats = stats or ClientStats()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_sync(cls, client: FinnhubClient, max_concurrency: int = 32) -> "AsyncFinnhubClient":
+        # Mirrors the sync client's settings and reports into the same counters
+        return cls(
+            api_key=client.api_key,
+            timeout=client.timeout,
+            calls_per_minute=client.limiter.rate * 60.0,
+            max_retries=client.max_retries,
+            backoff_base=client.backoff_base,
+            max_concurrency=max_concurrency,
+            base_url=client.base_url,
+            stats=client.stats,
+        )
+
+    async def __aenter__(self) -> "AsyncFinnhubClient":
+        self._open()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    def _open(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, path: str, params: Dict[str, Any]) -> Any:
+        with metrics.timed(f"finnhub{path}"):
+            tape = active_cassette()
+            if tape is not None:
+                return await tape.call_json_async("finnhub", path, params, lambda: self._request(path, params))
+            return await self._request(path, params)
+
+    async def _request(self, path: str, params: Dict[str, Any]) -> Any:
+        session = self._open()
+        params = dict(params)
+        params["token"] = self.api_key
+        url = f"{self.base_url}{path}"
+
+        attempt = 0
+        while True:
+            waited = self.limiter.reserve()
+            self.stats.add(calls=1, throttle_waits=1 if waited > 0 else 0, throttle_wait_s=waited)
+            if waited > 0:
+                await asyncio.sleep(waited)
+            try:
+                async with self._sem:
+                    async with session.get(url, params=params) as r:
+                        status = r.status
+                        if status not in RETRY_STATUSES:
+                            if status >= 400:
+                                self.stats.add(failures=1)
+                                raise FinnhubHTTPError(status, path)
+                            return await r.json(content_type=None)
+                        headers = r.headers
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    self.stats.add(failures=1)
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base)
+            else:
+                if status == 429:
+                    self.stats.add(rate_limited=1)
+                if attempt >= self.max_retries:
+                    self.stats.add(failures=1)
+                    raise FinnhubHTTPError(status, path)
+                delay = backoff_delay(attempt, self.backoff_base)
+                ra = retry_after_seconds(headers, rate_limited=status == 429)
+                if ra is not None:
+                    delay = max(delay, ra)
+                if status == 429:
+                    self.limiter.block_for(delay)
+
+            attempt += 1
+            self.stats.add(retries=1)
+            await asyncio.sleep(delay)
+
+    async def company_profile2(self, symbol: str) -> Dict[str, Any]:
+        return await self._get("/stock/profile2", {"symbol": symbol})
+
+    async def company_basic_financials(self, symbol: str) -> Dict[str, Any]:
+        return await self._get("/stock/metric", {"symbol": symbol, "metric": "all"})
+
+    async def company_news(self, symbol: str, _from: str, to: str) -> Any:
+        return await self._get("/company-news", {"symbol": symbol, "from": _from, "to": to})
+
+    async def quote(self, symbol: str) -> Dict[str, Any]:
+        return await self._get("/quote", {"symbol": symbol})
+
+    async def candles(self, symbol: str, resolution: str, _from: int, to: int) -> Dict[str, Any]:
+        return await self._get("/stock/candle", {
+            "symbol": symbol,
+            "resolution": resolution,
+            "from": _from,
+            "to": to,
+        })
+
+
+def run_with_async_client(
+    client: FinnhubClient,
+    fn: Callable[[AsyncFinnhubClient], Awaitable[T]],
+    max_concurrency: int = 32,
+) -> T:
+    # Blocking bridge for sync callers (main thread or a fetch-pool worker): one event loop,
+    # one connection pool, all of fn's calls in flight together.
+    async def _run() -> T:
+        async with AsyncFinnhubClient.from_sync(client, max_concurrency=max_concurrency) as ac:
+            return await fn(ac)
+
+    return asyncio.run(_run())
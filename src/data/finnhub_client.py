@@ -1,25 +1,172 @@
 from __future__ import annotations
 import os
-import requests
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
 from typing import Any, Dict, Optional
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.data.cassette import active_cassette, replaying
+from src.utils.metrics import metrics
+from src.utils.ratelimit import TokenBucket
+
 FINNHUB_BASE = "https://finnhub.io/api/v1"
 
+
+def finnhub_base_url() -> str:
+    # FINNHUB_BASE_URL points the clients at a stand-in server (bench/, local testing)
+    return os.getenv("FINNHUB_BASE_URL") or FINNHUB_BASE
+
+# Free plan allows 60 calls/minute; paid plans can raise this in configs/settings.yml
+DEFAULT_CALLS_PER_MINUTE = 60
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_limiter(api_key: str, calls_per_minute: float) -> TokenBucket:
+    # The quota belongs to the API key, so every client using the same key shares one bucket.
+    with _limiters_lock:
+        bucket = _limiters.get(api_key)
+        if bucket is None:
+            bucket = TokenBucket(calls_per_minute)
+            _limiters[api_key] = bucket
+        return bucket
+
+
+class ClientStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0       # 429 responses seen
+        self.throttle_waits = 0     # times the local limiter made a call wait
+        self.throttle_wait_s = 0.0
+        self.failures = 0           # calls that gave up after retries
+        self._lock = threading.Lock()
+
+    def add(self, **deltas: float) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "throttle_waits": self.throttle_waits,
+                "throttle_wait_s": round(self.throttle_wait_s, 3),
+                "failures": self.failures,
+            }
+
+
+def retry_after_seconds(headers: Any, rate_limited: bool = False) -> Optional[float]:
+    # Retry-After is either delta-seconds or an HTTP date. On 429s Finnhub also sends
+    # X-Ratelimit-Reset (epoch seconds) - only meaningful when we are actually throttled.
+    ra = headers.get("Retry-After")
+    if ra:
+        try:
+            return max(0.0, float(ra))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(ra).timestamp() - time.time())
+            except Exception:
+                pass
+    reset = headers.get("X-Ratelimit-Reset") if rate_limited else None
+    if reset:
+        try:
+            return max(0.0, float(reset) - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 30.0) -> float:
+    # Exponential backoff with +/-50% jitter so concurrent workers don't retry in lockstep
+    return random.uniform(0.5, 1.5) * min(cap, base * (2 ** attempt))
+
+
 class FinnhubClient:
-    def __init__(self, api_key: Optional[str] = None, timeout: int = 20):
-        self.api_key = api_key or os.getenv("FINNHUB_API_KEY")
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: int = 20,
+        calls_per_minute: float = DEFAULT_CALLS_PER_MINUTE,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        pool_size: int = 16,
+        base_url: Optional[str] = None,
+    ):
+        # A replayed run never sends the key, so it doesn't need one
+        self.api_key = api_key or os.getenv("FINNHUB_API_KEY") or ("replay" if replaying() else None)
         if not self.api_key:
             raise RuntimeError("FINNHUB_API_KEY is not set")
         self.timeout = timeout
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.base_url = (base_url or finnhub_base_url()).rstrip("/")
+        self.limiter = shared_limiter(self.api_key, calls_per_minute)
+        self.stats = ClientStats()
+
+        # Keep-alive connection pool, sized for the concurrent fetch pools
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        with metrics.timed(f"finnhub{path}"):
+            tape = active_cassette()
+            if tape is not None:
+                return tape.call_json("finnhub", path, params, lambda: self._request(path, params))
+            return self._request(path, params)
+
+    def _request(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
         params = dict(params)
         params["token"] = self.api_key
-        url = f"{FINNHUB_BASE}{path}"
-        r = requests.get(url, params=params, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
-        
+        url = f"{self.base_url}{path}"
+
+        attempt = 0
+        while True:
+            waited = self.limiter.acquire()
+            self.stats.add(calls=1, throttle_waits=1 if waited > 0 else 0, throttle_wait_s=waited)
+            try:
+                r = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self.stats.add(failures=1)
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base)
+            else:
+                if r.status_code not in RETRY_STATUSES:
+                    if r.status_code >= 400:
+                        self.stats.add(failures=1)
+                    r.raise_for_status()
+                    return r.json()
+                if r.status_code == 429:
+                    self.stats.add(rate_limited=1)
+                if attempt >= self.max_retries:
+                    self.stats.add(failures=1)
+                    r.raise_for_status()
+                delay = backoff_delay(attempt, self.backoff_base)
+                ra = retry_after_seconds(r.headers, rate_limited=r.status_code == 429)
+                if ra is not None:
+                    delay = max(delay, ra)
+                if r.status_code == 429:
+                    self.limiter.block_for(delay)
+
+            attempt += 1
+            self.stats.add(retries=1)
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self.session.close()
+
     def company_profile2(self, symbol: str) -> Dict[str, Any]:
         return self._get("/stock/profile2", {"symbol": symbol})
 
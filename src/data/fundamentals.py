@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from src.data.finnhub_client import FinnhubClient
+from src.data.finnhub_async import AsyncFinnhubClient, run_with_async_client
+from src.data.fundamentals_store import FRESH, STALE, FundamentalsStore
+from src.utils.metrics import metrics
+
+# Client method behind each store endpoint
+_CALLS = {"profile2": "company_profile2", "metric": "company_basic_financials"}
 
 @dataclass
 class FundamentalSnapshot:
@@ -148,10 +155,119 @@ def score_fundamentals(symbol: str, profile: Dict[str, Any], fin: Dict[str, Any]
     )
 
 
-def fetch_fundamentals(client: FinnhubClient, symbol: str) -> Optional[FundamentalSnapshot]:
+def _cached(store: Optional[FundamentalsStore], symbol: str, endpoint: str) -> Tuple[bool, Any]:
+    # (True, payload) when the store can answer; stale payloads are served and queued
+    if store is None:
+        return False, None
+    state, payload = store.lookup(symbol, endpoint)
+    return state in (FRESH, STALE), payload
+
+
+def _fetched(store: Optional[FundamentalsStore], symbol: str, endpoint: str, payload: Any, error: Optional[Exception]) -> Any:
+    if error is None:
+        if store is not None:
+            store.put(symbol, endpoint, payload)
+        return payload
+    # Refetch failed: any cached copy beats nothing
+    old = store.last_known(symbol, endpoint) if store is not None else None
+    if old is None:
+        raise error
+    return old
+
+
+def _payload(client: FinnhubClient, store: Optional[FundamentalsStore], symbol: str, endpoint: str) -> Any:
+    hit, payload = _cached(store, symbol, endpoint)
+    if hit:
+        return payload
+    try:
+        payload = getattr(client, _CALLS[endpoint])(symbol)
+    except Exception as e:
+        return _fetched(store, symbol, endpoint, None, e)
+    return _fetched(store, symbol, endpoint, payload, None)
+
+
+async def _payload_async(client: AsyncFinnhubClient, store: Optional[FundamentalsStore], symbol: str, endpoint: str) -> Any:
+    hit, payload = _cached(store, symbol, endpoint)
+    if hit:
+        return payload
+    try:
+        payload = await getattr(client, _CALLS[endpoint])(symbol)
+    except Exception as e:
+        return _fetched(store, symbol, endpoint, None, e)
+    return _fetched(store, symbol, endpoint, payload, None)
+
+
+def fetch_fundamentals(client: FinnhubClient, symbol: str, store: Optional[FundamentalsStore] = None) -> Optional[FundamentalSnapshot]:
     try:
-        profile = client.company_profile2(symbol)
-        fin = client.company_basic_financials(symbol)
+        profile = _payload(client, store, symbol, "profile2")
+        fin = _payload(client, store, symbol, "metric")
         return score_fundamentals(symbol, profile, fin)
-    except Exception:
+    except Exception as e:
+        metrics.error("fundamentals/fetch_fundamentals", e)
         return None
+
+
+async def fetch_fundamentals_async(
+    client: AsyncFinnhubClient,
+    symbol: str,
+    store: Optional[FundamentalsStore] = None,
+) -> Optional[FundamentalSnapshot]:
+    try:
+        # profile2 and metric are independent: overlap them
+        profile, fin = await asyncio.gather(
+            _payload_async(client, store, symbol, "profile2"),
+            _payload_async(client, store, symbol, "metric"),
+        )
+        return score_fundamentals(symbol, profile, fin)
+    except Exception as e:
+        metrics.error("fundamentals/fetch_fundamentals", e)
+        return None
+
+
+async def gather_fundamentals(
+    client: AsyncFinnhubClient,
+    symbols: List[str],
+    store: Optional[FundamentalsStore] = None,
+) -> List[Optional[FundamentalSnapshot]]:
+    return list(await asyncio.gather(*(fetch_fundamentals_async(client, s, store) for s in symbols)))
+
+
+def fetch_fundamentals_many(
+    client: FinnhubClient,
+    symbols: List[str],
+    max_concurrency: int = 32,
+    store: Optional[FundamentalsStore] = None,
+) -> List[Optional[FundamentalSnapshot]]:
+    # Same results as [fetch_fundamentals(client, s, store) for s in symbols], in order, but
+    # every symbol's calls share one event loop (and the sync client's rate limit).
+    if not symbols:
+        return []
+    return run_with_async_client(
+        client, lambda ac: gather_fundamentals(ac, symbols, store), max_concurrency=max_concurrency
+    )
+
+
+def refresh_fundamentals(
+    client: FinnhubClient,
+    store: FundamentalsStore,
+    pairs: List[Tuple[str, str]],
+    max_concurrency: int = 32,
+) -> int:
+    """Refetch (symbol, endpoint) pairs into the store; returns how many succeeded.
+
+    Used after the digest is sent (store.deferred()) and by the warm command.
+    """
+    if not pairs:
+        return 0
+
+    async def one(ac: AsyncFinnhubClient, symbol: str, endpoint: str) -> bool:
+        try:
+            store.put(symbol, endpoint, await getattr(ac, _CALLS[endpoint])(symbol))
+            return True
+        except Exception:
+            return False
+
+    async def run(ac: AsyncFinnhubClient) -> int:
+        return sum(await asyncio.gather(*(one(ac, s, ep) for s, ep in pairs)))
+
+    return run_with_async_client(client, run, max_concurrency=max_concurrency)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import argparse
+import json
+import os
+import threading
+import time
+
+from src.utils.metrics import metrics
+
+# Finnhub endpoints behind a FundamentalSnapshot
+ENDPOINTS = ("profile2", "metric")
+
+# Profiles change a few times a year, basic financials at most daily
+DEFAULT_TTL_S = {"profile2": 30 * 86400.0, "metric": 86400.0}
+DEFAULT_MAX_STALE_S = 90 * 86400.0
+
+FRESH, STALE, MISSING = "fresh", "stale", "missing"
+
+
+class FundamentalsStore:
+    """Finnhub fundamentals payloads on disk (one JSON file per symbol), TTL per endpoint.
+
+    lookup() classifies a payload as
+    - fresh:   younger than the endpoint's TTL, use it as-is
+    - stale:   older than the TTL but younger than `max_stale_s`; serve it and queue the
+               endpoint for revalidation (see deferred())
+    - missing: never fetched, or too old to serve without refetching
+
+    last_known() returns a payload of any age, for when a refetch fails.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike,
+        ttl_s: Optional[Dict[str, float]] = None,
+        max_stale_s: float = DEFAULT_MAX_STALE_S,
+    ):
+        self.root = Path(root)
+        self.ttl_s = dict(DEFAULT_TTL_S)
+        self.ttl_s.update(ttl_s or {})
+        self.max_stale_s = float(max_stale_s)
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._deferred: Set[Tuple[str, str]] = set()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {FRESH: 0, STALE: 0, MISSING: 0, "stored": 0}
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], cache_dir: str) -> "FundamentalsStore":
+        cfg = settings.get("fundamentals", {}) or {}
+        return cls(
+            os.path.join(cache_dir, "fundamentals"),
+            ttl_s={
+                "profile2": float(cfg.get("profile_ttl_days", 30)) * 86400.0,
+                "metric": float(cfg.get("metric_ttl_hours", 24)) * 3600.0,
+            },
+            max_stale_s=float(cfg.get("max_stale_days", 90)) * 86400.0,
+        )
+
+    def _path(self, symbol: str) -> Path:
+        safe = symbol.upper().replace("/", "_")
+        return self.root / f"{safe}.json"
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            lk = self._locks.get(symbol)
+            if lk is None:
+                lk = self._locks[symbol] = threading.Lock()
+            return lk
+
+    def _doc(self, symbol: str) -> Dict[str, Any]:
+        with self._lock:
+            doc = self._docs.get(symbol)
+        if doc is not None:
+            return doc
+        try:
+            with self._path(symbol).open("r", encoding="utf-8") as f:
+                doc = json.load(f) or {}
+        except (FileNotFoundError, ValueError):
+            doc = {}
+        with self._lock:
+            return self._docs.setdefault(symbol, doc)
+
+    def age_s(self, symbol: str, endpoint: str, now: Optional[float] = None) -> Optional[float]:
+        entry = self._doc(symbol).get(endpoint)
+        if entry is None:
+            return None
+        return (now or time.time()) - float(entry.get("fetched_at", 0))
+
+    def lookup(self, symbol: str, endpoint: str, now: Optional[float] = None) -> Tuple[str, Any]:
+        age = self.age_s(symbol, endpoint, now)
+        if age is None or age >= self.max_stale_s:
+            state, payload = MISSING, None
+        else:
+            payload = self._doc(symbol)[endpoint]["payload"]
+            state = FRESH if age < self.ttl_s[endpoint] else STALE
+        metrics.cache("fundamentals", state != MISSING)
+        with self._lock:
+            self.stats[state] += 1
+            if state == STALE:
+                self._deferred.add((symbol, endpoint))
+        return state, payload
+
+    def last_known(self, symbol: str, endpoint: str) -> Any:
+        entry = self._doc(symbol).get(endpoint)
+        return entry["payload"] if entry is not None else None
+
+    def put(self, symbol: str, endpoint: str, payload: Any, now: Optional[float] = None) -> None:
+        # profile2 and metric for one symbol can land from two threads: the read-modify-write
+        # of its document is serialized so neither endpoint's write is lost
+        with self._symbol_lock(symbol):
+            doc = dict(self._doc(symbol))
+            doc[endpoint] = {"fetched_at": now or time.time(), "payload": payload}
+            self.root.mkdir(parents=True, exist_ok=True)
+            p = self._path(symbol)
+            tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(doc, f, separators=(",", ":"))
+            os.replace(tmp, p)
+            with self._lock:
+                self._docs[symbol] = doc
+                self._deferred.discard((symbol, endpoint))
+                self.stats["stored"] += 1
+
+    def deferred(self) -> List[Tuple[str, str]]:
+        # Stale (symbol, endpoint) pairs served this run, to refresh once the digest is out
+        with self._lock:
+            return sorted(self._deferred)
+
+    def needs_refresh(self, symbols: List[str], now: Optional[float] = None) -> List[Tuple[str, str]]:
+        # Every non-fresh (symbol, endpoint), never-fetched first, then oldest first
+        now = now or time.time()
+        out: List[Tuple[float, str, str]] = []
+        for sym in symbols:
+            for ep in ENDPOINTS:
+                age = self.age_s(sym, ep, now)
+                if age is None or age >= self.ttl_s[ep]:
+                    out.append((float("inf") if age is None else age, sym, ep))
+        out.sort(key=lambda x: -x[0])
+        return [(sym, ep) for _, sym, ep in out]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Warm the store for the whole listing (plus watchlists) outside the digest run."""
+    from src.data.finnhub_client import FinnhubClient
+    from src.data.fundamentals import refresh_fundamentals
+    from src.data.symbol_directory import load_symbol_table
+    from src.utils.config import load_yaml
+
+    parser = argparse.ArgumentParser(prog="python -m src.data.fundamentals_store")
+    parser.add_argument("--max-calls", type=int, default=None, help="Finnhub calls to spend (default: settings)")
+    parser.add_argument("--watchlists-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    settings = load_yaml("configs/settings.yml")
+    watchlists = load_yaml("configs/watchlists.yml")
+    cfg = settings.get("fundamentals", {}) or {}
+    cache_dir = (settings.get("cache", {}) or {}).get("dir", ".cache")
+    store = FundamentalsStore.from_settings(settings, cache_dir)
+
+    symbols = [s for key in ("core", "conviction", "risky_watchlist") for s in (watchlists.get(key) or [])]
+    if not args.watchlists_only:
+        table, _ = load_symbol_table(os.path.join(cache_dir, "symbols"))
+        symbols += table.symbols(include_etfs=False)
+    symbols = list(dict.fromkeys(symbols))
+
+    max_calls = args.max_calls if args.max_calls is not None else int(cfg.get("warm_max_calls", 1200))
+    todo = store.needs_refresh(symbols)
+    finnhub_cfg = settings.get("finnhub", {}) or {}
+    client = FinnhubClient(
+        calls_per_minute=float(finnhub_cfg.get("calls_per_minute", 60)),
+        max_retries=int(finnhub_cfg.get("max_retries", 4)),
+    )
+    conc = int((settings.get("concurrency", {}) or {}).get("finnhub_async", 32))
+    ok = refresh_fundamentals(client, store, todo[: max(0, max_calls)], max_concurrency=conc)
+    print(f"fundamentals warm: {ok}/{min(len(todo), max(0, max_calls))} refreshed, {len(todo)} were due, {len(symbols)} symbols")
+    print(f"Finnhub client stats: {client.stats.snapshot()}")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,166 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 
+import functools
+
+import numpy as np
 import pandas as pd
-from pandas_datareader import data as pdr
 
+from src.data.fetch_pool import FetchPool
 from src.data.finnhub_client import FinnhubClient
+from src.data.finnhub_async import AsyncFinnhubClient
+from src.data.price_store import COLUMNS, PriceStore, from_epoch_day, merge_arrays, to_epoch_day
+from src.data.stooq import DailyBars, StooqClient
+from src.utils.dates import last_completed_session
+from src.utils.metrics import metrics, timed
 
-@dataclass
 class PriceHistory:
-    symbol: str
-    df: pd.DataFrame  # columns: t, o, h, l, c, v
+    """One symbol's daily bars as column arrays.
+
+    t holds int64 epoch days (ascending, unique); o, h, l, c, v are float64. Slicing by date
+    returns views on the same arrays, and to_frame() builds a pandas frame for callers that
+    still want one.
+    """
+
+    __slots__ = ("symbol", "t", "o", "h", "l", "c", "v")
+
+    def __init__(self, symbol: str, t: np.ndarray, o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray, v: np.ndarray):
+        self.symbol = symbol
+        self.t, self.o, self.h, self.l, self.c, self.v = t, o, h, l, c, v
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def __repr__(self) -> str:
+        return f"PriceHistory({self.symbol!r}, {len(self)} bars)"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, col).nbytes for col in ("t",) + COLUMNS)
+
+    def since(self, start: date) -> "PriceHistory":
+        # Bars on or after `start`, as views
+        i = int(np.searchsorted(self.t, to_epoch_day(start), side="left"))
+        return PriceHistory(self.symbol, *(getattr(self, col)[i:] for col in ("t",) + COLUMNS))
+
+    def to_frame(self) -> pd.DataFrame:
+        # columns: t (tz-aware UTC timestamps), o, h, l, c, v
+        return pd.DataFrame({"t": pd.to_datetime(self.t, unit="D", utc=True), **{col: getattr(self, col) for col in COLUMNS}})
+
+    @property
+    def df(self) -> pd.DataFrame:
+        # Older callers; builds a new frame on every access
+        return self.to_frame()
+
+@functools.lru_cache(maxsize=None)
+def _stooq_client() -> StooqClient:
+    # One keep-alive session shared by every history fetch
+    return StooqClient()
+
+@timed("stooq")
+def _read_stooq(symbol: str, start: date, end: date) -> DailyBars:
+    # Raises on transport errors; returns empty bars when Stooq has no rows for the range.
+    return _stooq_client().daily(symbol, start, end)
 
-def _to_stooq_symbol(symbol: str) -> str:
-    # Stooq uses ".us" for US stocks/ETFs
-    # Example: AMZN -> amzn.us
-    return f"{symbol.lower()}.us"
+# How long a session's bar gets to show up at the provider before "no bar" means there is none
+BAR_GRACE = timedelta(days=1)
 
-def fetch_daily_history(_client: FinnhubClient, symbol: str, lookback_days: int = 120) -> Optional[PriceHistory]:
-    end = datetime.utcnow().date()
-    start = (datetime.utcnow() - timedelta(days=lookback_days + 30)).date()
+def _checked_through(session: date, last_day: Optional[int], now: Optional[datetime] = None) -> int:
+    # The last session the store may call asked about: `session` once its bar is stored,
+    # otherwise only the sessions that have had BAR_GRACE to publish (a holiday or a halted
+    # name simply has no bar), so an unpublished bar is asked for again on the next run
+    if last_day is not None and last_day >= to_epoch_day(session):
+        return to_epoch_day(session)
+    settled = last_completed_session(now=(now or datetime.now(timezone.utc)) - BAR_GRACE)
+    return to_epoch_day(min(session, settled))
 
-    stooq_symbol = _to_stooq_symbol(symbol)
+def _read_through_store(store: PriceStore, symbol: str, start: date, end: date) -> Dict[str, np.ndarray]:
+    session = last_completed_session()
+    cached = store.load(symbol)
 
+    if cached is not None and cached.covers(start):
+        if cached.is_fresh(session):
+            metrics.cache("prices", True)
+            return cached.window(start)
+        # Only the bars after the last one we already hold are missing
+        last = cached.last_day
+        fetch_start = start if last is None else max(start, from_epoch_day(last + 1))
+    else:
+        # Nothing cached, or the cache starts after this lookback: fetch the whole window
+        fetch_start = start
+
+    metrics.cache("prices", False)
     try:
-        df = pdr.DataReader(stooq_symbol, "stooq", start, end)
+        bars = _read_stooq(symbol, fetch_start, end)
     except Exception:
-        return None
+        # Provider down: serve what we already hold rather than nothing
+        if cached is not None and cached.covers(start) and len(cached.t):
+            return cached.window(start)
+        raise
 
-    if df is None or df.empty:
-        return None
+    merged = merge_arrays(cached, bars.columns(), since=to_epoch_day(start), checked=-1)
+    merged.checked = max(merged.checked, _checked_through(session, merged.last_day))
+    store.save(symbol, merged)
+    return merged.window(start)
 
-    # Stooq returns newest-first; reverse it
-    df = df.sort_index().reset_index()
+def history_window(lookback_days: int) -> Tuple[date, date]:
+    # (start, end) requested for a lookback; padded so ~lookback_days trading bars come back
+    now = datetime.utcnow()
+    return (now - timedelta(days=lookback_days + 30)).date(), now.date()
 
-    # Normalize columns to match our pipeline
-    # Stooq columns: Date, Open, High, Low, Close, Volume
-    df = df.rename(columns={
-        "Date": "t",
-        "Open": "o",
-        "High": "h",
-        "Low": "l",
-        "Close": "c",
-        "Volume": "v",
-    })
+def slice_history(hist: Optional[PriceHistory], lookback_days: int) -> Optional[PriceHistory]:
+    """What fetch_daily_history(lookback_days) returns, cut from a wider history already held."""
+    if hist is None:
+        return None
+    start, _ = history_window(lookback_days)
+    out = hist.since(start)
+    if len(out) < 30:
+        return None
+    return out
 
-    df["t"] = pd.to_datetime(df["t"], utc=True, errors="coerce")
-    df = df.dropna(subset=["c"]).reset_index(drop=True)
+def fetch_daily_history(
+    _client: FinnhubClient,
+    symbol: str,
+    lookback_days: int = 120,
+    store: Optional[PriceStore] = None,
+) -> Optional[PriceHistory]:
+    start, end = history_window(lookback_days)
 
-    if len(df) < 30:
+    try:
+        if store is None:
+            cols = _read_stooq(symbol, start, end).columns()
+        else:
+            cols = _read_through_store(store, symbol, start, end)
+    except Exception as e:
+        metrics.error("history/fetch_daily_history", e)
+        return None
+
+    if len(cols["t"]) < 30:
         return None
 
-    return PriceHistory(symbol=symbol, df=df[["t", "o", "h", "l", "c", "v"]])
+    return PriceHistory(symbol=symbol, **cols)
 
-def fetch_quotes(client: FinnhubClient, symbols: List[str]) -> Dict[str, Dict]:
+def fetch_quotes(client: FinnhubClient, symbols: List[str], pool: Optional[FetchPool] = None) -> Dict[str, Dict]:
+    if pool is not None:
+        return dict(zip(symbols, pool.map("finnhub", client.quote, symbols, default={})))
     out: Dict[str, Dict] = {}
     for s in symbols:
         try:
             out[s] = client.quote(s)
-        except Exception:
+        except Exception as e:
+            metrics.error("quotes/fetch_quotes", e)
             out[s] = {}
     return out
 
+async def fetch_quotes_async(client: AsyncFinnhubClient, symbols: List[str]) -> Dict[str, Dict]:
+    async def one(s: str) -> Dict:
+        try:
+            return await client.quote(s)
+        except Exception as e:
+            metrics.error("quotes/fetch_quotes", e)
+            return {}
+
+    results = await asyncio.gather(*(one(s) for s in symbols))
+    return dict(zip(symbols, results))
@@ -1,10 +1,31 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import quote_plus
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import concurrent.futures as cf
+import hashlib
+import json
+import os
+import threading
+import time
 
-import feedparser
+import requests
+
+from src.data.cassette import active_cassette
+from src.data.fetch_pool import process_context
+from src.utils.metrics import metrics
+
+# Entries kept per cached feed; callers slice their own max_items from these
+CACHED_ENTRIES = 25
+
+# Google News queries behind each per-symbol feed
+FEED_QUERIES = {
+    "cnbc": "{symbol} stock site:cnbc.com",
+    "buzz": "{symbol} stock",
+}
 
 @dataclass
 class Headline:
@@ -12,25 +33,341 @@ class Headline:
     link: str
     source: str
 
+GOOGLE_NEWS_BASE = "https://news.google.com"
+
 def google_news_rss(query: str) -> str:
-    return f"https://news.google.com/rss/search?q={quote_plus(query)}&hl=en-US&gl=US&ceid=US:en"
+    base = (os.getenv("NEWS_RSS_BASE_URL") or GOOGLE_NEWS_BASE).rstrip("/")
+    return f"{base}/rss/search?q={quote_plus(query)}&hl=en-US&gl=US&ceid=US:en"
 
-def fetch_google_news(query: str, max_items: int = 5) -> List[Headline]:
-    feed = feedparser.parse(google_news_rss(query))
-    out: List[Headline] = []
-    for entry in feed.entries[:max_items]:
-        title = (entry.get("title") or "").strip()
-        link = (entry.get("link") or "").strip()
+def _raw_entries(feed: Any, limit: int) -> List[Dict[str, str]]:
+    out: List[Dict[str, str]] = []
+    for entry in feed.entries[:limit]:
         source = ""
         if "source" in entry and isinstance(entry["source"], dict):
             source = (entry["source"].get("title") or "").strip()
-        if title and link:
-            out.append(Headline(title=title, link=link, source=source))
+        out.append({
+            "title": (entry.get("title") or "").strip(),
+            "link": (entry.get("link") or "").strip(),
+            "source": source,
+        })
     return out
 
+def _headlines(raw: List[Dict[str, str]], max_items: int) -> List[Headline]:
+    out: List[Headline] = []
+    for e in raw[:max_items]:
+        if e["title"] and e["link"]:
+            out.append(Headline(title=e["title"], link=e["link"], source=e["source"]))
+    return out
+
+
+class NewsCache:
+    """Google News RSS cache keyed by query.
+
+    - within a run, each query is downloaded at most once (concurrent callers wait for
+      the first one)
+    - across runs, a feed younger than `ttl_minutes` is served from disk; older ones are
+      revalidated with If-None-Match / If-Modified-Since, so an unchanged feed costs a 304
+    - if a refresh fails, the last cached copy is served
+
+    With root=None nothing is persisted (in-run de-duplication only).
+    """
+
+    def __init__(self, root: Optional[str | os.PathLike], ttl_minutes: float = 360, timeout: float = 15, pool_size: int = 16):
+        self.root = Path(root) if root is not None else None
+        self.ttl_s = float(ttl_minutes) * 60.0
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (compatible; stockshark-digests)"
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._memo: Dict[str, List[Dict[str, str]]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {"memo_hits": 0, "disk_hits": 0, "not_modified": 0, "downloads": 0, "errors": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _path(self, query: str) -> Path:
+        return self.root / f"{hashlib.sha1(query.encode('utf-8')).hexdigest()}.json"
+
+    def _key_lock(self, query: str) -> threading.Lock:
+        with self._lock:
+            lk = self._locks.get(query)
+            if lk is None:
+                lk = self._locks[query] = threading.Lock()
+            return lk
+
+    def _read(self, query: str) -> Optional[Dict[str, Any]]:
+        if self.root is None:
+            return None
+        try:
+            with self._path(query).open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, query: str, record: Dict[str, Any]) -> None:
+        if self.root is None:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        p = self._path(query)
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, p)
+
+    def entries(self, query: str) -> List[Dict[str, str]]:
+        with self._key_lock(query):
+            raw, record = self.lookup(query)
+            if raw is not None:
+                return raw
+            status, content, headers = self.download(query, record)
+            raw = None
+            if status == 200:
+                raw = _parse_feed(content)
+            return self.commit(query, record, status, raw, headers)
+
+    # The steps below are shared with fetch_news_batch, which downloads and parses
+    # many feeds concurrently.
+
+    def lookup(self, query: str) -> Tuple[Optional[List[Dict[str, str]]], Optional[Dict[str, Any]]]:
+        # (entries, None) when servable without the network, else (None, stale record or None)
+        with self._lock:
+            if query in self._memo:
+                self.stats["memo_hits"] += 1
+                metrics.cache("news", True)
+                return self._memo[query], None
+        record = self._read(query)
+        if record is not None and time.time() - float(record.get("fetched_at", 0)) < self.ttl_s:
+            self._count("disk_hits")
+            metrics.cache("news", True)
+            self._remember(query, record["entries"])
+            return record["entries"], None
+        metrics.cache("news", False)
+        return None, record
+
+    def download(self, query: str, record: Optional[Dict[str, Any]], timeout: Optional[float] = None) -> Tuple[int, bytes, Dict[str, str]]:
+        # (status, body, headers); status 0 means the request itself failed
+        headers = {}
+        if record is not None:
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("modified"):
+                headers["If-Modified-Since"] = record["modified"]
+        tape = active_cassette()
+        if tape is not None:
+            return tape.call("rss", query, None, lambda: self._get(query, headers, timeout))
+        return self._get(query, headers, timeout)
+
+    def _get(self, query: str, headers: Dict[str, str], timeout: Optional[float]) -> Tuple[int, bytes, Dict[str, str]]:
+        try:
+            with metrics.timed("rss/download"):
+                r = self.session.get(google_news_rss(query), headers=headers, timeout=timeout or self.timeout)
+        except Exception:
+            return 0, b"", {}
+        return r.status_code, r.content, dict(r.headers)
+
+    def commit(
+        self,
+        query: str,
+        record: Optional[Dict[str, Any]],
+        status: int,
+        raw: Optional[List[Dict[str, str]]],
+        headers: Dict[str, str],
+    ) -> List[Dict[str, str]]:
+        now = time.time()
+        if status == 304 and record is not None:
+            self._count("not_modified")
+            record["fetched_at"] = now
+            self._write(query, record)
+            return self._remember(query, record["entries"])
+        if status != 200 or raw is None:
+            self._count("errors")
+            return self._remember(query, record["entries"] if record is not None else [])
+
+        self._count("downloads")
+        self._write(query, {
+            "query": query,
+            "fetched_at": now,
+            "etag": headers.get("ETag"),
+            "modified": headers.get("Last-Modified"),
+            "entries": raw,
+        })
+        return self._remember(query, raw)
+
+    def fallback(self, query: str, record: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+        # Feed timed out: serve the stale copy (or nothing) for the rest of this run
+        return self.commit(query, record, 0, None, {})
+
+    def _remember(self, query: str, raw: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        with self._lock:
+            self._memo[query] = raw
+        return raw
+
+
+_cache: Optional[NewsCache] = None
+
+def set_news_cache(cache: Optional[NewsCache]) -> None:
+    # Process-wide cache used by fetch_google_news (None = always download)
+    global _cache
+    _cache = cache
+
+def fetch_google_news(query: str, max_items: int = 5) -> List[Headline]:
+    if _cache is not None:
+        return _headlines(_cache.entries(query), max_items)
+    if active_cassette() is not None:
+        # Uncached fetches go through a throwaway cache so the tape sees the bytes
+        return _headlines(NewsCache(None).entries(query), max_items)
+    import feedparser
+
+    with metrics.timed("rss/download"):
+        feed = feedparser.parse(google_news_rss(query))
+    return _headlines(_raw_entries(feed, max_items), max_items)
+
 def fetch_cnbc_mentions(symbol: str, max_items: int = 5) -> List[Headline]:
     # CNBC itself blocks many automated requests; this uses Google News RSS as the aggregator.
-    return fetch_google_news(f"{symbol} stock site:cnbc.com", max_items=max_items)
+    return fetch_google_news(FEED_QUERIES["cnbc"].format(symbol=symbol), max_items=max_items)
 
 def fetch_web_buzz(symbol: str, max_items: int = 5) -> List[Headline]:
-    return fetch_google_news(f"{symbol} stock", max_items=max_items)
+    return fetch_google_news(FEED_QUERIES["buzz"].format(symbol=symbol), max_items=max_items)
+
+
+def _parse_feed(content: bytes) -> List[Dict[str, str]]:
+    # Runs in a worker process: bytes in, plain dicts out (both pickle cheaply).
+    # feedparser is imported on first use, so runs that parse no feeds never load it.
+    import feedparser
+
+    return _raw_entries(feedparser.parse(content), CACHED_ENTRIES)
+
+
+def _parse_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    # Only for callers without a run-scoped pool (FetchPool.processes); lives for one batch
+    if workers <= 0:
+        return None
+    try:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=process_context())
+    except (OSError, NotImplementedError, ValueError):
+        return None
+
+
+def _submit(parsing: Dict[cf.Future, Any], parser: Optional[Executor], content: bytes, key: Any) -> bool:
+    # False without a pool or when it broke (a worker died); the caller then parses in-thread
+    if parser is None:
+        return False
+    try:
+        parsing[parser.submit(_parse_feed, content)] = key
+        return True
+    except RuntimeError:
+        return False
+
+
+def fetch_news_batch(
+    symbols: List[str],
+    max_items: int = 5,
+    feeds: Tuple[str, ...] = ("cnbc", "buzz"),
+    max_workers: int = 8,
+    parse_workers: int = 2,
+    feed_timeout: float = 10.0,
+    batch_timeout: float = 45.0,
+    cache: Optional[NewsCache] = None,
+    parser: Optional[Executor] = None,
+) -> Dict[str, Dict[str, List[Headline]]]:
+    """Headlines for many symbols at once: {symbol: {feed: [Headline, ...]}}.
+
+    Feeds not servable from the cache are downloaded concurrently over one pooled
+    session and their bytes parsed in `parser` (a run's process pool), or else in
+    `parse_workers` processes started for this batch (0 = parse in the download threads).
+    Each request gets `feed_timeout` seconds and the whole batch `batch_timeout`; a feed
+    that misses either yields its stale cached copy or [].
+
+    A query another fetch (a batch or entries()) is already downloading is not downloaded
+    again: its result is read once that fetch commits it.
+    """
+    cache = cache or _cache or NewsCache(None, timeout=feed_timeout, pool_size=max_workers)
+    wanted = {(sym, feed): FEED_QUERIES[feed].format(symbol=sym) for sym in symbols for feed in feeds}
+
+    raw: Dict[str, List[Dict[str, str]]] = {}
+    stale: Dict[str, Optional[Dict[str, Any]]] = {}
+    held: List[threading.Lock] = []
+    busy: List[str] = []
+    try:
+        for query in dict.fromkeys(wanted.values()):
+            lock = cache._key_lock(query)
+            if not lock.acquire(blocking=False):
+                busy.append(query)
+                continue
+            held.append(lock)
+            hit, record = cache.lookup(query)
+            if hit is not None:
+                raw[query] = hit
+                held.pop().release()
+            else:
+                stale[query] = record
+        _fetch_stale(cache, stale, raw, max_workers, parse_workers, feed_timeout, batch_timeout, parser)
+    finally:
+        for lock in held:
+            lock.release()
+    for query in busy:
+        # Waits for the fetch holding the query, then serves what it committed from memory
+        raw[query] = cache.entries(query)
+
+    out: Dict[str, Dict[str, List[Headline]]] = {sym: {} for sym in symbols}
+    for (sym, feed), query in wanted.items():
+        out[sym][feed] = _headlines(raw.get(query, []), max_items)
+    return out
+
+
+def _fetch_stale(
+    cache: NewsCache,
+    stale: Dict[str, Optional[Dict[str, Any]]],
+    raw: Dict[str, List[Dict[str, str]]],
+    max_workers: int,
+    parse_workers: int,
+    feed_timeout: float,
+    batch_timeout: float,
+    parser: Optional[Executor],
+) -> None:
+    # Downloads, parses and commits the queries fetch_news_batch holds the locks of, into `raw`
+    if not stale:
+        return
+    deadline = time.monotonic() + batch_timeout
+    own_parser = parser is None
+    if own_parser:
+        parser = _parse_pool(parse_workers)
+    downloader = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    parsing: Dict[cf.Future, Tuple[str, Dict[str, str]]] = {}
+    try:
+        downloads = {downloader.submit(cache.download, q, rec, feed_timeout): q for q, rec in stale.items()}
+        try:
+            for fut in cf.as_completed(downloads, timeout=max(0.0, deadline - time.monotonic())):
+                q = downloads[fut]
+                status, content, headers = fut.result()
+                if status != 200:
+                    raw[q] = cache.commit(q, stale[q], status, None, headers)
+                elif not _submit(parsing, parser, content, (q, headers)):
+                    raw[q] = cache.commit(q, stale[q], status, _parse_feed(content), headers)
+        except cf.TimeoutError:
+            pass
+        try:
+            for fut in cf.as_completed(parsing, timeout=max(0.0, deadline - time.monotonic())):
+                q, headers = parsing[fut]
+                try:
+                    raw[q] = cache.commit(q, stale[q], 200, fut.result(), headers)
+                except Exception:
+                    raw[q] = cache.fallback(q, stale[q])
+        except cf.TimeoutError:
+            pass
+    finally:
+        # Don't wait for stragglers: their feeds already fell back below
+        downloader.shutdown(wait=False, cancel_futures=True)
+        for fut in parsing:
+            fut.cancel()
+        if own_parser and parser is not None:
+            parser.shutdown(wait=False, cancel_futures=True)
+    for q in stale:
+        if q not in raw:
+            metrics.error("rss/batch", TimeoutError(f"{q!r} missed the {batch_timeout:g}s batch deadline"))
+            raw[q] = cache.fallback(q, stale[q])
@@ -0,0 +1,322 @@
+"""Memory-mapped universe price panel: every stored symbol's daily bars in one file.
+
+    <dir>/panel.f64    float64 rows in date order; row i = o, h, l, c, v for every column
+    <dir>/panel.json   sidecar: symbols (column order), the column capacity, the epoch day of each
+                       row, and per symbol the store's since/checked days (what the panel can answer for it)
+
+    python -m src.data.price_panel     append the store's new sessions and symbols
+
+Readers map the file read-only, so processes opening the same panel share one copy through the
+page cache. A (dates x symbols) field is a strided view; one symbol's history is a view unless
+it has gaps. Appending a session writes one row and rewrites only the sidecar. A build leaves
+spare columns: symbols that reach the store later are written into them, and symbols dropped
+from the store only lose their sidecar entry's since/checked. The file is rebuilt when the spare
+columns run out or the rows span twice the `days` window.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import json
+import os
+
+import numpy as np
+
+from src.data.market import PriceHistory
+from src.data.price_store import COLUMNS, PriceStore, StoredHistory, from_epoch_day, to_epoch_day
+
+DATA_FILE = "panel.f64"
+META_FILE = "panel.json"
+FIELDS = COLUMNS
+_ITEM = np.dtype(np.float64).itemsize
+_NEVER = np.iinfo(np.int64).max
+SPARE_COLUMNS = 0.25  # spare columns a build leaves, as a share of its symbols (at least 64)
+
+
+class PricePanel:
+    def __init__(
+        self,
+        root: str | os.PathLike,
+        symbols: List[str],
+        days: np.ndarray,
+        start: int,
+        since: Optional[np.ndarray] = None,
+        checked: Optional[np.ndarray] = None,
+        capacity: Optional[int] = None,
+    ):
+        self.root = Path(root)
+        self.symbols = list(symbols)
+        self.index: Dict[str, int] = {s: j for j, s in enumerate(self.symbols)}
+        self.days = np.asarray(days, dtype=np.int64)
+        self.start = int(start)  # first epoch day of the build window
+        self.capacity = max(len(self.symbols), int(capacity or 0))  # columns in the file
+        # Per symbol, as in StoredHistory: first day requested from the provider, last session asked about
+        self.since = np.asarray(since if since is not None else np.full(len(self.symbols), _NEVER), dtype=np.int64)
+        self.checked = np.asarray(checked if checked is not None else np.full(len(self.symbols), -1), dtype=np.int64)
+        self._data: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def row_bytes(self) -> int:
+        return len(FIELDS) * self.capacity * _ITEM
+
+    @property
+    def last_day(self) -> Optional[int]:
+        return int(self.days[-1]) if len(self.days) else None
+
+    @property
+    def data(self) -> np.ndarray:
+        # (days, fields, symbols), mapped on first use; spare columns are left out
+        if self._data is None:
+            shape = (len(self.days), len(FIELDS), self.capacity)
+            if not len(self.days) or not self.symbols:
+                return np.empty(shape[:2] + (len(self.symbols),))
+            self._data = np.memmap(self.root / DATA_FILE, dtype=np.float64, mode="r", shape=shape)
+        return self._data[:, :, : len(self.symbols)]
+
+    @classmethod
+    def open(cls, root: str | os.PathLike) -> Optional["PricePanel"]:
+        # None when there is no panel, or its files don't agree (interrupted rebuild)
+        root = Path(root)
+        try:
+            meta = json.loads((root / META_FILE).read_text(encoding="utf-8"))
+            panel = cls(
+                root, meta["symbols"], meta["days"], meta["start"], meta["since"], meta["checked"],
+                meta.get("capacity"),
+            )
+            size = (root / DATA_FILE).stat().st_size
+        except (OSError, KeyError, ValueError):
+            return None
+        if size < len(panel) * panel.row_bytes:
+            return None
+        return panel
+
+    def holds(self, symbol: str, start: date, session: date) -> bool:
+        # What the price store would serve without a fetch: covers `start` and is fresh for `session`
+        j = self.index.get(symbol.upper())
+        return j is not None and self.since[j] <= to_epoch_day(start) and self.checked[j] >= to_epoch_day(session)
+
+    def rows(self, start: Optional[date] = None, end: Optional[date] = None) -> slice:
+        lo = int(np.searchsorted(self.days, to_epoch_day(start), side="left")) if start else 0
+        hi = int(np.searchsorted(self.days, to_epoch_day(end), side="right")) if end else len(self.days)
+        return slice(lo, hi)
+
+    def field(self, name: str, start: Optional[date] = None, end: Optional[date] = None) -> np.ndarray:
+        """(dates x symbols) view of one field; NaN where a symbol has no bar."""
+        return self.data[self.rows(start, end), FIELDS.index(name), :]
+
+    def history(self, symbol: str, start: Optional[date] = None) -> Optional[PriceHistory]:
+        """One symbol's bars from `start` on: views on the map, copied only when it has gaps."""
+        j = self.index.get(symbol.upper())
+        if j is None:
+            return None
+        r = self.rows(start)
+        block = self.data[r, :, j]
+        t = self.days[r]
+        has_bar = ~np.isnan(block[:, FIELDS.index("c")])
+        if not has_bar.all():
+            block, t = block[has_bar], t[has_bar]
+        return PriceHistory(symbol, t, *(block[:, i] for i in range(len(FIELDS))))
+
+    def _write_meta(self) -> None:
+        p = self.root / META_FILE
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+        meta = {
+            "symbols": self.symbols, "capacity": self.capacity, "days": self.days.tolist(), "start": self.start,
+            "since": self.since.tolist(), "checked": self.checked.tolist(),
+        }
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, p)
+
+    def append_day(self, day: int, bars: Dict[str, Any]) -> None:
+        """Write one session: bars maps symbol -> (o, h, l, c, v); absent symbols get NaN."""
+        if self.last_day is not None and day <= self.last_day:
+            raise ValueError(f"{from_epoch_day(day)} is not after the panel's last day {from_epoch_day(self.last_day)}")
+        row = np.full((len(FIELDS), self.capacity), np.nan)
+        for sym, values in bars.items():
+            j = self.index.get(sym.upper())
+            if j is not None:
+                row[:, j] = values
+        self._data = None
+        # Past the last committed row: an interrupted append leaves bytes the sidecar ignores
+        with (self.root / DATA_FILE).open("r+b") as f:
+            f.seek(len(self.days) * self.row_bytes)
+            f.write(row.tobytes())
+            f.truncate()
+        self.days = np.append(self.days, np.int64(day))
+        self._write_meta()
+
+    def update(self, store: PriceStore) -> int:
+        """Append every session the store holds after the panel's last day; returns sessions added."""
+        last = self.last_day if self.last_day is not None else self.start - 1
+        by_day: Dict[int, Dict[str, np.ndarray]] = {}
+        checked = self.checked.copy()
+        for j, sym in enumerate(self.symbols):
+            hist = store.load(sym)
+            if hist is None:
+                continue
+            i = int(np.searchsorted(hist.t, last, side="right"))
+            for k in range(i, len(hist.t)):
+                by_day.setdefault(int(hist.t[k]), {})[sym] = np.array([getattr(hist, col)[k] for col in FIELDS])
+            if int(np.searchsorted(hist.t, checked[j], side="right")) < i:
+                # Bars stored since the symbol was last checked landed on rows already written:
+                # the panel can't answer for it until the next rebuild
+                self.since[j] = _NEVER
+            else:
+                checked[j] = max(checked[j], _checked(hist))
+        for day in sorted(by_day):
+            self.append_day(day, by_day[day])
+        self.checked = checked
+        self._write_meta()
+        return len(by_day)
+
+    def drop(self, symbols: Iterable[str]) -> None:
+        """Stop answering for `symbols` (gone from the store); their columns stay until the next rebuild."""
+        for sym in symbols:
+            j = self.index.get(sym.upper())
+            if j is not None:
+                self.since[j], self.checked[j] = _NEVER, -1
+        self._write_meta()
+
+    def add(self, store: PriceStore, symbols: Iterable[str]) -> List[str]:
+        """Write new symbols' stored bars into spare columns, and rewrite the columns of symbols
+        the panel can't answer for; returns the new symbols left over when the spares run out.
+
+        Only bars on the panel's existing rows are written (update() appends later sessions);
+        a symbol with a bar on any other day stays unanswered until the next rebuild.
+        """
+        targets: List[Tuple[int, str]] = []
+        left: List[str] = []
+        for sym in dict.fromkeys(s.upper() for s in symbols):
+            j = self.index.get(sym)
+            if j is None:
+                if len(self.symbols) >= self.capacity:
+                    left.append(sym)
+                    continue
+                j = self.index[sym] = len(self.symbols)
+                self.symbols.append(sym)
+                self.since = np.append(self.since, _NEVER)
+                self.checked = np.append(self.checked, -1)
+            targets.append((j, sym))
+        if not targets:
+            return left
+        through = self.last_day if self.last_day is not None else self.start - 1
+        self._data = None
+        out = None
+        if len(self.days):
+            shape = (len(self.days), len(FIELDS), self.capacity)
+            out = np.memmap(self.root / DATA_FILE, dtype=np.float64, mode="r+", shape=shape)
+        for j, sym in targets:
+            self.since[j], self.checked[j] = _NEVER, -1
+            if out is not None:
+                out[:, :, j] = np.nan
+            hist = store.load(sym)
+            if hist is None:
+                continue
+            w = hist.window(from_epoch_day(self.start))
+            on_rows = w["t"] <= through
+            rows = np.searchsorted(self.days, w["t"][on_rows])
+            if not np.array_equal(self.days[rows], w["t"][on_rows]):
+                continue
+            if out is not None:
+                for i, col in enumerate(FIELDS):
+                    out[rows, i, j] = w[col][on_rows]
+            # Answer for it through the last row; update() takes it from there
+            self.since[j], self.checked[j] = max(hist.since, self.start), min(_checked(hist), through)
+        if out is not None:
+            out.flush()
+            del out
+        self._write_meta()
+        return left
+
+    @classmethod
+    def build(cls, root: str | os.PathLike, store: PriceStore, symbols: Iterable[str], start: date) -> "PricePanel":
+        """A new panel of `symbols` from `start` on, filled from the price store."""
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        # Two passes so only one symbol's bars are in memory at a time: the dates, then the values
+        stamps = [np.empty(0, dtype=np.int64)]
+        since, checked = np.full(len(symbols), _NEVER), np.full(len(symbols), -1)
+        for j, (hist, w) in enumerate(_windows(store, symbols, start)):
+            stamps.append(w["t"])
+            if hist is not None:
+                since[j], checked[j] = max(hist.since, to_epoch_day(start)), _checked(hist)
+        capacity = len(symbols) + max(64, int(len(symbols) * SPARE_COLUMNS))
+        panel = cls(root, symbols, np.unique(np.concatenate(stamps)), to_epoch_day(start), since, checked, capacity)
+        days = panel.days
+        tmp = root / f"{DATA_FILE}.{os.getpid()}.tmp"
+        if len(days):
+            out = np.memmap(tmp, dtype=np.float64, mode="w+", shape=(len(days), len(FIELDS), capacity))
+            out[:] = np.nan
+            for j, (_, w) in enumerate(_windows(store, symbols, start)):
+                rows = np.searchsorted(days, w["t"])
+                for i, col in enumerate(FIELDS):
+                    out[rows, i, j] = w[col]
+            out.flush()
+            del out
+        else:
+            tmp.write_bytes(b"")
+        os.replace(tmp, root / DATA_FILE)
+        panel._write_meta()
+        return panel
+
+
+def _checked(hist: StoredHistory) -> int:
+    return max(hist.checked, hist.last_day if hist.last_day is not None else -1)
+
+
+def _windows(store: PriceStore, symbols: List[str], start: date) -> Iterator[Tuple[Optional[StoredHistory], Dict[str, np.ndarray]]]:
+    empty = {"t": np.empty(0, dtype=np.int64), **{col: np.empty(0) for col in FIELDS}}
+    for sym in symbols:
+        hist = store.load(sym)
+        yield hist, (hist.window(start) if hist is not None else empty)
+
+
+def refresh_panel(root: str | os.PathLike, store: PriceStore, days: int, today: Optional[date] = None) -> PricePanel:
+    """Bring the panel up to the store: drop symbols the store no longer holds, fill new ones
+    into spare columns and append new sessions. Rebuilds when the spare columns run out or the
+    panel holds more than twice its `days` window."""
+    start = (today or date.today()) - timedelta(days=days)
+    symbols = store.symbols()
+    panel = PricePanel.open(root)
+    if panel is None or panel.start < to_epoch_day(start - timedelta(days=days)):
+        return PricePanel.build(root, store, symbols, start)
+    stored = set(symbols)
+    gone = [s for j, s in enumerate(panel.symbols) if s not in stored and panel.checked[j] >= 0]
+    if gone:
+        panel.drop(gone)
+    # New symbols, and stored ones the panel stopped answering for
+    unanswered = [s for j, s in enumerate(panel.symbols) if s in stored and panel.since[j] == _NEVER]
+    if panel.add(store, [s for s in symbols if s not in panel.index] + unanswered):
+        return PricePanel.build(root, store, symbols, start)
+    panel.update(store)
+    return panel
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from src.utils.config import load_yaml
+
+    parser = argparse.ArgumentParser(prog="python -m src.data.price_panel")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild instead of appending new sessions")
+    args = parser.parse_args(argv)
+
+    settings = load_yaml("configs/settings.yml")
+    cache_dir = (settings.get("cache", {}) or {}).get("dir", ".cache")
+    days = int((settings.get("panel", {}) or {}).get("days", 400))
+    root = os.path.join(cache_dir, "panel")
+    store = PriceStore(os.path.join(cache_dir, "prices"))
+    if args.rebuild:
+        panel = PricePanel.build(root, store, store.symbols(), date.today() - timedelta(days=days))
+    else:
+        panel = refresh_panel(root, store, days)
+    last = from_epoch_day(panel.last_day) if panel.last_day is not None else "-"
+    print(f"price panel: {len(panel.symbols)} symbols x {len(panel)} sessions through {last} ({root})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import os
+import threading
+
+import numpy as np
+
+
+EPOCH = date(1970, 1, 1)
+COLUMNS = ("o", "h", "l", "c", "v")
+
+
+def to_epoch_day(d: date) -> int:
+    return (d - EPOCH).days
+
+
+def from_epoch_day(n: int) -> date:
+    return EPOCH + timedelta(days=int(n))
+
+
+@dataclass
+class StoredHistory:
+    t: np.ndarray  # int64 epoch days, ascending, unique
+    o: np.ndarray
+    h: np.ndarray
+    l: np.ndarray
+    c: np.ndarray
+    v: np.ndarray
+    since: int     # first epoch day that has been requested from the provider
+    checked: int   # last session (epoch day) the stored bars are complete through
+
+    @property
+    def last_day(self) -> Optional[int]:
+        return int(self.t[-1]) if len(self.t) else None
+
+    def covers(self, start: date) -> bool:
+        return self.since <= to_epoch_day(start)
+
+    def is_fresh(self, session: date) -> bool:
+        # Fresh when we already hold the last completed session's bar, or that session is
+        # known to have none (holidays / halted names, once the bar had time to publish).
+        s = to_epoch_day(session)
+        last = self.last_day
+        return (last is not None and last >= s) or self.checked >= s
+
+    def window(self, start: date) -> Dict[str, np.ndarray]:
+        # t and COLUMNS from `start` on, copied so callers don't pin the whole stored history
+        i = int(np.searchsorted(self.t, to_epoch_day(start), side="left"))
+        return {"t": self.t[i:].copy(), **{col: getattr(self, col)[i:].copy() for col in COLUMNS}}
+
+
+def merge_arrays(cached: Optional[StoredHistory], new: Optional[Dict[str, np.ndarray]], since: int, checked: int) -> StoredHistory:
+    # New rows win over cached rows for the same day (providers occasionally revise the last bar).
+    # `new` holds t (ascending, unique epoch days) and COLUMNS; since/checked are epoch days.
+    if new is not None and not len(new["t"]):
+        new = None
+    since_n, checked_n = int(since), int(checked)
+
+    if cached is None:
+        if new is None:
+            empty = np.empty(0, dtype=np.float64)
+            return StoredHistory(np.empty(0, dtype=np.int64), empty, empty, empty, empty, empty, since_n, checked_n)
+        return StoredHistory(since=since_n, checked=checked_n, **new)
+
+    since_n = min(since_n, cached.since)
+    checked_n = max(checked_n, cached.checked)
+    if new is None:
+        return StoredHistory(cached.t, cached.o, cached.h, cached.l, cached.c, cached.v, since_n, checked_n)
+
+    keep = ~np.isin(cached.t, new["t"])
+    t = np.concatenate([cached.t[keep], new["t"]])
+    order = np.argsort(t, kind="stable")
+    cols = {col: np.concatenate([getattr(cached, col)[keep], new[col]])[order] for col in COLUMNS}
+    return StoredHistory(t=t[order], since=since_n, checked=checked_n, **cols)
+
+
+class PriceStore:
+    """On-disk daily OHLCV store: one compressed columnar .npz file per symbol."""
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+
+    def _path(self, symbol: str) -> Path:
+        # Symbols like BRK.B or BF-B are fine as file names; keep them readable.
+        safe = symbol.upper().replace("/", "_")
+        return self.root / f"{safe}.npz"
+
+    def load(self, symbol: str) -> Optional[StoredHistory]:
+        p = self._path(symbol)
+        if not p.exists():
+            return None
+        try:
+            with np.load(p, allow_pickle=False) as z:
+                return StoredHistory(
+                    t=z["t"], o=z["o"], h=z["h"], l=z["l"], c=z["c"], v=z["v"],
+                    since=int(z["since"]), checked=int(z["checked"]),
+                )
+        except Exception:
+            # Corrupt / partial file: behave as a cache miss
+            return None
+
+    def save(self, symbol: str, hist: StoredHistory) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        p = self._path(symbol)
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("wb") as f:
+            np.savez_compressed(
+                f, t=hist.t, o=hist.o, h=hist.h, l=hist.l, c=hist.c, v=hist.v,
+                since=np.int64(hist.since), checked=np.int64(hist.checked),
+            )
+        os.replace(tmp, p)
+
+    def symbols(self) -> List[str]:
+        # Every stored symbol, sorted
+        if not self.root.exists():
+            return []
+        return sorted(p.stem for p in self.root.glob("*.npz"))
+
+    def invalidate(self, symbol: str) -> None:
+        try:
+            self._path(symbol).unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import threading
+
+from src.data.fetch_pool import FetchPool
+from src.data.finnhub_async import run_with_async_client
+from src.data.finnhub_client import FinnhubClient
+from src.data.fundamentals import FundamentalSnapshot, fetch_fundamentals_many
+from src.data.fundamentals_store import FundamentalsStore
+from src.data.market import PriceHistory, fetch_daily_history, fetch_quotes_async, history_window, slice_history
+from src.data.news import CACHED_ENTRIES, Headline, fetch_news_batch
+from src.data.price_panel import PricePanel
+from src.data.price_store import PriceStore
+from src.utils.dates import last_completed_session
+from src.utils.metrics import metrics
+
+
+class SingleFlight:
+    """Run-scoped memo: the first caller for a key computes it, concurrent callers for the
+    same key wait for that result, later callers get it from memory.
+
+    `calls` counts keys actually computed, `saved` the requests served without a call.
+    """
+
+    def __init__(self):
+        self._futures: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.saved = 0
+
+    def get_many(self, keys: List[Hashable], compute: Callable[[List[Hashable]], List[Any]]) -> List[Any]:
+        # compute() receives only the keys nobody has claimed yet and returns their values in order
+        owned: List[Tuple[Hashable, Future]] = []
+        futures: List[Future] = []
+        with self._lock:
+            for k in keys:
+                fut = self._futures.get(k)
+                if fut is None:
+                    fut = self._futures[k] = Future()
+                    owned.append((k, fut))
+                    self.calls += 1
+                else:
+                    self.saved += 1
+                futures.append(fut)
+        if owned:
+            try:
+                values = compute([k for k, _ in owned])
+            except BaseException as e:
+                for _, fut in owned:
+                    fut.set_exception(e)
+                raise
+            for (_, fut), v in zip(owned, values):
+                fut.set_result(v)
+        return [f.result() for f in futures]
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        return self.get_many([key], lambda _: [compute()])[0]
+
+
+class RunContext:
+    """Every provider call one digest run makes, memoized for the rest of the run.
+
+    Histories are kept at the widest lookback requested so far: a narrower request (the
+    screener's 45 days after the signals' 120) is sliced from memory, a wider one refetches
+    (incrementally, through the price store). With a price panel, symbols it is current for
+    are read from the mapped panel instead of the store. Quotes, fundamentals and news are memoized
+    per symbol. report() gives calls made vs. duplicate requests saved per provider.
+    """
+
+    def __init__(
+        self,
+        client: FinnhubClient,
+        pool: FetchPool,
+        price_store: Optional[PriceStore] = None,
+        fundamentals_store: Optional[FundamentalsStore] = None,
+        finnhub_concurrency: int = 32,
+        news_options: Optional[Dict[str, Any]] = None,
+        panel: Optional[PricePanel] = None,
+    ):
+        self.client = client
+        self.pool = pool
+        self.price_store = price_store
+        self.fundamentals_store = fundamentals_store
+        self.finnhub_concurrency = finnhub_concurrency
+        self.news_options = dict(news_options or {})
+        self.panel = panel
+        self._session = last_completed_session()
+        self._panel_skip: set = set()
+
+        self._histories: Dict[str, Tuple[int, Optional[PriceHistory]]] = {}
+        self._history_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.history_stats = {"calls": 0, "saved": 0, "panel": 0}
+        self._quotes = SingleFlight()
+        self._fundamentals = SingleFlight()
+        self._news = SingleFlight()
+
+    def _history_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            lk = self._history_locks.get(symbol)
+            if lk is None:
+                lk = self._history_locks[symbol] = threading.Lock()
+            return lk
+
+    def history(self, symbol: str, lookback_days: int) -> Optional[PriceHistory]:
+        with self._history_lock(symbol):
+            held = self._histories.get(symbol)
+            if held is not None and held[0] >= lookback_days:
+                with self._lock:
+                    self.history_stats["saved"] += 1
+                return held[1] if held[0] == lookback_days else slice_history(held[1], lookback_days)
+            served, hist = self._panel_history(symbol, lookback_days)
+            if not served:
+                hist = fetch_daily_history(self.client, symbol, lookback_days=lookback_days, store=self.price_store)
+            with self._lock:
+                self.history_stats["panel" if served else "calls"] += 1
+            self._histories[symbol] = (lookback_days, hist)
+            return hist
+
+    def _panel_history(self, symbol: str, lookback_days: int) -> Tuple[bool, Optional[PriceHistory]]:
+        # (served, history): what fetch_daily_history would return, when the panel can answer
+        if self.panel is None or symbol in self._panel_skip:
+            return False, None
+        start, _ = history_window(lookback_days)
+        if not self.panel.holds(symbol, start, self._session):
+            return False, None
+        metrics.cache("prices", True)
+        hist = self.panel.history(symbol, start)
+        return True, (hist if hist is not None and len(hist) >= 30 else None)
+
+    def invalidate_prices(self, symbols: List[str]) -> None:
+        # Drop stored prices (store and panel) for symbols whose ticker changed hands
+        for sym in symbols:
+            if self.price_store is not None:
+                self.price_store.invalidate(sym)
+            with self._lock:
+                self._panel_skip.add(sym)
+
+    def histories(self, symbols: List[str], lookback_days: int) -> List[Optional[PriceHistory]]:
+        return self.pool.map("stooq", lambda s: self.history(s, lookback_days), symbols)
+
+    def quotes(self, symbols: List[str]) -> Dict[str, Dict]:
+        def compute(missing: List[str]) -> List[Dict]:
+            got = run_with_async_client(
+                self.client, lambda ac: fetch_quotes_async(ac, missing), max_concurrency=self.finnhub_concurrency
+            )
+            return [got.get(s, {}) for s in missing]
+
+        return dict(zip(symbols, self._quotes.get_many(symbols, compute)))
+
+    def fundamentals(self, symbols: List[str]) -> List[Optional[FundamentalSnapshot]]:
+        return self._fundamentals.get_many(
+            symbols,
+            lambda missing: fetch_fundamentals_many(
+                self.client, missing, self.finnhub_concurrency, self.fundamentals_store
+            ),
+        )
+
+    def news(self, symbols: List[str], max_items: int) -> Dict[str, Dict[str, List[Headline]]]:
+        # Keyed by symbol alone so stages asking for different max_items share one fetch: it
+        # takes every headline the cache keeps and each caller slices its own max_items
+        def compute(missing: List[str]) -> List[Dict[str, List[Headline]]]:
+            got = fetch_news_batch(missing, max_items=CACHED_ENTRIES, **self.news_options)
+            return [got[s] for s in missing]
+
+        held = self._news.get_many(list(symbols), compute)
+        return {s: {feed: items[:max_items] for feed, items in h.items()} for s, h in zip(symbols, held)}
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "history": dict(self.history_stats),
+            "quotes": {"calls": self._quotes.calls, "saved": self._quotes.saved},
+            "fundamentals": {"calls": self._fundamentals.calls, "saved": self._fundamentals.saved},
+            "news": {"calls": self._news.calls, "saved": self._news.saved},
+        }
@@ -0,0 +1,280 @@
+"""Native Stooq daily-bar provider: single-symbol CSVs and the bulk daily archives.
+
+    python -m src.data.stooq ingest d_us_txt.zip            load a downloaded archive into the price store
+    python -m src.data.stooq ingest https://stooq.com/db/d/?b=d_us_txt
+
+Both formats are parsed by pandas' C CSV reader straight into typed column arrays (int64 epoch
+days, float64 OHLCV); no per-row Python work and no DataFrame survives parsing.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import argparse
+import io
+import os
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.data.cassette import active_cassette
+from src.data.finnhub_client import backoff_delay
+from src.data.price_store import COLUMNS, PriceStore, merge_arrays, to_epoch_day
+
+STOOQ_BASE = "https://stooq.com"
+DAILY_PATH = "/q/d/l/"
+BULK_URL = f"{STOOQ_BASE}/db/d/?b=d_us_txt"
+
+# Single-symbol CSV header, and the bulk files' header (one file per symbol)
+CSV_COLUMNS = ("Date", "Open", "High", "Low", "Close", "Volume")
+BULK_COLUMNS = ("<DATE>", "<OPEN>", "<HIGH>", "<LOW>", "<CLOSE>", "<VOL>")
+# Bulk archives keep US listings under data/daily/us/<market>/<n>/<symbol>.us.txt
+BULK_SUFFIX = ".us.txt"
+
+
+class StooqError(RuntimeError):
+    """Stooq answered something other than daily bars (rate limit page, HTTP error, transport error)."""
+
+
+def stooq_base_url() -> str:
+    # STOOQ_BASE_URL points the provider at a stand-in server
+    return (os.getenv("STOOQ_BASE_URL") or STOOQ_BASE).rstrip("/")
+
+
+def to_stooq_symbol(symbol: str) -> str:
+    # Stooq uses ".us" for US stocks/ETFs: AMZN -> amzn.us
+    return f"{symbol.lower()}.us"
+
+
+def from_stooq_symbol(name: str) -> str:
+    # amzn.us / amzn.us.txt -> AMZN
+    name = name.rsplit("/", 1)[-1].lower()
+    for suffix in (".txt", ".us"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return name.upper()
+
+
+@dataclass
+class DailyBars:
+    t: np.ndarray  # int64 epoch days, ascending, unique
+    o: np.ndarray
+    h: np.ndarray
+    l: np.ndarray
+    c: np.ndarray
+    v: np.ndarray  # NaN where Stooq has no volume (indices)
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {"t": self.t, **{col: getattr(self, col) for col in COLUMNS}}
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"t": pd.to_datetime(self.t, unit="D", utc=True), **{col: getattr(self, col) for col in COLUMNS}})
+
+
+def empty_bars() -> DailyBars:
+    empty = np.empty(0, dtype=np.float64)
+    return DailyBars(np.empty(0, dtype=np.int64), empty, empty, empty, empty, empty)
+
+
+def days_from_civil(ymd: np.ndarray) -> np.ndarray:
+    """YYYYMMDD integers -> int64 epoch days (proleptic Gregorian), vectorized."""
+    ymd = np.asarray(ymd, dtype=np.int64)
+    y, m, d = ymd // 10000, ymd // 100 % 100, ymd % 100
+    y = y - (m <= 2)
+    era = np.floor_divide(y, 400)
+    yoe = y - era * 400
+    doy = (153 * ((m + 9) % 12) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _bars(t: np.ndarray, cols: Dict[str, np.ndarray]) -> DailyBars:
+    # Drop rows without a close, then make days ascending and unique (the later row wins)
+    keep = ~np.isnan(cols["c"])
+    if not keep.all():
+        t, cols = t[keep], {k: a[keep] for k, a in cols.items()}
+    if len(t) > 1 and not (np.diff(t) > 0).all():
+        order = np.argsort(t, kind="stable")
+        t, cols = t[order], {k: a[order] for k, a in cols.items()}
+        last = np.append(t[1:] != t[:-1], True)
+        t, cols = t[last], {k: a[last] for k, a in cols.items()}
+    return DailyBars(t=t, **cols)
+
+
+def parse_daily_csv(data: bytes) -> DailyBars:
+    """A /q/d/l/ response: "Date,Open,High,Low,Close[,Volume]" rows, or "No data"."""
+    head = data[:64].lstrip().lower()
+    if not head.startswith(b"date,"):
+        if not head or head.startswith(b"no data"):
+            return empty_bars()
+        raise StooqError(data[:200].decode("utf-8", errors="replace").strip())
+    present = data[: data.find(b"\n") if b"\n" in data else len(data)].decode("utf-8").strip().split(",")
+    usecols = [c for c in CSV_COLUMNS if c in present]
+    df = pd.read_csv(
+        io.BytesIO(data), engine="c", usecols=usecols,
+        dtype={c: (object if c == "Date" else np.float64) for c in usecols},
+    )
+    t = df["Date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    cols = {
+        col: (df[name].to_numpy(dtype=np.float64) if name in df else np.full(len(df), np.nan))
+        for col, name in zip(COLUMNS, CSV_COLUMNS[1:])
+    }
+    return _bars(t, cols)
+
+
+def parse_bulk_txt(data: bytes) -> DailyBars:
+    """One archive member: "<TICKER>,<PER>,<DATE>,<TIME>,<OPEN>,<HIGH>,<LOW>,<CLOSE>,<VOL>,<OPENINT>"."""
+    if not data.strip():
+        return empty_bars()
+    df = pd.read_csv(
+        io.BytesIO(data), engine="c", usecols=list(BULK_COLUMNS),
+        dtype={c: (np.int64 if c == "<DATE>" else np.float64) for c in BULK_COLUMNS},
+    )
+    t = days_from_civil(df["<DATE>"].to_numpy())
+    return _bars(t, {col: df[name].to_numpy() for col, name in zip(COLUMNS, BULK_COLUMNS[1:])})
+
+
+class StooqClient:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: int = 20,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        pool_size: int = 8,
+    ):
+        self.base_url = (base_url or stooq_base_url()).rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def daily(self, symbol: str, start: date, end: date) -> DailyBars:
+        """Daily bars for [start, end]; empty when Stooq has none. Raises StooqError."""
+        params = {"s": to_stooq_symbol(symbol), "i": "d", "d1": start.strftime("%Y%m%d"), "d2": end.strftime("%Y%m%d")}
+        tape = active_cassette()
+        if tape is None:
+            status, body, _ = self._fetch(DAILY_PATH, params)
+        else:
+            status, body, _ = tape.call("stooq", DAILY_PATH, params, lambda: self._fetch(DAILY_PATH, params))
+        if status != 200:
+            raise StooqError(f"{symbol}: status {status}")
+        return parse_daily_csv(body)
+
+    def _fetch(self, path: str, params: Dict[str, Any]) -> Tuple[int, bytes, Dict[str, str]]:
+        # (status, body, headers) after retries on transport errors and 5xx; status 0 = no response
+        status, body, headers = 0, b"", {}
+        for attempt in range(self.max_retries + 1):
+            try:
+                r = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+                status, body, headers = r.status_code, r.content, dict(r.headers)
+            except requests.RequestException:
+                status, body, headers = 0, b"", {}
+            if 0 < status < 500 and status != 429:
+                break
+            if attempt < self.max_retries:
+                time.sleep(backoff_delay(attempt, self.backoff_base))
+        return status, body, headers
+
+    def download(self, url: str, dest: str | os.PathLike) -> Path:
+        # Bulk archives are large: stream to disk, never through the cassette. iter_content
+        # undoes a gzip/deflate Content-Encoding; r.raw would hand back the encoded bytes
+        p = Path(dest)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+        with self.session.get(url, stream=True, timeout=self.timeout) as r:
+            r.raise_for_status()
+            with tmp.open("wb") as f:
+                for chunk in r.iter_content(1 << 20):
+                    f.write(chunk)
+        os.replace(tmp, p)
+        return p
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def iter_bulk(archive: str | os.PathLike, symbols: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, DailyBars]]:
+    """(symbol, bars) for each US member of a bulk archive; members outside `symbols` are never read."""
+    wanted = {s.upper() for s in symbols} if symbols is not None else None
+    with zipfile.ZipFile(archive) as z:
+        for info in z.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(BULK_SUFFIX):
+                continue
+            symbol = from_stooq_symbol(info.filename)
+            if wanted is not None and symbol not in wanted:
+                continue
+            yield symbol, parse_bulk_txt(z.read(info))
+
+
+def ingest_bulk(
+    archive: str | os.PathLike,
+    store: PriceStore,
+    symbols: Optional[Iterable[str]] = None,
+    as_of: Optional[date] = None,
+) -> Dict[str, int]:
+    """Merge a bulk archive into the price store; returns counts.
+
+    Archives hold each symbol's full history, so every ingested symbol counts as requested
+    from the epoch on. `as_of` (the archive's session) also marks symbols without a bar that
+    day as checked; by default each symbol is checked up to its own last bar.
+    """
+    counts = {"symbols": 0, "rows": 0, "empty": 0}
+    for symbol, bars in iter_bulk(archive, symbols):
+        if not len(bars):
+            counts["empty"] += 1
+            continue
+        checked = max(int(bars.t[-1]), to_epoch_day(as_of) if as_of else 0)
+        merged = merge_arrays(store.load(symbol), bars.columns(), since=0, checked=checked)
+        store.save(symbol, merged)
+        counts["symbols"] += 1
+        counts["rows"] += len(bars)
+    return counts
+
+
+def main(argv: Optional[list] = None) -> None:
+    from src.utils.config import load_yaml
+
+    parser = argparse.ArgumentParser(prog="python -m src.data.stooq")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="merge a Stooq bulk daily archive (path or URL) into the price store")
+    p.add_argument("source", nargs="?", default=None, help=f"archive path or URL (default {BULK_URL})")
+    p.add_argument("--symbols", default=None, help="comma-separated symbols to keep (default: all)")
+    p.add_argument("--as-of", default=None, help="archive session, YYYY-MM-DD")
+    args = parser.parse_args(argv)
+
+    settings = load_yaml("configs/settings.yml")
+    cache_dir = (settings.get("cache", {}) or {}).get("dir", ".cache")
+    source = args.source or BULK_URL.replace(STOOQ_BASE, stooq_base_url(), 1)
+    if source.startswith(("http://", "https://")):
+        client = StooqClient()
+        try:
+            source = str(client.download(source, os.path.join(cache_dir, "stooq", "bulk.zip")))
+        finally:
+            client.close()
+
+    t0 = time.perf_counter()
+    counts = ingest_bulk(
+        source,
+        PriceStore(os.path.join(cache_dir, "prices")),
+        symbols=args.symbols.split(",") if args.symbols else None,
+        as_of=date.fromisoformat(args.as_of) if args.as_of else None,
+    )
+    print(f"ingested {counts['symbols']} symbols, {counts['rows']} bars ({counts['empty']} empty) "
+          f"in {time.perf_counter() - t0:.1f}s from {source}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import List, Optional, Tuple
 import io
+import json
+import os
 import urllib.request
 
+import numpy as np
 
-NASDAQ_LISTED_URL = "ftp://ftp.nasdaqtrader.com/symboldirectory/nasdaqlisted.txt"
-OTHER_LISTED_URL = "ftp://ftp.nasdaqtrader.com/symboldirectory/otherlisted.txt"
+from src.data.cassette import active_cassette
+
+
+SYMBOL_DIRECTORY_BASE = "ftp://ftp.nasdaqtrader.com/symboldirectory"
+NASDAQ_LISTED_URL = f"{SYMBOL_DIRECTORY_BASE}/nasdaqlisted.txt"
+OTHER_LISTED_URL = f"{SYMBOL_DIRECTORY_BASE}/otherlisted.txt"
+
+# is_etf encoding in SymbolTable
+ETF_UNKNOWN, ETF_NO, ETF_YES = -1, 0, 1
 
 
 @dataclass
@@ -19,12 +31,97 @@ class ListedSymbol:
     is_test: bool
 
 
+@dataclass
+class SymbolDiff:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> List[str]:
+        # A reused ticker is a different company: both sides need their caches dropped
+        return self.added + self.removed
+
+
+@dataclass
+class SymbolTable:
+    """Column arrays for the (non-test) US listing; row order = NASDAQ file, then other file."""
+    symbol: np.ndarray     # unicode
+    name: np.ndarray       # unicode
+    exchange: np.ndarray   # unicode
+    is_etf: np.ndarray     # int8, see ETF_* constants
+    headers: Tuple[str, str] = ("", "")  # "File Creation Time" lines of both source files
+    fetched_on: str = ""                 # ISO date of the last successful download
+
+    def __len__(self) -> int:
+        return len(self.symbol)
+
+    def mask(self, include_etfs: bool = False) -> np.ndarray:
+        return np.ones(len(self), dtype=bool) if include_etfs else self.is_etf != ETF_YES
+
+    def symbols(self, include_etfs: bool = False) -> List[str]:
+        return self.symbol[self.mask(include_etfs)].tolist()
+
+    def to_listed(self, include_etfs: bool = False) -> List[ListedSymbol]:
+        etf_map = {ETF_UNKNOWN: None, ETF_NO: False, ETF_YES: True}
+        return [
+            ListedSymbol(symbol=str(s), name=str(n), exchange=str(e), is_etf=etf_map[int(f)], is_test=False)
+            for s, n, e, f in zip(*(a[self.mask(include_etfs)] for a in (self.symbol, self.name, self.exchange, self.is_etf)))
+        ]
+
+    def save(self, path: str | os.PathLike) -> None:
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.savez(
+                f,
+                symbol=self.symbol, name=self.name, exchange=self.exchange, is_etf=self.is_etf,
+                headers=np.array(self.headers), fetched_on=np.array(self.fetched_on),
+            )
+        os.replace(tmp, p)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> Optional["SymbolTable"]:
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                return cls(
+                    symbol=z["symbol"], name=z["name"], exchange=z["exchange"], is_etf=z["is_etf"],
+                    headers=tuple(str(h) for h in z["headers"]), fetched_on=str(z["fetched_on"]),
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def _directory_url(url: str) -> str:
+    # SYMBOL_DIRECTORY_BASE_URL serves both files from a stand-in (http is fine)
+    base = os.getenv("SYMBOL_DIRECTORY_BASE_URL")
+    return url.replace(SYMBOL_DIRECTORY_BASE, base.rstrip("/"), 1) if base else url
+
+
 def _download_text(url: str) -> str:
-    with urllib.request.urlopen(url, timeout=30) as resp:
-        raw = resp.read()
+    tape = active_cassette()
+    if tape is None:
+        raw = _download(url)
+    else:
+        status, raw, _ = tape.call("symbols", url.rsplit("/", 1)[-1], None, lambda: (200, _download(url), {}))
+        if status != 200:
+            raise OSError(f"{url}: status {status} from the cassette")
     return raw.decode("utf-8", errors="replace")
 
 
+def _download(url: str) -> bytes:
+    with urllib.request.urlopen(_directory_url(url), timeout=30) as resp:
+        return resp.read()
+
+
+def _creation_header(text: str) -> str:
+    # The trailer line looks like "File Creation Time: 0116202618:02|||||"
+    for ln in reversed(text.splitlines()):
+        if ln.startswith("File Creation Time"):
+            return ln.split("|", 1)[0].strip()
+    return ""
+
+
 def _parse_pipe_file(text: str) -> List[List[str]]:
     lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
     rows = []
@@ -39,59 +136,102 @@ def _parse_pipe_file(text: str) -> List[List[str]]:
     return rows
 
 
-def fetch_us_listed_symbols(include_etfs: bool = False) -> List[ListedSymbol]:
-    out: List[ListedSymbol] = []
+def _flag(r: List[str], i: int) -> bool:
+    return len(r) > i and (r[i] or "").strip().upper() == "Y"
+
+
+def parse_symbol_table(nasdaq_txt: str, other_txt: str) -> SymbolTable:
+    syms: List[str] = []
+    names: List[str] = []
+    exchs: List[str] = []
+    etfs: List[int] = []
+    seen = set()
+
+    def add(sym: str, name: str, exch: str, etf: int) -> None:
+        # De-dup by symbol, preserve order
+        if sym and sym.isascii() and sym not in seen:
+            seen.add(sym)
+            syms.append(sym)
+            names.append(name)
+            exchs.append(exch)
+            etfs.append(etf)
 
     # NASDAQ listed
-    nasdaq_txt = _download_text(NASDAQ_LISTED_URL)
-    rows = _parse_pipe_file(nasdaq_txt)
     # Format includes ETF field near the end on many versions; safest is by position:
     # Symbol|Security Name|Market Category|Test Issue|Financial Status|Round Lot Size|ETF|NextShares|...
-    for r in rows:
-        sym = (r[0] or "").strip()
-        name = (r[1] or "").strip()
-        test_issue = (r[3] or "").strip().upper() == "Y"
-        # ETF field can be r[6] in typical format
-        etf = None
-        if len(r) > 6:
-            etf = (r[6] or "").strip().upper() == "Y"
-        if test_issue:
-            continue
-        if (etf is True) and not include_etfs:
+    for r in _parse_pipe_file(nasdaq_txt):
+        if _flag(r, 3):  # test issue
             continue
-        if sym and sym.isascii():
-            out.append(ListedSymbol(symbol=sym, name=name, exchange="NASDAQ", is_etf=etf, is_test=test_issue))
+        etf = (ETF_YES if _flag(r, 6) else ETF_NO) if len(r) > 6 else ETF_UNKNOWN
+        add((r[0] or "").strip(), (r[1] or "").strip(), "NASDAQ", etf)
 
     # Other listed
-    other_txt = _download_text(OTHER_LISTED_URL)
-    rows2 = _parse_pipe_file(other_txt)
     # Typical format:
     # ACT Symbol|Security Name|Exchange|CQS Symbol|ETF|Round Lot Size|Test Issue|NASDAQ Symbol|...
-    for r in rows2:
-        sym = (r[0] or "").strip()
-        name = (r[1] or "").strip()
-        exch = (r[2] or "").strip()
-        # ETF usually r[4]
-        etf = None
-        if len(r) > 4:
-            etf = (r[4] or "").strip().upper() == "Y"
-        # Test issue often r[6]
-        is_test = False
-        if len(r) > 6:
-            is_test = (r[6] or "").strip().upper() == "Y"
-
-        if is_test:
+    for r in _parse_pipe_file(other_txt):
+        if _flag(r, 6):  # test issue
             continue
-        if (etf is True) and not include_etfs:
-            continue
-        if sym and sym.isascii():
-            out.append(ListedSymbol(symbol=sym, name=name, exchange=exch or "OTHER", is_etf=etf, is_test=is_test))
+        etf = (ETF_YES if _flag(r, 4) else ETF_NO) if len(r) > 4 else ETF_UNKNOWN
+        add((r[0] or "").strip(), (r[1] or "").strip(), (r[2] or "").strip() or "OTHER", etf)
 
-    # De-dup by symbol, preserve order
-    seen = set()
-    dedup: List[ListedSymbol] = []
-    for x in out:
-        if x.symbol not in seen:
-            dedup.append(x)
-            seen.add(x.symbol)
-    return dedup
+    return SymbolTable(
+        symbol=np.array(syms, dtype=str),
+        name=np.array(names, dtype=str),
+        exchange=np.array(exchs, dtype=str),
+        is_etf=np.array(etfs, dtype=np.int8),
+        headers=(_creation_header(nasdaq_txt), _creation_header(other_txt)),
+    )
+
+
+def diff_tables(old: Optional[SymbolTable], new: SymbolTable) -> SymbolDiff:
+    if old is None:
+        return SymbolDiff()
+    added = np.setdiff1d(new.symbol, old.symbol)
+    removed = np.setdiff1d(old.symbol, new.symbol)
+    return SymbolDiff(added=added.tolist(), removed=removed.tolist())
+
+
+def load_symbol_table(cache_dir: str, today: Optional[date] = None) -> Tuple[SymbolTable, SymbolDiff]:
+    """Cached symbol directory: at most one download per day, reparsed only when the
+    files' creation headers change, and the cached copy when the download fails.
+
+    Returns the table and the symbols added/removed by this refresh (empty when nothing
+    changed or the cache was served).
+    """
+    today = today or date.today()
+    table_path = Path(cache_dir) / "symbols.npz"
+    cached = SymbolTable.load(table_path)
+    if cached is not None and cached.fetched_on == today.isoformat():
+        return cached, SymbolDiff()
+
+    try:
+        nasdaq_txt = _download_text(NASDAQ_LISTED_URL)
+        other_txt = _download_text(OTHER_LISTED_URL)
+    except Exception:
+        if cached is not None:
+            return cached, SymbolDiff()
+        raise
+
+    headers = (_creation_header(nasdaq_txt), _creation_header(other_txt))
+    if cached is not None and all(headers) and headers == tuple(cached.headers):
+        table, diff = cached, SymbolDiff()
+    else:
+        table = parse_symbol_table(nasdaq_txt, other_txt)
+        diff = diff_tables(cached, table)
+        if diff.changed:
+            p = Path(cache_dir) / "symbols_diff.json"
+            tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"date": today.isoformat(), "added": diff.added, "removed": diff.removed}), encoding="utf-8")
+            os.replace(tmp, p)
+
+    table.fetched_on = today.isoformat()
+    table.save(table_path)
+    return table, diff
+
+
+def fetch_us_listed_symbols(include_etfs: bool = False, cache_dir: Optional[str] = None) -> List[ListedSymbol]:
+    if cache_dir is not None:
+        table, _ = load_symbol_table(cache_dir)
+    else:
+        table = parse_symbol_table(_download_text(NASDAQ_LISTED_URL), _download_text(OTHER_LISTED_URL))
+    return table.to_listed(include_etfs=include_etfs)
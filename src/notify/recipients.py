@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.config import load_yaml
+
+# Market-wide lists every recipient gets unless they set their own
+SHARED_KEYS = ("core", "signals_etfs")
+
+
+@dataclass
+class Recipient:
+    email: str
+    watchlists: Dict[str, List[str]]
+    thresholds: Dict[str, Any]
+    name: str = ""
+
+    def symbols(self, key: str) -> List[str]:
+        return list(self.watchlists.get(key) or [])
+
+    @property
+    def thresholds_key(self) -> Tuple[Tuple[str, str], ...]:
+        # Recipients with equal thresholds share one scoring pass
+        return tuple(sorted((k, repr(v)) for k, v in self.thresholds.items()))
+
+
+def load_recipients(
+    path: str,
+    watchlists: Dict[str, Any],
+    thresholds: Dict[str, Any],
+    default_email: Optional[str],
+) -> List[Recipient]:
+    """Recipients from configs/recipients.yml, or the single TO_EMAIL reader of watchlists.yml.
+
+    Each entry overrides the shared watchlists / thresholds key by key; its conviction and risky
+    lists are its own, the market-wide lists (SHARED_KEYS) fall back to watchlists.yml.
+    """
+    entries = (load_yaml(path).get("recipients") or []) if Path(path).exists() else []
+    if not entries:
+        return [Recipient(email=default_email or "", watchlists=dict(watchlists), thresholds=dict(thresholds))]
+
+    out: List[Recipient] = []
+    for e in entries:
+        wl = {k: watchlists.get(k) or [] for k in SHARED_KEYS}
+        wl.update(e.get("watchlists") or {})
+        th = dict(thresholds)
+        th.update(e.get("thresholds") or {})
+        out.append(Recipient(email=str(e["email"]), name=str(e.get("name") or ""), watchlists=wl, thresholds=th))
+    return out
+
+
+def union(recipients: List[Recipient], *keys: str) -> List[str]:
+    # Every recipient's symbols under `keys`, first-seen order, each once
+    return list(dict.fromkeys(s for r in recipients for k in keys for s in r.symbols(k)))
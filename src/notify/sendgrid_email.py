@@ -1,20 +1,61 @@
 from __future__ import annotations
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from typing import Any, Dict, List, Tuple
+
+SENDGRID_HOST = "https://api.sendgrid.com"
+
+# SendGrid accepts at most 1000 personalizations per request
+MAX_PERSONALIZATIONS = 1000
+
+
+def _client(api_key: str) -> Any:
+    # Imported here: only runs that actually send pay for the SendGrid SDK
+    from sendgrid import SendGridAPIClient
+
+    # SENDGRID_HOST points delivery at a local stand-in (bench/, tests)
+    return SendGridAPIClient(api_key, host=(os.getenv("SENDGRID_HOST") or SENDGRID_HOST).rstrip("/"))
+
+
+def _require(**values: str) -> None:
+    missing = [k for k, v in values.items() if not v]
+    if missing:
+        raise RuntimeError(f"Missing env vars: {', '.join(missing)}")
+
 
 def send_email(subject: str, html: str) -> None:
     api_key = os.getenv("SENDGRID_API_KEY")
     to_email = os.getenv("TO_EMAIL")
     from_email = os.getenv("FROM_EMAIL")
-
-    missing = [k for k, v in {
-        "SENDGRID_API_KEY": api_key,
-        "TO_EMAIL": to_email,
-        "FROM_EMAIL": from_email,
-    }.items() if not v]
-    if missing:
-        raise RuntimeError(f"Missing env vars: {', '.join(missing)}")
+    _require(SENDGRID_API_KEY=api_key, TO_EMAIL=to_email, FROM_EMAIL=from_email)
+    from sendgrid.helpers.mail import Mail
 
     message = Mail(from_email=from_email, to_emails=to_email, subject=subject, html_content=html)
-    SendGridAPIClient(api_key).send(message)
+    _client(api_key).send(message)
+
+
+def send_digests(digests: List[Tuple[str, str, str]]) -> int:
+    """Send (to_email, subject, html) digests; returns the number of API requests made.
+
+    Recipients whose subject and HTML are identical go out in one request, one personalization
+    each (nobody sees the other addresses), so requests scale with distinct digests.
+    """
+    api_key = os.getenv("SENDGRID_API_KEY")
+    from_email = os.getenv("FROM_EMAIL")
+    _require(SENDGRID_API_KEY=api_key, FROM_EMAIL=from_email)
+    if not all(to for to, _, _ in digests):
+        raise RuntimeError("Missing recipient address (TO_EMAIL or configs/recipients.yml)")
+    from sendgrid.helpers.mail import Mail
+
+    groups: Dict[Tuple[str, str], List[str]] = {}
+    for to, subject, html in digests:
+        groups.setdefault((subject, html), []).append(to)
+
+    client = _client(api_key)
+    requests_made = 0
+    for (subject, html), emails in groups.items():
+        for i in range(0, len(emails), MAX_PERSONALIZATIONS):
+            batch = emails[i:i + MAX_PERSONALIZATIONS]
+            message = Mail(from_email=from_email, to_emails=batch, subject=subject, html_content=html, is_multiple=True)
+            client.send(message)
+            requests_made += 1
+    return requests_made
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import time
+
+
+@dataclass(frozen=True)
+class Unavailable:
+    """Value of a stage that failed, timed out or lost a required input."""
+    stage: str
+    reason: str
+
+    def __bool__(self) -> bool:
+        return False
+
+
+@dataclass
+class Stage:
+    """One named step of a run. Its output is stored under `name`.
+
+    fn is called with one keyword argument per entry in `inputs` (the upstream stages'
+    outputs). A stage whose input is Unavailable is skipped (and is Unavailable itself)
+    unless `partial` is set, in which case it runs and gets the Unavailable values.
+    """
+    name: str
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    timeout_s: Optional[float] = None
+    partial: bool = False
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str            # ok | failed | timeout | skipped
+    value: Any
+    started: float = 0.0   # seconds since the run started
+    seconds: float = 0.0
+    error: str = ""
+
+
+@dataclass
+class PipelineRun:
+    results: Dict[str, StageResult] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def value(self, name: str) -> Any:
+        return self.results[name].value
+
+    def unavailable(self) -> Dict[str, str]:
+        return {n: r.value.reason for n, r in self.results.items() if isinstance(r.value, Unavailable)}
+
+    def critical_path(self, stages: List[Stage]) -> Tuple[List[str], float]:
+        # Longest chain of stage durations through the graph (what the run can't beat)
+        best: Dict[str, Tuple[float, List[str]]] = {}
+        for s in stages:  # stages are kept in topological order
+            head = max((best[i] for i in s.inputs), key=lambda x: x[0], default=(0.0, []))
+            best[s.name] = (head[0] + self.results[s.name].seconds, head[1] + [s.name])
+        total, path = max(best.values(), key=lambda x: x[0], default=(0.0, []))
+        return path, total
+
+
+class Pipeline:
+    """Runs stages concurrently as soon as their inputs are resolved.
+
+    A stage that raises or exceeds `timeout_s` becomes Unavailable and the run goes on;
+    a timed-out stage's thread is abandoned, not killed (its result is ignored).
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None):
+        self.stages = _topological(stages)
+        self.max_workers = max_workers or len(stages) or 1
+
+    def run(self) -> PipelineRun:
+        t0 = time.perf_counter()
+        run = PipelineRun()
+        pending = list(self.stages)
+        running: Dict[Future, Tuple[Stage, float]] = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+
+        def now() -> float:
+            return time.perf_counter() - t0
+
+        def finish(stage: Stage, status: str, value: Any, started: float, error: str = "") -> None:
+            run.results[stage.name] = StageResult(
+                name=stage.name, status=status, value=value, started=started,
+                seconds=now() - started, error=error,
+            )
+
+        try:
+            while pending or running:
+                for stage in [s for s in pending if all(i in run.results for i in s.inputs)]:
+                    pending.remove(stage)
+                    args = {i: run.results[i].value for i in stage.inputs}
+                    missing = [i for i, v in args.items() if isinstance(v, Unavailable)]
+                    if missing and not stage.partial:
+                        reason = f"needs {', '.join(missing)}"
+                        finish(stage, "skipped", Unavailable(stage.name, reason), now(), reason)
+                        continue
+                    running[executor.submit(stage.fn, **args)] = (stage, now())
+
+                if not running:
+                    continue
+
+                deadlines = [
+                    started + stage.timeout_s for stage, started in running.values() if stage.timeout_s is not None
+                ]
+                wait_s = max(0.0, min(deadlines) - now()) if deadlines else None
+                done, _ = wait(list(running), timeout=wait_s, return_when=FIRST_COMPLETED)
+
+                for fut in done:
+                    stage, started = running.pop(fut)
+                    try:
+                        finish(stage, "ok", fut.result(), started)
+                    except Exception as e:
+                        err = f"{type(e).__name__}: {e}"
+                        finish(stage, "failed", Unavailable(stage.name, err), started, err)
+
+                for fut, (stage, started) in list(running.items()):
+                    if stage.timeout_s is not None and now() - started >= stage.timeout_s:
+                        running.pop(fut)
+                        fut.cancel()
+                        reason = f"timed out after {stage.timeout_s:g}s"
+                        finish(stage, "timeout", Unavailable(stage.name, reason), started, reason)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        run.seconds = now()
+        return run
+
+
+def _topological(stages: List[Stage]) -> List[Stage]:
+    by_name: Dict[str, Stage] = {}
+    for s in stages:
+        if s.name in by_name:
+            raise ValueError(f"Duplicate stage: {s.name}")
+        by_name[s.name] = s
+    for s in stages:
+        for i in s.inputs:
+            if i not in by_name:
+                raise ValueError(f"Stage {s.name} needs unknown input {i}")
+
+    ordered: List[Stage] = []
+    state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(s: Stage) -> None:
+        if state.get(s.name) == 2:
+            return
+        if state.get(s.name) == 1:
+            raise ValueError(f"Cycle through stage {s.name}")
+        state[s.name] = 1
+        for i in s.inputs:
+            visit(by_name[i])
+        state[s.name] = 2
+        ordered.append(s)
+
+    for s in stages:
+        visit(s)
+    return ordered
+
+
+def upstream(stages: List[Stage], targets: List[str]) -> List[Stage]:
+    """The stages `targets` need (themselves and everything they read), in input order."""
+    by_name = {s.name: s for s in stages}
+    unknown = [t for t in targets if t not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+    needed = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(by_name[name].inputs)
+    return [s for s in stages if s.name in needed]
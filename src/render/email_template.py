@@ -1,152 +1,308 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from datetime import datetime
+from string import Formatter
+from urllib.parse import urlsplit
+import html
 
+from src.render.research_links import quotes_link
+from src.utils.metrics import timed
+
+# Per-section byte budgets (UTF-8). Gmail clips messages past ~102KB, so the defaults keep
+# the whole email under that; configs/settings.yml render.budget_bytes overrides them.
+DEFAULT_BUDGETS = {
+    "top_focus": 4_000,
+    "market_pulse": 8_000,
+    "research": 45_000,
+    "holdings": 12_000,
+    "risky": 12_000,
+    "sub5": 16_000,
+}
+
+# Symbols behind a section's "N more…" link
+MORE_LINK_SYMBOLS = 50
+
+# Inline styles, shared by every template that uses them. They stay inline because several
+# clients (Gmail with non-Google accounts among them) strip <style> blocks.
+FONT = "font-family:Arial,sans-serif"
+STYLES = {
+    "s_wrap": f"{FONT};line-height:1.45;max-width:980px;margin:0 auto;color:#000",
+    "s_h2": "margin-bottom:6px",
+    "s_h3": "margin-top:18px",
+    "s_lede": "margin-top:0;color:#555;font-size:13px",
+    "s_table": f"border-collapse:collapse;width:100%;{FONT};font-size:14px;color:#000",
+    "s_th": "text-align:left;padding:8px;border-bottom:1px solid #ccc",
+    "s_td": "padding:8px;border-bottom:1px solid #eee;vertical-align:top",
+    "s_ul": "margin:8px 0 0 18px",
+    "s_news": "margin:6px 0 0 18px",
+    "s_none": "margin:6px 0 0 0;color:#666",
+    "s_muted": "color:#666",
+    "s_card": "margin-bottom:14px;padding:12px;border:1px solid #ddd;border-radius:10px",
+    "s_sym": "font-size:16px;font-weight:bold;color:#000",
+    "s_links": "font-size:13px;margin-top:6px",
+    "s_fund": "font-size:14px;color:#000;margin-top:8px",
+    "s_mt6": "margin-top:6px",
+    "s_mt4": "margin-top:4px",
+    "s_head": "margin-top:10px;color:#000",
+    "s_more": "color:#555;font-size:13px",
+    "s_foot": "color:#999;font-size:11px;margin-top:24px",
+}
+
+
+class Safe(str):
+    """Already-escaped HTML; Template inserts it verbatim."""
+
+
+def escape(value: Any) -> Safe:
+    return value if isinstance(value, Safe) else Safe(html.escape(str(value), quote=True))
+
+
+def safe_url(url: Any) -> Safe:
+    # Only web links make it into an href
+    u = str(url or "").strip()
+    return escape(u) if urlsplit(u).scheme in ("http", "https") else Safe("#")
+
+
+class Template:
+    """A `{field}` template parsed once; render() escapes every field that isn't Safe.
+
+    Fields named in STYLES are filled in at parse time, so their cost is paid once.
+    """
+
+    def __init__(self, source: str):
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        pending = ""
+        for literal, field, _, _ in Formatter().parse(source):
+            pending += literal
+            if field in STYLES:
+                pending += STYLES[field]
+            elif field is not None:
+                self.parts.append((pending, field))
+                pending = ""
+        self.parts.append((pending, None))
+
+    def render(self, **fields: Any) -> Safe:
+        out = []
+        for literal, field in self.parts:
+            out.append(literal)
+            if field is not None:
+                out.append(escape(fields[field]))
+        return Safe("".join(out))
+
+
+T_HEADER = Template(
+    "<div style='{s_wrap}'><h2 style='{s_h2}'>{title}</h2><p style='{s_lede}'>Automated digest using rule-based "
+    "technical signals + fundamentals + news heuristics. Not investment advice.</p>"
+)
+T_HEADING = Template("<h3 style='{s_h3}'>{heading}</h3>")
+T_NOTE = Template("<p><em>{text}</em></p>")
+T_UNAVAILABLE = Template("<p style='{s_muted}'><em>Unavailable today ({reason}).</em></p>")
+T_TABLE_OPEN = Template("<table style='{s_table}'><thead><tr>{ths}</tr></thead><tbody>")
+T_TH = Template("<th style='{s_th}'>{text}</th>")
+T_TD = Template("<td style='{s_td}'>{text}</td>")
+T_ROW = Template("<tr>{tds}</tr>")
+T_FOCUS = Template("<li><strong>{symbol}</strong> — <strong>{risk}</strong> — {reason}</li>")
+T_LINK = Template("<a href='{url}' target='_blank' rel='noopener noreferrer'>{text}</a>")
+T_NEWS = Template("<li>{link}{source}</li>")
+T_SOURCE = Template(" <span style='{s_muted}'>({source})</span>")
+T_CARD = Template(
+    "<div style='{s_card}'><div style='{s_sym}'>{symbol}</div><div style='{s_links}'>{links}</div>"
+    "<div style='{s_fund}'><div><strong>{name}</strong> {industry}</div>"
+    "<div style='{s_mt6}'><strong>Fundamental stance:</strong> {stance} <span style='{s_muted}'> — {stance_reason}</span></div>"
+    "<div style='{s_mt6}'><strong>Valuation:</strong> P/E {pe}, P/S {ps}, EV/EBITDA {ev_ebitda}</div>"
+    "<div style='{s_mt4}'><strong>Margins:</strong> Op {op_margin}, Net {net_margin}</div>"
+    "<div style='{s_mt4}'><strong>Growth:</strong> Rev {rev_growth}, EPS {eps_growth}</div>"
+    "<div style='{s_mt4}'><strong>Leverage:</strong> Debt/Equity {debt_eq}</div></div>"
+    "<div style='{s_head}'><strong>CNBC mentions</strong></div>{cnbc}"
+    "<div style='{s_head}'><strong>Web buzz</strong></div>{buzz}</div>"
+)
+T_MORE = Template("<p style='{s_more}'>{more}</p>")
+T_SUB5_LEDE = Template(
+    "<p style='{s_lede}'>Generated daily from the live US symbol list; ranked by fundamentals + news "
+    "activity + “innovation” keyword heuristics. Treat as a research funnel, not a buy list.</p>"
+)
+T_NO_ITEMS = Template("<p style='{s_none}'><em>No items found.</em></p>")
+T_NEWS_LIST = Template("<ul style='{s_news}'>{items}</ul>")
+T_FOCUS_OPEN = Template("<ul style='{s_ul}'>")
+T_FOOTER = Template("<p style='{s_foot}'>{footer}</p>")
+
+
+def _size(chunk: str) -> int:
+    return len(chunk.encode("utf-8"))
+
+
+def _more(remaining: Sequence[Any], symbol_of: Callable[[Any], str]) -> Safe:
+    symbols = [s for s in (symbol_of(x) for x in remaining[:MORE_LINK_SYMBOLS]) if s]
+    text = f"{len(remaining)} more…"
+    if not symbols:
+        return T_MORE.render(more=text)
+    return T_MORE.render(more=T_LINK.render(url=safe_url(quotes_link(symbols, MORE_LINK_SYMBOLS)), text=text))
+
+
+def _budgeted(
+    items: Sequence[Any],
+    render_item: Callable[[Any], str],
+    budget: int,
+    symbol_of: Callable[[Any], str],
+    close: str = "",
+) -> Iterator[str]:
+    # Items in order until the next one would overrun the budget, then `close` and one
+    # "N more…" line. Items past the cut are never rendered, so cost and size stop growing
+    # with the input.
+    used = 0
+    for i, item in enumerate(items):
+        chunk = render_item(item)
+        used += _size(chunk)
+        if used > budget and i > 0:
+            yield close
+            yield _more(items[i:], symbol_of)
+            return
+        yield chunk
+    yield close
+
+
+def _symbol(x: Any) -> str:
+    return x.get("symbol", "") if isinstance(x, dict) else str(x)
+
+
+def _table(header: List[str], rows: Sequence[Any], cells: Callable[[Any], List[Any]], budget: int) -> Iterator[str]:
+    if not rows:
+        yield T_NOTE.render(text="No data")
+        return
+    yield T_TABLE_OPEN.render(ths=Safe("".join(T_TH.render(text=h) for h in header)))
+
+    def row(r: Any) -> str:
+        return T_ROW.render(tds=Safe("".join(T_TD.render(text=c) for c in cells(r))))
+
+    yield from _budgeted(rows, row, budget, _symbol, close="</tbody></table>")
+
+
+def _news_list(items: List[Dict[str, str]]) -> Safe:
+    lis = []
+    for it in (items or [])[:5]:
+        t, url, src = it.get("title", ""), it.get("link", ""), it.get("source", "")
+        if t and url:
+            lis.append(T_NEWS.render(
+                link=T_LINK.render(url=safe_url(url), text=t),
+                source=T_SOURCE.render(source=src) if src else Safe(""),
+            ))
+    if not items:
+        return T_NO_ITEMS.render()
+    return T_NEWS_LIST.render(items=Safe("".join(lis)))
+
+
+def _card(sym: str, sections: Dict[str, Any]) -> str:
+    links = (sections.get("links_by_symbol", {}) or {}).get(sym, {}) or {}
+    f = (sections.get("fundamentals_by_symbol", {}) or {}).get(sym, {}) or {}
+    n = (sections.get("news_by_symbol", {}) or {}).get(sym, {}) or {}
+    links_html = Safe(" | ".join(T_LINK.render(url=safe_url(url), text=name) for name, url in links.items())) or Safe("<em>No links</em>")
+    return T_CARD.render(
+        symbol=sym,
+        links=links_html,
+        name=f.get("name", sym),
+        industry=("— " + f.get("industry", "")) if f.get("industry") else "",
+        stance=f.get("stance", "n/a"),
+        stance_reason=f.get("stance_reason", ""),
+        pe=f.get("pe", "n/a"),
+        ps=f.get("ps", "n/a"),
+        ev_ebitda=f.get("ev_ebitda", "n/a"),
+        op_margin=f.get("op_margin", "n/a"),
+        net_margin=f.get("net_margin", "n/a"),
+        rev_growth=f.get("rev_growth", "n/a"),
+        eps_growth=f.get("eps_growth", "n/a"),
+        debt_eq=f.get("debt_eq", "n/a"),
+        cnbc=_news_list(n.get("cnbc", []) or []),
+        buzz=_news_list(n.get("buzz", []) or []),
+    )
+
+
+def _risk_cells(s: Dict[str, Any]) -> List[Any]:
+    return [s.get("symbol", ""), s.get("close", ""), s.get("risk", ""), s.get("reason", "")]
+
+
+def iter_email(
+    subject_dt: datetime,
+    tz_name: str,
+    sections: Dict[str, Any],
+    budgets: Optional[Dict[str, int]] = None,
+) -> Iterator[str]:
+    """The email body as a stream of HTML chunks (see render_email)."""
+    budget = dict(DEFAULT_BUDGETS)
+    budget.update({k: int(v) for k, v in (budgets or {}).items()})
+    # Sections whose stage failed or timed out: {section: reason}
+    unavailable = sections.get("unavailable", {}) or {}
+
+    def section(key: str, heading: str, body: Callable[[], Iterable[str]], lede: str = "") -> Iterator[str]:
+        yield T_HEADING.render(heading=heading)
+        if lede:
+            yield lede
+        if key in unavailable:
+            yield T_UNAVAILABLE.render(reason=unavailable[key])
+        else:
+            yield from body()
 
-def render_email(subject_dt: datetime, tz_name: str, sections: Dict[str, Any]) -> Dict[str, str]:
     title = f"Stockshark Digest — {subject_dt.strftime('%a %b %d, %Y %I:%M %p')} ({tz_name})"
+    yield T_HEADER.render(title=title)
 
-    def table(rows: List[List[str]]) -> str:
-        if not rows:
-            return "<p><em>No data</em></p>"
-        header = rows[0]
-        body = rows[1:]
-        th = "".join([f"<th style='text-align:left;padding:8px;border-bottom:1px solid #ccc'>{h}</th>" for h in header])
-        trs = []
-        for r in body:
-            tds = "".join([f"<td style='padding:8px;border-bottom:1px solid #eee;vertical-align:top'>{c}</td>" for c in r])
-            trs.append(f"<tr>{tds}</tr>")
-        return f"""
-        <table style="border-collapse:collapse;width:100%;font-family:Arial,sans-serif;font-size:14px;color:#000">
-          <thead><tr>{th}</tr></thead>
-          <tbody>{''.join(trs)}</tbody>
-        </table>
-        """
-
-    # Market pulse
-    market_rows = [["Symbol", "Last", "1D %", "Notes"]]
-    for item in sections.get("market_pulse", []):
-        market_rows.append([item["symbol"], item["last"], item["chg"], item["note"]])
-
-    # Top focus
-    top_focus = sections.get("top_focus", [])
-    if top_focus:
-        top_focus_html = "<ul style='margin:8px 0 0 18px'>" + "".join(
-            [f"<li><strong>{x.get('symbol','')}</strong> — <strong>{x.get('risk','')}</strong> — {x.get('reason','')}</li>" for x in top_focus]
-        ) + "</ul>"
-    else:
-        top_focus_html = "<p><em>No high-priority alerts today.</em></p>"
-
-    # Holdings
-    holdings_rows = [["Symbol", "Close", "Risk", "Summary"]]
-    for s in sections.get("holdings", []):
-        holdings_rows.append([s.get("symbol",""), s.get("close",""), s.get("risk",""), s.get("reason","")])
-
-    # Risky watchlist
-    risky_rows = [["Symbol", "Close", "Risk", "Summary"]]
-    for s in sections.get("risky", []):
-        risky_rows.append([s.get("symbol",""), s.get("close",""), s.get("risk",""), s.get("reason","")])
-
-    # Research pack cards (black text for readability)
-    research_symbols = sections.get("research_symbols", [])
-    links_by_symbol = sections.get("links_by_symbol", {})
-    fundamentals_by_symbol = sections.get("fundamentals_by_symbol", {})
-    news_by_symbol = sections.get("news_by_symbol", {})
-
-    def news_list(items: List[Dict[str, str]]) -> str:
+    def top_focus() -> Iterator[str]:
+        items = sections.get("top_focus", [])
         if not items:
-            return "<p style='margin:6px 0 0 0;color:#666'><em>No items found.</em></p>"
-        lis = []
-        for it in items[:5]:
-            t = it.get("title", "")
-            url = it.get("link", "")
-            src = it.get("source", "")
-            src_txt = f" <span style='color:#666'>({src})</span>" if src else ""
-            if t and url:
-                lis.append(f"<li><a href='{url}' target='_blank' rel='noopener noreferrer'>{t}</a>{src_txt}</li>")
-        return "<ul style='margin:6px 0 0 18px'>" + "".join(lis) + "</ul>"
-
-    cards = []
-    for sym in research_symbols:
-        links = links_by_symbol.get(sym, {}) or {}
-        f = fundamentals_by_symbol.get(sym, {}) or {}
-        n = news_by_symbol.get(sym, {}) or {}
-        cnbc_items = n.get("cnbc", []) or []
-        buzz_items = n.get("buzz", []) or []
-
-        links_html = " | ".join([f"<a href='{url}' target='_blank' rel='noopener noreferrer'>{name}</a>" for name, url in links.items()]) or "<em>No links</em>"
-
-        fundamentals_html = f"""
-          <div style="font-size:14px;color:#000;margin-top:8px">
-            <div><strong>{f.get('name', sym)}</strong> {('— ' + f.get('industry','')) if f.get('industry') else ''}</div>
-            <div style="margin-top:6px"><strong>Fundamental stance:</strong> {f.get('stance','n/a')}
-              <span style="color:#666"> — {f.get('stance_reason','')}</span>
-            </div>
-            <div style="margin-top:6px"><strong>Valuation:</strong> P/E {f.get('pe','n/a')}, P/S {f.get('ps','n/a')}, EV/EBITDA {f.get('ev_ebitda','n/a')}</div>
-            <div style="margin-top:4px"><strong>Margins:</strong> Op {f.get('op_margin','n/a')}, Net {f.get('net_margin','n/a')}</div>
-            <div style="margin-top:4px"><strong>Growth:</strong> Rev {f.get('rev_growth','n/a')}, EPS {f.get('eps_growth','n/a')}</div>
-            <div style="margin-top:4px"><strong>Leverage:</strong> Debt/Equity {f.get('debt_eq','n/a')}</div>
-          </div>
-        """
-
-        cards.append(f"""
-          <div style="margin-bottom:14px;padding:12px;border:1px solid #ddd;border-radius:10px">
-            <div style="font-size:16px;font-weight:bold;color:#000">{sym}</div>
-            <div style="font-size:13px;margin-top:6px">{links_html}</div>
-            {fundamentals_html}
-
-            <div style="margin-top:10px;color:#000"><strong>CNBC mentions</strong></div>
-            {news_list(cnbc_items)}
-
-            <div style="margin-top:10px;color:#000"><strong>Web buzz</strong></div>
-            {news_list(buzz_items)}
-          </div>
-        """)
-
-    research_section_html = "".join(cards) if cards else "<p><em>No research pack today.</em></p>"
-
-    # Sub-$5 table
-    sub5 = sections.get("sub5", [])
-    if sub5:
-        sub5_rows = [["Symbol", "Price", "Score", "Why (signals)"]]
-        for x in sub5:
-            sub5_rows.append([x.get("symbol",""), x.get("price",""), x.get("score",""), x.get("reason","")])
-        sub5_html = table(sub5_rows)
-    else:
-        sub5_html = "<p><em>No candidates today (filters are strict).</em></p>"
-
-    html = f"""
-    <div style="font-family:Arial,sans-serif;line-height:1.45;max-width:980px;margin:0 auto;color:#000">
-      <h2 style="margin-bottom:6px">{title}</h2>
-      <p style="margin-top:0;color:#555;font-size:13px">
-        Automated digest using rule-based technical signals + fundamentals + news heuristics. Not investment advice.
-      </p>
-
-      <h3 style="margin-top:18px">Top focus today</h3>
-      {top_focus_html}
-
-      <h3 style="margin-top:18px">Market pulse</h3>
-      {table(market_rows)}
-
-      <h3 style="margin-top:18px">Research pack (fundamentals + links + news)</h3>
-      {research_section_html}
-
-      <h3 style="margin-top:18px">Your holdings</h3>
-      {table(holdings_rows)}
-
-      <h3 style="margin-top:18px">Risky watchlist</h3>
-      {table(risky_rows)}
-
-      <h3 style="margin-top:18px">Sub-$5 watch (iterative screener)</h3>
-      <p style="color:#555;font-size:13px;margin-top:0">
-        Generated daily from the live US symbol list; ranked by fundamentals + news activity + “innovation” keyword heuristics.
-        Treat as a research funnel, not a buy list.
-      </p>
-      {sub5_html}
-    </div>
-    """
+            yield T_NOTE.render(text="No high-priority alerts today.")
+            return
+        yield T_FOCUS_OPEN.render()
+        yield from _budgeted(
+            items,
+            lambda x: T_FOCUS.render(symbol=x.get("symbol", ""), risk=x.get("risk", ""), reason=x.get("reason", "")),
+            budget["top_focus"], _symbol, close="</ul>",
+        )
 
-    subject = f"Stockshark Digest — {subject_dt.strftime('%a %b %d')}"
-    return {"subject": subject, "html": html}
+    def research() -> Iterator[str]:
+        symbols = sections.get("research_symbols", [])
+        if not symbols:
+            yield T_NOTE.render(text="No research pack today.")
+            return
+        yield from _budgeted(symbols, lambda sym: _card(sym, sections), budget["research"], _symbol)
 
+    def sub5() -> Iterator[str]:
+        rows = sections.get("sub5", [])
+        if not rows:
+            yield T_NOTE.render(text="No candidates today (filters are strict).")
+            return
+        yield from _table(
+            ["Symbol", "Price", "Score", "Why (signals)"], rows,
+            lambda x: [x.get("symbol", ""), x.get("price", ""), x.get("score", ""), x.get("reason", "")],
+            budget["sub5"],
+        )
+
+    yield from section("top_focus", "Top focus today", top_focus)
+    yield from section("market_pulse", "Market pulse", lambda: _table(
+        ["Symbol", "Last", "1D %", "Notes"], sections.get("market_pulse", []),
+        lambda x: [x["symbol"], x["last"], x["chg"], x["note"]], budget["market_pulse"],
+    ))
+    yield from section("research", "Research pack (fundamentals + links + news)", research)
+    yield from section("holdings", "Your holdings", lambda: _table(
+        ["Symbol", "Close", "Risk", "Summary"], sections.get("holdings", []), _risk_cells, budget["holdings"],
+    ))
+    yield from section("risky", "Risky watchlist", lambda: _table(
+        ["Symbol", "Close", "Risk", "Summary"], sections.get("risky", []), _risk_cells, budget["risky"],
+    ))
+    yield from section("sub5", "Sub-$5 watch (iterative screener)", sub5, lede=T_SUB5_LEDE.render())
+
+    # Optional run-metrics line (settings: metrics.email_footer)
+    footer = sections.get("footer", "")
+    if footer:
+        yield T_FOOTER.render(footer=footer)
+    yield "</div>"
+
+
+@timed("render/email")
+def render_email(
+    subject_dt: datetime,
+    tz_name: str,
+    sections: Dict[str, Any],
+    budgets: Optional[Dict[str, int]] = None,
+) -> Dict[str, str]:
+    html_body = "".join(iter_email(subject_dt, tz_name, sections, budgets))
+    subject = f"Stockshark Digest — {subject_dt.strftime('%a %b %d')}"
+    return {"subject": subject, "html": html_body}
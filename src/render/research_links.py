@@ -13,3 +13,7 @@ def research_links(symbol: str, instagram_handle: str | None = None) -> dict[str
     if instagram_handle:
         links["Instagram"] = f"https://www.instagram.com/{instagram_handle.strip().lstrip('@')}/"
     return links
+
+def quotes_link(symbols: list[str], limit: int = 50) -> str:
+    # One Yahoo page quoting several symbols (the first `limit`)
+    return f"https://finance.yahoo.com/quotes/{quote_plus(','.join(s.upper() for s in symbols[:limit]), safe=',')}"
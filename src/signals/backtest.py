@@ -0,0 +1,275 @@
+"""Historical backtest of the WARN/CRITICAL rules.
+
+    python -m src.signals.backtest [--symbols A,B] [--since 2015-01-01] [--horizons 5,20,60] [--events-csv PATH]
+
+Replays compute_signals' rules over every stored bar of every symbol in one vectorized pass
+per chunk of symbols (src/signals/kernels.py for the inputs, risk_levels for the decision),
+and reports each risk-level transition with the returns and drawdowns that followed it.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from src.signals import kernels
+from src.signals.panel import LEVEL_NAMES, risk_levels
+from src.signals.scoring import classify_signal
+
+# Forward windows (bars) measured after each flag
+HORIZONS = (5, 20, 60)
+# fetch_daily_history returns nothing below this many bars, so earlier dates have no signal
+MIN_BARS = 30
+LEVEL_NONE = -1
+SLOPE_WINDOW = 12
+
+
+@dataclass
+class BacktestResult:
+    """Every risk-level transition, one entry per event (ordered by symbol, then day)."""
+    horizons: Tuple[int, ...]
+    symbol: np.ndarray        # object
+    day: np.ndarray           # int64 epoch days
+    prev: np.ndarray          # int8 level before the day (LEVEL_* in src/signals/panel.py)
+    level: np.ndarray         # int8 level from the day on
+    close: np.ndarray
+    reason: List[str]         # compute_signals' reason on that day
+    fwd_return: np.ndarray    # (events, horizons): close h bars later / close - 1; NaN past the data
+    fwd_drawdown: np.ndarray  # (events, horizons): worst close over the next h bars / close - 1
+    bars: Dict[str, int] = field(default_factory=dict)          # scored bars per level
+    baseline: Dict[int, float] = field(default_factory=dict)    # mean h-bar return over all scored bars
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame({
+            "symbol": self.symbol,
+            "date": pd.to_datetime(self.day, unit="D"),
+            "from": [LEVEL_NAMES[i] for i in self.prev],
+            "to": [LEVEL_NAMES[i] for i in self.level],
+            "close": self.close,
+            "reason": self.reason,
+        })
+        for k, h in enumerate(self.horizons):
+            df[f"ret_{h}d"] = self.fwd_return[:, k]
+            df[f"dd_{h}d"] = self.fwd_drawdown[:, k]
+        return df
+
+    def summary(self) -> List[Dict[str, Any]]:
+        # One row per transition kind: count, then mean / median return and mean / worst drawdown per horizon
+        rows = []
+        for p, lv in sorted(set(zip(self.prev.tolist(), self.level.tolist()))):
+            m = (self.prev == p) & (self.level == lv)
+            row: Dict[str, Any] = {"transition": f"{LEVEL_NAMES[p]}->{LEVEL_NAMES[lv]}", "events": int(m.sum())}
+            for k, h in enumerate(self.horizons):
+                ret, dd = self.fwd_return[m, k], self.fwd_drawdown[m, k]
+                ret, dd = ret[~np.isnan(ret)], dd[~np.isnan(dd)]
+                row[f"ret_{h}d"] = float(ret.mean()) if len(ret) else float("nan")
+                row[f"median_{h}d"] = float(np.median(ret)) if len(ret) else float("nan")
+                row[f"dd_{h}d"] = float(dd.mean()) if len(dd) else float("nan")
+                row[f"worst_dd_{h}d"] = float(dd.min()) if len(dd) else float("nan")
+            rows.append(row)
+        return rows
+
+
+def signal_measures(c: np.ndarray, h: np.ndarray, lo: np.ndarray, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """compute_signals' rule inputs for every bar of (dates x symbols) columns (leading NaN padding)."""
+    with np.errstate(invalid="ignore"):
+        ma = kernels.rolling_sma(c, int(params["trend_ma_days"]))
+        above = c >= np.where(np.isnan(ma), c, ma)
+        # slope(ma.dropna(), window=min(12, #MA)): the last <= 12 MA values, 0.0 below 5 of them
+        ma_slope = kernels.rolling_slope(ma, SLOPE_WINDOW, min_points=5)
+        mom = np.nan_to_num(kernels.momentum(c, int(params["momentum_days"])), nan=0.0)
+        dd = np.nan_to_num(kernels.rolling_drawdown(c, int(params["drawdown_days"])), nan=0.0)
+        vol_spike = kernels.rolling_range_ratio(h, lo, 20, 10) >= float(params["vol_spike_multiplier"])
+    return {"above": above, "ma_slope": ma_slope, "momentum": mom, "dd": dd, "vol_spike": vol_spike}
+
+
+def signal_levels(
+    c: np.ndarray,
+    h: np.ndarray,
+    lo: np.ndarray,
+    params: Dict[str, Any],
+    min_bars: int = MIN_BARS,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """(levels, measures): compute_signals' risk level on every bar, LEVEL_NONE where unscored."""
+    c2 = c if c.ndim == 2 else c[:, None]
+    m = signal_measures(c2, h if h.ndim == 2 else h[:, None], lo if lo.ndim == 2 else lo[:, None], params)
+    levels = risk_levels(
+        m["above"], m["ma_slope"], m["momentum"], m["dd"], m["vol_spike"],
+        drawdown_warn_pct=float(params["drawdown_warn_pct"]),
+        drawdown_critical_pct=float(params["drawdown_critical_pct"]),
+        require_conditions_for_warn=int(params.get("require_conditions_for_warn", 2)),
+        vol_spike_is_info_only=bool(params.get("vol_spike_is_info_only", True)),
+        momentum_warn_pct=float(params.get("momentum_warn_pct", -0.06)),
+    )
+    # Bar number within each column's own history
+    has_bar = ~np.isnan(c2)
+    nth = np.cumsum(has_bar, axis=0)
+    levels = np.where(has_bar & (nth >= min_bars), levels, LEVEL_NONE).astype(np.int8)
+    return (levels if c.ndim == 2 else levels[:, 0]), m
+
+
+def _forward(c: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    # (return, worst-close drawdown) over the next `horizon` bars, for every bar; NaN past the data
+    n = c.shape[0]
+    ret = np.full(c.shape, np.nan)
+    dd = np.full(c.shape, np.nan)
+    if horizon < n:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ret[: n - horizon] = c[horizon:] / c[: n - horizon] - 1.0
+            # min of c[i+1 .. i+horizon] is a trailing min ending at bar i+horizon
+            low = -kernels.rolling_max(-c, horizon)
+            dd[: n - horizon] = np.minimum(low[horizon:] / c[: n - horizon] - 1.0, 0.0)
+    return ret, dd
+
+
+def _aligned(histories: Sequence) -> Tuple[np.ndarray, ...]:
+    # Each column is one symbol's own bars, right-aligned: leading NaN padding, then its history
+    n = max(len(x) for x in histories)
+    t = np.full((n, len(histories)), -1, dtype=np.int64)
+    c, h, lo = (np.full((n, len(histories)), np.nan) for _ in range(3))
+    for j, x in enumerate(histories):
+        k = len(x)
+        t[n - k:, j], c[n - k:, j], h[n - k:, j], lo[n - k:, j] = x.t, x.c, x.h, x.l
+    return t, c, h, lo
+
+
+def backtest(
+    histories: Iterable,
+    params: Dict[str, Any],
+    horizons: Sequence[int] = HORIZONS,
+    min_bars: int = MIN_BARS,
+    chunk: int = 256,
+) -> BacktestResult:
+    """Risk-level transitions over the full histories (PriceHistory-like: t, h, l, c arrays).
+
+    A symbol's level on a day is what compute_signals returns for its history up to that day;
+    the first `min_bars` - 1 bars have none. Histories are read `chunk` symbols at a time.
+    """
+    horizons = tuple(int(x) for x in horizons)
+    parts: Dict[str, list] = {k: [] for k in ("symbol", "day", "prev", "level", "close", "ret", "dd")}
+    reasons: List[str] = []
+    bars = {name: 0 for name in LEVEL_NAMES}
+    base_sum, base_n = np.zeros(len(horizons)), np.zeros(len(horizons))
+
+    it = iter(h for h in histories if h is not None and len(h))
+    while True:
+        hs = list(itertools.islice(it, chunk))
+        if not hs:
+            break
+        t, c, h, lo = _aligned(hs)
+        levels, m = signal_levels(c, h, lo, params, min_bars)
+        scored = levels != LEVEL_NONE
+        for i, name in enumerate(LEVEL_NAMES):
+            bars[name] += int((levels == i).sum())
+
+        fwd = [_forward(c, x) for x in horizons]
+        for k, (ret, _) in enumerate(fwd):
+            ok = scored & ~np.isnan(ret)
+            base_sum[k] += ret[ok].sum()
+            base_n[k] += ok.sum()
+
+        change = np.zeros(levels.shape, dtype=bool)
+        change[1:] = scored[1:] & scored[:-1] & (levels[1:] != levels[:-1])
+        cols, rows = np.nonzero(change.T)  # symbol-major, then day
+        parts["symbol"].append(np.array([hs[j].symbol for j in cols], dtype=object))
+        parts["day"].append(t[rows, cols])
+        parts["prev"].append(levels[rows - 1, cols])
+        parts["level"].append(levels[rows, cols])
+        parts["close"].append(c[rows, cols])
+        parts["ret"].append(np.column_stack([r[rows, cols] for r, _ in fwd]) if horizons else np.empty((len(rows), 0)))
+        parts["dd"].append(np.column_stack([d[rows, cols] for _, d in fwd]) if horizons else np.empty((len(rows), 0)))
+        for i, j in zip(rows, cols):
+            reasons.append(classify_signal(
+                symbol=hs[j].symbol,
+                last_close=float(c[i, j]),
+                above=bool(m["above"][i, j]),
+                ma_slope=float(m["ma_slope"][i, j]),
+                momentum=float(m["momentum"][i, j]),
+                dd=float(m["dd"][i, j]),
+                vol_spike=bool(m["vol_spike"][i, j]),
+                **{k: params[k] for k in _CLASSIFY_KEYS if k in params},
+            ).reason)
+
+    def cat(key: str, empty: np.ndarray) -> np.ndarray:
+        return np.concatenate(parts[key]) if parts[key] else empty
+
+    return BacktestResult(
+        horizons=horizons,
+        symbol=cat("symbol", np.empty(0, dtype=object)),
+        day=cat("day", np.empty(0, dtype=np.int64)),
+        prev=cat("prev", np.empty(0, dtype=np.int8)),
+        level=cat("level", np.empty(0, dtype=np.int8)),
+        close=cat("close", np.empty(0)),
+        reason=reasons,
+        fwd_return=cat("ret", np.empty((0, len(horizons)))),
+        fwd_drawdown=cat("dd", np.empty((0, len(horizons)))),
+        bars=bars,
+        baseline={x: (float(base_sum[k] / base_n[k]) if base_n[k] else float("nan")) for k, x in enumerate(horizons)},
+    )
+
+
+_CLASSIFY_KEYS = (
+    "momentum_days", "drawdown_days", "drawdown_warn_pct", "drawdown_critical_pct",
+    "require_conditions_for_warn", "vol_spike_is_info_only", "momentum_warn_pct",
+)
+
+
+def stored_histories(store, symbols: Iterable[str], since: Optional[date] = None) -> Iterator:
+    """PriceHistory per stored symbol (whole stored history, or from `since`), loaded lazily."""
+    from src.data.market import PriceHistory
+
+    for sym in symbols:
+        hist = store.load(sym)
+        if hist is not None and len(hist.t):
+            yield PriceHistory(sym, **hist.window(since or date(1970, 1, 1)))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import os
+
+    from src.data.price_store import PriceStore
+    from src.signals.scoring import signal_params
+    from src.utils.config import load_yaml
+
+    parser = argparse.ArgumentParser(prog="python -m src.signals.backtest")
+    parser.add_argument("--symbols", default=None, help="comma-separated symbols (default: every stored symbol)")
+    parser.add_argument("--since", default=None, help="first day of history to use, YYYY-MM-DD")
+    parser.add_argument("--horizons", default=",".join(map(str, HORIZONS)), help="forward windows in bars")
+    parser.add_argument("--events-csv", default=None, help="also write every transition here")
+    args = parser.parse_args(argv)
+
+    settings = load_yaml("configs/settings.yml")
+    cache_dir = (settings.get("cache", {}) or {}).get("dir", ".cache")
+    store = PriceStore(os.path.join(cache_dir, "prices"))
+    symbols = [s.strip().upper() for s in args.symbols.split(",")] if args.symbols else store.symbols()
+    horizons = [int(x) for x in args.horizons.split(",") if x.strip()]
+
+    result = backtest(
+        stored_histories(store, symbols, date.fromisoformat(args.since) if args.since else None),
+        signal_params(settings["thresholds"]),
+        horizons=horizons,
+    )
+    scored = sum(result.bars.values())
+    print(f"{len(symbols)} symbols, {scored} scored bars: "
+          + ", ".join(f"{k} {v / scored:.1%}" for k, v in result.bars.items() if scored))
+    print("baseline: " + ", ".join(f"{h}d {r:+.2%}" for h, r in result.baseline.items()))
+    for row in result.summary():
+        cells = ", ".join(
+            f"{h}d {row[f'ret_{h}d']:+.2%} (median {row[f'median_{h}d']:+.2%}, dd {row[f'dd_{h}d']:.2%})" for h in horizons
+        )
+        print(f"{row['transition']:>16s} {row['events']:6d}  {cells}")
+    if args.events_csv:
+        result.to_frame().to_csv(args.events_csv, index=False)
+        print(f"wrote {len(result)} events to {args.events_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Full-series (every bar) versions of the indicators in src/signals/indicators.py.
+# All kernels take a 1D series or a 2D (dates x symbols) panel and work along axis 0.
+# NaNs are only expected as leading padding (a symbol that starts trading later);
+# a column then behaves exactly like its own shorter series. Output at bar i equals the
+# batch indicator evaluated on the series truncated after bar i.
+
+
+def _as2d(x: np.ndarray) -> tuple:
+    a = np.asarray(x, dtype=np.float64)
+    return (a[:, None], True) if a.ndim == 1 else (a, False)
+
+
+def _out(a: np.ndarray, squeeze: bool) -> np.ndarray:
+    return a[:, 0] if squeeze else a
+
+
+def _csum(a: np.ndarray) -> np.ndarray:
+    # Cumulative sum with a leading zero row, so window sums are c[end] - c[start]
+    return np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+
+
+def _windows(a: np.ndarray, w: int) -> np.ndarray:
+    # (n, m, w) view: [i, :, w - 1 - d] is bar i - d, NaN before the first row
+    padded = np.vstack([np.full((w - 1, a.shape[1]), np.nan), a])
+    return sliding_window_view(padded, w, axis=0)
+
+
+def rolling_sma(x: np.ndarray, window: int) -> np.ndarray:
+    """sma(series, window) for every bar (NaN until `window` values exist).
+
+    Each window is summed on its own (no running cumsum, whose differences lose precision
+    on long histories), and a window of equal values returns that value exactly, as
+    pandas' rolling mean does.
+    """
+    a, squeeze = _as2d(x)
+    w = int(window)
+    out = np.full(a.shape, np.nan)
+    if a.shape[0] < w or w < 1:
+        return _out(out, squeeze)
+    win = sliding_window_view(a, w, axis=0)
+    lo, hi = win.min(axis=-1), win.max(axis=-1)   # NaN if the window holds padding
+    out[w - 1:] = np.where(lo == hi, lo, win.sum(axis=-1) / w)
+    return _out(out, squeeze)
+
+
+def rolling_slope(x: np.ndarray, window: int, min_points: Optional[int] = None) -> np.ndarray:
+    """slope(series, window) for every bar, in closed form (no polyfit).
+
+    Like slope(), a bar uses the last min(window, available) values and returns 0.0 while
+    fewer than `min_points` (default max(5, window // 2)) are available. x and y are
+    centred within each window before the least-squares sums, and a flat window has
+    slope 0.0.
+    """
+    a, squeeze = _as2d(x)
+    w = max(1, int(window))
+    need = max(5, w // 2) if min_points is None else int(min_points)
+    n, m = a.shape
+    ok = ~np.isnan(a)
+    first = np.where(ok.any(axis=0), ok.argmax(axis=0), n)
+    k = np.clip(np.arange(n)[:, None] - first[None, :] + 1, 0, w).astype(np.float64)
+
+    win = _windows(a, w)
+    # Bar i - d is in the window while d < k; it sits at x = k - 1 - d
+    lags = [(d < k, win[:, :, w - 1 - d]) for d in range(w)]
+    sy = np.zeros((n, m))
+    for inside, y in lags:
+        sy += np.where(inside, y, 0.0)
+    ybar = sy / np.maximum(k, 1)
+    sxy = np.zeros((n, m))
+    for d, (inside, y) in enumerate(lags):
+        sxy += np.where(inside, ((k - 1) / 2.0 - d) * (y - ybar), 0.0)
+    sxx = (k - 1) * k * (k + 1) / 12.0
+    flat = win.min(axis=-1, initial=np.inf, where=~np.isnan(win)) == win.max(axis=-1, initial=-np.inf, where=~np.isnan(win))
+    out = np.where((k >= max(need, 2)) & ~flat, sxy / np.where(sxx > 0, sxx, 1.0), 0.0)
+    out[~ok] = 0.0
+    return _out(out, squeeze)
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """Max of the last `window` values (fewer at the start of the series) for every bar."""
+    a, squeeze = _as2d(x)
+    w = max(1, int(window))
+    filled = np.where(np.isnan(a), -np.inf, a)
+    padded = np.vstack([np.full((w - 1, a.shape[1]), -np.inf), filled])
+    out = sliding_window_view(padded, w, axis=0).max(axis=-1)
+    out = np.where(np.isneginf(out), np.nan, out)
+    return _out(out, squeeze)
+
+
+def rolling_drawdown(x: np.ndarray, window: int) -> np.ndarray:
+    """drawdown_from_recent_high(close, window) for every bar (0.0 when the peak is <= 0)."""
+    a, squeeze = _as2d(x)
+    peak = rolling_max(a, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dd = np.where(peak > 0, (peak - a) / np.where(peak > 0, peak, 1.0), 0.0)
+    dd = np.where(np.isnan(a), np.nan, dd)
+    return _out(dd, squeeze)
+
+
+def rolling_range_ratio(high: np.ndarray, low: np.ndarray, window: int = 20, min_periods: int = 10) -> np.ndarray:
+    """Today's high-low range over the mean range of the last `window` bars.
+
+    Mirrors compute_signals' vol-spike input: the mean covers up to `window` bars (NaN
+    ranges skipped) and the ratio is NaN until `min_periods` bars exist or when the mean
+    range is not positive.
+    """
+    h, squeeze = _as2d(high)
+    lo, _ = _as2d(low)
+    rng = np.abs(h - lo)
+    n, m = rng.shape
+    w = max(1, int(window))
+    ok = ~np.isnan(rng)
+    cs = _csum(np.where(ok, rng, 0.0))
+    cnt = _csum(ok.astype(np.float64))
+
+    # Bars that exist for the column (leading rows with neither a high nor a low are padding)
+    exists = ok | ~(np.isnan(h) & np.isnan(lo))
+    first = np.where(exists.any(axis=0), exists.argmax(axis=0), n)
+    i = np.arange(n)[:, None]
+    s = np.maximum(first[None, :], i - w + 1)
+    s_c = np.clip(s, 0, n)
+    cols = np.arange(m)[None, :]
+    tot = cs[i + 1, cols] - cs[s_c, cols]
+    c = cnt[i + 1, cols] - cnt[s_c, cols]
+    rows = i - s + 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = np.where(c > 0, tot / np.maximum(c, 1), np.nan)
+        ratio = np.where((rows >= min_periods) & (avg > 0), rng / avg, np.nan)
+    return _out(ratio, squeeze)
+
+
+def momentum(x: np.ndarray, days: int) -> np.ndarray:
+    """close[i] / close[i - days] - 1 for every bar (NaN until `days` earlier bars exist)."""
+    a, squeeze = _as2d(x)
+    d = int(days)
+    out = np.full(a.shape, np.nan)
+    if 0 <= d < a.shape[0]:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[d:] = a[d:] / a[: a.shape[0] - d] - 1.0
+    return _out(out, squeeze)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.signals.scoring import SignalResult, classify_signal
+from src.utils.metrics import timed
+
+# Vectorized risk levels (see risk_levels); same order as the string labels below
+LEVEL_OK, LEVEL_WARN, LEVEL_CRITICAL = 0, 1, 2
+LEVEL_NAMES = ("OK", "WARN", "CRITICAL")
+
+
+@dataclass
+class PanelMeasures:
+    """Per-symbol inputs to the risk rules, one array entry per panel column."""
+    symbols: np.ndarray
+    has_data: np.ndarray     # bool
+    last_close: np.ndarray
+    above: np.ndarray        # bool: last close >= trend MA (True when MA undefined)
+    ma_slope: np.ndarray
+    momentum: np.ndarray
+    dd: np.ndarray
+    vol_spike: np.ndarray    # bool
+
+
+def price_panel(histories: Iterable) -> Dict[str, pd.DataFrame]:
+    # Align PriceHistory objects on the union of their dates -> {"c"|"h"|"l": dates x symbols}
+    hs = [h for h in histories if h is not None and len(h)]
+    if not hs:
+        return {col: pd.DataFrame() for col in ("c", "h", "l")}
+
+    # Epoch days; the index is tz-aware UTC like the histories' frames
+    dates = np.unique(np.concatenate([h.t for h in hs]))
+    out: Dict[str, pd.DataFrame] = {}
+    cols = [h.symbol for h in hs]
+    index = pd.DatetimeIndex(pd.to_datetime(dates, unit="D", utc=True))
+    rows = [np.searchsorted(dates, h.t) for h in hs]
+    for col in ("c", "h", "l"):
+        m = np.full((len(dates), len(hs)), np.nan)
+        for j, h in enumerate(hs):
+            m[rows[j], j] = getattr(h, col)
+        out[col] = pd.DataFrame(m, index=index, columns=cols)
+    return out
+
+
+def _right_align(valid: np.ndarray, *arrays: np.ndarray) -> list:
+    # Per column, move the rows with a close to the bottom (keeping their order), so every
+    # column reads like its own history: leading NaNs, then one contiguous run of bars.
+    order = np.argsort(valid, axis=0, kind="stable")
+    return [np.take_along_axis(a, order, axis=0) for a in arrays]
+
+
+def _tail(a: np.ndarray, rows: int) -> np.ndarray:
+    # Last `rows` rows, NaN-padded on top when the panel is shorter
+    if a.shape[0] >= rows:
+        return a[a.shape[0] - rows:]
+    pad = np.full((rows - a.shape[0],) + a.shape[1:], np.nan)
+    return np.concatenate([pad, a], axis=0)
+
+
+def panel_measures(
+    close: pd.DataFrame,
+    high: pd.DataFrame,
+    low: pd.DataFrame,
+    trend_ma_days: int,
+    momentum_days: int,
+    drawdown_days: int,
+    vol_spike_multiplier: float,
+    slope_window: int = 12,
+    range_window: int = 20,
+) -> PanelMeasures:
+    symbols = np.asarray(close.columns, dtype=object)
+    high = high.reindex(index=close.index, columns=close.columns)
+    low = low.reindex(index=close.index, columns=close.columns)
+
+    c = close.to_numpy(dtype=np.float64)
+    h = high.to_numpy(dtype=np.float64)
+    lo = low.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(c)
+    c, h, lo = _right_align(valid, c, h, lo)
+    n = valid.sum(axis=0)
+    has_data = n > 0
+    n_cols = c.shape[1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        last_close = c[-1] if c.shape[0] else np.full(n_cols, np.nan)
+
+        # Trend: last `slope_window` values of the trend SMA, from a cumulative sum over the tail
+        w = max(1, int(trend_ma_days))
+        block = _tail(c, w + slope_window - 1)
+        cs = np.vstack([np.zeros((1, n_cols)), np.cumsum(np.nan_to_num(block), axis=0)])
+        cnt = np.vstack([np.zeros((1, n_cols)), np.cumsum(~np.isnan(block), axis=0)])
+        ma = (cs[w:] - cs[:-w]) / w                         # (slope_window, symbols)
+        ma_ok = (cnt[w:] - cnt[:-w]) == w
+        last_ma = np.where(ma_ok[-1], ma[-1], last_close)
+        above = last_close >= last_ma
+
+        # OLS slope over the defined MA values (min(12, #MA) of them, at least 5)
+        k = ma_ok.sum(axis=0)
+        x = np.arange(slope_window, dtype=np.float64)[:, None]
+        wts = ma_ok.astype(np.float64)
+        y = np.where(ma_ok, ma, 0.0)
+        k_safe = np.maximum(k, 1)
+        xm = (wts * x).sum(axis=0) / k_safe
+        ym = y.sum(axis=0) / k_safe
+        sxx = (wts * (x - xm) ** 2).sum(axis=0)
+        sxy = (wts * (x - xm) * (y - ym)).sum(axis=0)
+        ma_slope = np.where((k >= 5) & (sxx > 0), sxy / np.where(sxx > 0, sxx, 1.0), 0.0)
+
+        # Momentum over momentum_days bars
+        md = int(momentum_days)
+        if md >= 0 and c.shape[0] > md:
+            momentum = np.where(n > md, last_close / c[-1 - md] - 1.0, 0.0)
+        else:
+            momentum = np.zeros(n_cols)
+
+        # Drawdown from the recent high
+        recent = _tail(c, max(1, int(drawdown_days)))
+        peak = np.nanmax(np.where(np.isnan(recent), -np.inf, recent), axis=0)
+        dd = np.where(has_data & (peak > 0), (peak - last_close) / np.where(peak > 0, peak, 1.0), 0.0)
+
+        # Range spike: today's high-low vs the mean of the last `range_window` bars
+        rng = np.abs(_tail(h, range_window) - _tail(lo, range_window))
+        rows = np.minimum(n, range_window)
+        row_idx = np.arange(range_window)[:, None]
+        in_hist = row_idx >= (range_window - rows)[None, :]
+        rng_ok = in_hist & ~np.isnan(rng)
+        rng_cnt = rng_ok.sum(axis=0)
+        avg_rng = np.where(rng_cnt > 0, np.where(rng_ok, rng, 0.0).sum(axis=0) / np.maximum(rng_cnt, 1), np.nan)
+        today_rng = rng[-1]
+        vol_spike = (rows >= 10) & (avg_rng > 0) & ((today_rng / avg_rng) >= vol_spike_multiplier)
+
+    return PanelMeasures(
+        symbols=symbols,
+        has_data=has_data,
+        last_close=last_close,
+        above=above,
+        ma_slope=ma_slope,
+        momentum=momentum,
+        dd=dd,
+        vol_spike=vol_spike,
+    )
+
+
+def risk_levels(
+    above: np.ndarray,
+    ma_slope: np.ndarray,
+    momentum: np.ndarray,
+    dd: np.ndarray,
+    vol_spike: np.ndarray,
+    drawdown_warn_pct: float,
+    drawdown_critical_pct: float,
+    require_conditions_for_warn: int = 2,
+    vol_spike_is_info_only: bool = True,
+    momentum_warn_pct: float = -0.06,
+) -> np.ndarray:
+    # Array form of classify_signal's level decision (works for any matching shapes)
+    n_warn = (
+        ((~above) & (ma_slope < 0)).astype(np.int8)
+        + (dd >= drawdown_warn_pct)
+        + (momentum <= momentum_warn_pct)
+    )
+    if not vol_spike_is_info_only:
+        n_warn = n_warn + vol_spike
+    level = np.where(n_warn >= require_conditions_for_warn, LEVEL_WARN, LEVEL_OK)
+    return np.where(dd >= drawdown_critical_pct, LEVEL_CRITICAL, level).astype(np.int8)
+
+
+@timed("signals/compute_signals_panel")
+def compute_signals_panel(
+    close: pd.DataFrame,
+    high: pd.DataFrame,
+    low: pd.DataFrame,
+    trend_ma_days: int,
+    momentum_days: int,
+    drawdown_days: int,
+    drawdown_warn_pct: float,
+    drawdown_critical_pct: float,
+    vol_spike_multiplier: float,
+    require_conditions_for_warn: int = 2,
+    vol_spike_is_info_only: bool = True,
+    momentum_warn_pct: float = -0.06,
+) -> Dict[str, Optional[SignalResult]]:
+    """compute_signals for every column of an aligned (dates x symbols) panel at once.
+
+    Each column is treated as that symbol's own history (rows without a close are
+    skipped), so results match calling compute_signals per symbol up to float rounding
+    at exact threshold ties. Symbols without any data map to None.
+    """
+    m = panel_measures(
+        close, high, low,
+        trend_ma_days=trend_ma_days,
+        momentum_days=momentum_days,
+        drawdown_days=drawdown_days,
+        vol_spike_multiplier=vol_spike_multiplier,
+    )
+    out: Dict[str, Optional[SignalResult]] = {}
+    for i, sym in enumerate(m.symbols):
+        if not m.has_data[i]:
+            out[sym] = None
+            continue
+        out[sym] = classify_signal(
+            symbol=sym,
+            last_close=float(m.last_close[i]),
+            above=bool(m.above[i]),
+            ma_slope=float(m.ma_slope[i]),
+            momentum=float(m.momentum[i]),
+            dd=float(m.dd[i]),
+            vol_spike=bool(m.vol_spike[i]),
+            momentum_days=momentum_days,
+            drawdown_days=drawdown_days,
+            drawdown_warn_pct=drawdown_warn_pct,
+            drawdown_critical_pct=drawdown_critical_pct,
+            require_conditions_for_warn=require_conditions_for_warn,
+            vol_spike_is_info_only=vol_spike_is_info_only,
+            momentum_warn_pct=momentum_warn_pct,
+        )
+    return out
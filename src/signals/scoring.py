@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 import pandas as pd
 
 from src.signals.indicators import sma, daily_range, drawdown_from_recent_high, slope
+from src.utils.metrics import timed
 
 
 @dataclass
@@ -15,9 +16,25 @@ class SignalResult:
     reason: str
 
 
+def signal_params(th: Dict[str, Any]) -> Dict[str, Any]:
+    # compute_signals keyword arguments from a `thresholds:` settings block
+    return dict(
+        trend_ma_days=int(th["trend_ma_days"]),
+        momentum_days=int(th["momentum_days"]),
+        drawdown_days=int(th["drawdown_days"]),
+        drawdown_warn_pct=float(th["drawdown_warn_pct"]),
+        drawdown_critical_pct=float(th["drawdown_critical_pct"]),
+        vol_spike_multiplier=float(th["vol_spike_multiplier"]),
+        require_conditions_for_warn=int(th.get("require_conditions_for_warn", 2)),
+        vol_spike_is_info_only=bool(th.get("vol_spike_is_info_only", True)),
+        momentum_warn_pct=float(th.get("momentum_warn_pct", -0.06)),
+    )
+
+
+@timed("signals/compute_signals")
 def compute_signals(
     symbol: str,
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, Any],
     trend_ma_days: int,
     momentum_days: int,
     drawdown_days: int,
@@ -28,6 +45,9 @@ def compute_signals(
     vol_spike_is_info_only: bool = True,
     momentum_warn_pct: float = -0.06,
 ) -> Optional[SignalResult]:
+    # A frame with c/h/l columns, or a PriceHistory (its arrays are wrapped, not copied)
+    if df is not None and not isinstance(df, pd.DataFrame):
+        df = pd.DataFrame({"c": df.c, "h": df.h, "l": df.l}, copy=False)
     if df is None or df.empty:
         return None
 
@@ -52,9 +72,44 @@ def compute_signals(
         today_rng = float(rng.iloc[-1])
         vol_spike = avg_rng > 0 and (today_rng / avg_rng) >= vol_spike_multiplier
 
+    return classify_signal(
+        symbol=symbol,
+        last_close=last_close,
+        above=above,
+        ma_slope=ma_s,
+        momentum=momentum,
+        dd=dd,
+        vol_spike=vol_spike,
+        momentum_days=momentum_days,
+        drawdown_days=drawdown_days,
+        drawdown_warn_pct=drawdown_warn_pct,
+        drawdown_critical_pct=drawdown_critical_pct,
+        require_conditions_for_warn=require_conditions_for_warn,
+        vol_spike_is_info_only=vol_spike_is_info_only,
+        momentum_warn_pct=momentum_warn_pct,
+    )
+
+
+def classify_signal(
+    symbol: str,
+    last_close: float,
+    above: bool,
+    ma_slope: float,
+    momentum: float,
+    dd: float,
+    vol_spike: bool,
+    momentum_days: int,
+    drawdown_days: int,
+    drawdown_warn_pct: float,
+    drawdown_critical_pct: float,
+    require_conditions_for_warn: int = 2,
+    vol_spike_is_info_only: bool = True,
+    momentum_warn_pct: float = -0.06,
+) -> SignalResult:
+    # The WARN/CRITICAL rules, shared by the per-symbol and panel engines
     # Conditions
     conds = []
-    if (not above) and (ma_s < 0):
+    if (not above) and (ma_slope < 0):
         conds.append("trend_break")
     if dd >= drawdown_warn_pct:
         conds.append("drawdown")
@@ -92,6 +147,3 @@ def compute_signals(
         reasons.append("Volatility spike (info)")
     reason = "; ".join(reasons) if reasons else "No major risk flags from the configured rules"
     return SignalResult(symbol=symbol, last_close=last_close, risk_level="OK", reason=reason)
-
-    reason = "; ".join(reasons) if reasons else "No major risk flags from the configured rules"
-    return SignalResult(symbol=symbol, last_close=last_close, risk_level=risk, reason=reason)
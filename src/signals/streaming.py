@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+import json
+import math
+import os
+
+from src.signals.scoring import SignalResult, classify_signal
+
+# Incremental counterparts of src/signals/indicators.py. Each object takes one bar at a
+# time in O(1) (amortized), round-trips through to_dict()/from_dict() so state can be
+# carried between runs, and reports the same value the batch function would return for
+# the series seen so far. Running sums are rebuilt from the window every `window`
+# updates so float drift can't accumulate over long streams.
+
+
+class RollingSMA:
+    """sma(series, window).iloc[-1]"""
+
+    def __init__(self, window: int):
+        self.window = int(window)
+        self.values: Deque[float] = deque()
+        self.total = 0.0
+        self._since_resync = 0
+
+    def update(self, x: float) -> Optional[float]:
+        self.values.append(float(x))
+        self.total += float(x)
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self.total = math.fsum(self.values)
+            self._since_resync = 0
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        # None while the window is still filling (the batch version returns NaN)
+        if len(self.values) < self.window:
+            return None
+        return self.total / self.window
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"window": self.window, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RollingSMA":
+        obj = cls(d["window"])
+        obj.values = deque(float(v) for v in d["values"])
+        obj.total = math.fsum(obj.values)
+        return obj
+
+
+class RollingMax:
+    """Max of the last `window` values via a monotonic deque of (bar index, value)."""
+
+    def __init__(self, window: int):
+        self.window = int(window)
+        self.n = 0
+        self.candidates: Deque[Tuple[int, float]] = deque()
+        self.last: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        while self.candidates and self.candidates[-1][1] <= x:
+            self.candidates.pop()
+        self.candidates.append((self.n, x))
+        while self.candidates[0][0] <= self.n - self.window:
+            self.candidates.popleft()
+        self.n += 1
+        self.last = x
+        return self.candidates[0][1]
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.candidates[0][1] if self.candidates else None
+
+    def drawdown(self) -> float:
+        # drawdown_from_recent_high(close, window)
+        peak = self.value
+        if peak is None or self.last is None or peak <= 0:
+            return 0.0
+        return (peak - self.last) / peak
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"window": self.window, "n": self.n, "candidates": [list(c) for c in self.candidates], "last": self.last}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RollingMax":
+        obj = cls(d["window"])
+        obj.n = int(d["n"])
+        obj.candidates = deque((int(i), float(v)) for i, v in d["candidates"])
+        obj.last = d.get("last")
+        return obj
+
+
+class RollingSlope:
+    """OLS slope of the last `window` values with x = 0..k-1, from running sums."""
+
+    def __init__(self, window: int):
+        self.window = int(window)
+        self.values: Deque[float] = deque()
+        self.sy = 0.0
+        self.sxy = 0.0
+        self._since_resync = 0
+
+    def _resync(self) -> None:
+        self.sy = math.fsum(self.values)
+        self.sxy = math.fsum(i * y for i, y in enumerate(self.values))
+        self._since_resync = 0
+
+    def update(self, y: float) -> None:
+        y = float(y)
+        k = len(self.values)
+        if k < self.window:
+            self.sxy += k * y
+            self.sy += y
+            self.values.append(y)
+        else:
+            # Drop y0, every remaining x shifts down by one, new value lands at x = k - 1
+            y0 = self.values.popleft()
+            self.sxy = self.sxy - (self.sy - y0) + (k - 1) * y
+            self.sy = self.sy - y0 + y
+            self.values.append(y)
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+
+    def value(self, min_points: Optional[int] = None) -> float:
+        # Default matches slope(series, window): 0.0 until max(5, window // 2) points exist
+        k = len(self.values)
+        need = max(5, self.window // 2) if min_points is None else min_points
+        if k < need or k < 2:
+            return 0.0
+        sx = k * (k - 1) / 2.0
+        sxx = (k - 1) * k * (2 * k - 1) / 6.0
+        den = k * sxx - sx * sx
+        return (k * self.sxy - sx * self.sy) / den
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"window": self.window, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RollingSlope":
+        obj = cls(d["window"])
+        obj.values = deque(float(v) for v in d["values"])
+        obj._resync()
+        return obj
+
+
+class RollingMean:
+    """Mean of the last `window` values, defined on a partial window and skipping NaNs
+    (what pandas' .tail(window).mean() gives)."""
+
+    def __init__(self, window: int):
+        self.window = int(window)
+        self.values: Deque[float] = deque()
+        self.total = 0.0
+        self.count = 0   # non-NaN values in the window
+        self._since_resync = 0
+
+    def update(self, x: float) -> None:
+        x = float(x)
+        self.values.append(x)
+        if not math.isnan(x):
+            self.total += x
+            self.count += 1
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if not math.isnan(old):
+                self.total -= old
+                self.count -= 1
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self.total = math.fsum(v for v in self.values if not math.isnan(v))
+            self._since_resync = 0
+
+    @property
+    def value(self) -> float:
+        return self.total / self.count if self.count else float("nan")
+
+    @property
+    def last(self) -> float:
+        return self.values[-1] if self.values else float("nan")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"window": self.window, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RollingMean":
+        obj = cls(d["window"])
+        for v in d["values"]:
+            obj.update(v)
+        return obj
+
+
+class SignalState:
+    """All rolling state compute_signals needs for one symbol, updated one bar at a time.
+
+    signal() returns what compute_signals would return for the full series fed so far.
+    Bars at or before the last seen day are ignored, so replaying an overlapping window
+    after a restart is safe.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        trend_ma_days: int,
+        momentum_days: int,
+        drawdown_days: int,
+        slope_window: int = 12,
+        range_window: int = 20,
+    ):
+        self.symbol = symbol
+        self.trend_ma_days = int(trend_ma_days)
+        self.momentum_days = int(momentum_days)
+        self.drawdown_days = int(drawdown_days)
+        self.slope_window = int(slope_window)
+        self.range_window = int(range_window)
+        self.ma = RollingSMA(trend_ma_days)
+        self.ma_slope = RollingSlope(slope_window)
+        self.peak = RollingMax(drawdown_days)
+        self.rng = RollingMean(range_window)
+        self.closes: Deque[float] = deque(maxlen=self.momentum_days + 1)
+        self.bars = 0
+        self.last_day: Optional[int] = None  # epoch day of the last bar applied
+
+    def update(self, day: int, high: float, low: float, close: float) -> bool:
+        if self.last_day is not None and day <= self.last_day:
+            return False
+        ma = self.ma.update(close)
+        if ma is not None:
+            self.ma_slope.update(ma)
+        self.peak.update(close)
+        self.rng.update(abs(float(high) - float(low)))
+        self.closes.append(float(close))
+        self.bars += 1
+        self.last_day = int(day)
+        return True
+
+    def update_many(self, bars: Iterable[Tuple[int, float, float, float]]) -> int:
+        return sum(1 for day, h, l, c in bars if self.update(day, h, l, c))
+
+    def signal(
+        self,
+        drawdown_warn_pct: float,
+        drawdown_critical_pct: float,
+        vol_spike_multiplier: float,
+        require_conditions_for_warn: int = 2,
+        vol_spike_is_info_only: bool = True,
+        momentum_warn_pct: float = -0.06,
+    ) -> Optional[SignalResult]:
+        if not self.bars:
+            return None
+        last_close = self.closes[-1]
+        last_ma = self.ma.value if self.ma.value is not None else last_close
+        momentum = 0.0
+        if self.bars > self.momentum_days:
+            momentum = last_close / self.closes[0] - 1.0
+
+        vol_spike = False
+        if min(self.bars, self.rng.window) >= 10:
+            avg_rng = self.rng.value
+            vol_spike = avg_rng > 0 and (self.rng.last / avg_rng) >= vol_spike_multiplier
+
+        return classify_signal(
+            symbol=self.symbol,
+            last_close=last_close,
+            above=last_close >= last_ma,
+            # compute_signals fits over min(12, #MA values), which only needs 5 points
+            ma_slope=self.ma_slope.value(min_points=5),
+            momentum=momentum,
+            dd=self.peak.drawdown(),
+            vol_spike=vol_spike,
+            momentum_days=self.momentum_days,
+            drawdown_days=self.drawdown_days,
+            drawdown_warn_pct=drawdown_warn_pct,
+            drawdown_critical_pct=drawdown_critical_pct,
+            require_conditions_for_warn=require_conditions_for_warn,
+            vol_spike_is_info_only=vol_spike_is_info_only,
+            momentum_warn_pct=momentum_warn_pct,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "trend_ma_days": self.trend_ma_days,
+            "momentum_days": self.momentum_days,
+            "drawdown_days": self.drawdown_days,
+            "slope_window": self.slope_window,
+            "range_window": self.range_window,
+            "ma": self.ma.to_dict(),
+            "ma_slope": self.ma_slope.to_dict(),
+            "peak": self.peak.to_dict(),
+            "rng": self.rng.to_dict(),
+            "closes": list(self.closes),
+            "bars": self.bars,
+            "last_day": self.last_day,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "SignalState":
+        # States saved before the windows were stored carry them in the rolling objects
+        obj = cls(
+            d["symbol"], d["trend_ma_days"], d["momentum_days"], d["drawdown_days"],
+            slope_window=d.get("slope_window", d["ma_slope"]["window"]),
+            range_window=d.get("range_window", d["rng"]["window"]),
+        )
+        obj.ma = RollingSMA.from_dict(d["ma"])
+        obj.ma_slope = RollingSlope.from_dict(d["ma_slope"])
+        obj.peak = RollingMax.from_dict(d["peak"])
+        obj.rng = RollingMean.from_dict(d["rng"])
+        obj.closes = deque((float(x) for x in d["closes"]), maxlen=obj.momentum_days + 1)
+        obj.bars = int(d["bars"])
+        obj.last_day = d.get("last_day")
+        return obj
+
+
+def save_states(path: str, states: Dict[str, SignalState]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({sym: st.to_dict() for sym, st in states.items()}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_states(path: str) -> Dict[str, SignalState]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return {sym: SignalState.from_dict(d) for sym, d in raw.items()}
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+import json
+import math
+import os
+import zlib
+
+
+def shard_of(symbol: str, n_shards: int) -> int:
+    # crc32 rather than hash(): must be stable across processes and Python versions
+    return zlib.crc32(symbol.upper().encode("utf-8")) % max(1, n_shards)
+
+
+def shard_count(universe_size: int, per_run: int) -> int:
+    return max(1, math.ceil(universe_size / max(1, per_run)))
+
+
+@dataclass
+class RotationPlan:
+    day: date
+    shard: int
+    n_shards: int
+    symbols: List[str]   # today's shard, in universe order
+
+
+def plan_rotation(universe: List[str], per_run: int, day: date, n_shards: Optional[int] = None) -> RotationPlan:
+    """Pick today's slice of the universe: symbol -> fixed shard, day -> shard.
+
+    Every symbol is screened once every `n_shards` days (default: enough shards to keep
+    each run near `per_run` symbols).
+    """
+    n = n_shards or shard_count(len(universe), per_run)
+    shard = day.toordinal() % n
+    return RotationPlan(
+        day=day,
+        shard=shard,
+        n_shards=n,
+        symbols=[s for s in universe if shard_of(s, n) == shard],
+    )
+
+
+class ScreenerResultStore:
+    """Per-symbol screener outcomes with the day they were produced (one JSON file).
+
+    Every symbol screened is recorded, candidate or not, so a re-screen that no longer
+    qualifies drops the symbol's earlier candidate row.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = (json.load(f) or {}).get("symbols", {}) or {}
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def record(self, screened: Iterable[str], candidates: List[Dict[str, str]], day: date) -> None:
+        by_sym = {c["symbol"]: c for c in candidates}
+        stamp = day.isoformat()
+        for sym in screened:
+            self.entries[sym] = {"screened_at": stamp, "candidate": by_sym.get(sym)}
+
+    def recent_candidates(self, day: date, max_age_days: int, universe: Optional[Iterable[str]] = None) -> List[Dict[str, str]]:
+        # Candidates no older than max_age_days, annotated with their age when not from today
+        allowed = set(universe) if universe is not None else None
+        out: List[Dict[str, str]] = []
+        for sym, e in self.entries.items():
+            cand = e.get("candidate")
+            if not cand or (allowed is not None and sym not in allowed):
+                continue
+            try:
+                age = (day - date.fromisoformat(e["screened_at"])).days
+            except (KeyError, ValueError):
+                continue
+            if age < 0 or age > max_age_days:
+                continue
+            row = dict(cand)
+            if age > 0:
+                row["reason"] = f"{row.get('reason', '')} | screened {age}d ago".lstrip(" |")
+            out.append(row)
+        return out
+
+    def prune(self, day: date, max_age_days: int) -> None:
+        keep: Dict[str, Dict[str, Any]] = {}
+        for sym, e in self.entries.items():
+            try:
+                if (day - date.fromisoformat(e["screened_at"])).days <= max_age_days:
+                    keep[sym] = e
+            except (KeyError, ValueError):
+                continue
+        self.entries = keep
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"symbols": self.entries}, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp, self.path)
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Any, List, Dict, Optional, Tuple
 import re
+import time
 
-from src.data.market import fetch_daily_history
-from src.data.fundamentals import fetch_fundamentals
-from src.data.news import fetch_cnbc_mentions, fetch_web_buzz
+import numpy as np
+
+from src.data.fundamentals_store import FundamentalsStore
 from src.data.finnhub_client import FinnhubClient
+from src.data.price_store import PriceStore
+from src.data.fetch_pool import FetchPool, result_or
+from src.data.run_context import RunContext
+from src.utils.metrics import metrics
 
 
 INNOVATION_KEYWORDS = [
@@ -63,45 +68,173 @@ def _fund_score(f: Optional[object]) -> Tuple[int, str]:
     return s, ", ".join(reasons) if reasons else "Limited fundamentals"
 
 
+@dataclass
+class StageReport:
+    name: str
+    n_in: int
+    n_out: int
+    seconds: float
+
+    def summary(self) -> str:
+        return f"{self.name}: {self.n_in} -> {self.n_out} in {self.seconds:.2f}s"
+
+
+@dataclass
+class FunnelResult:
+    candidates: List[Dict[str, str]]
+    stages: List[StageReport] = field(default_factory=list)
+    scored: List[Dict[str, str]] = field(default_factory=list)  # every enriched row passing the score cut
+
+
+@dataclass
+class _Survivor:
+    symbol: str
+    price: float
+    mom: float
+    dollar_vol: float
+    cheap_score: float = 0.0
+
+
 def build_sub5_candidates(
     client: FinnhubClient,
     symbols: List[str],
     max_out: int = 10,
+    store: Optional[PriceStore] = None,
+    pool: Optional[FetchPool] = None,
+    finnhub_concurrency: int = 32,
+    enrich_top_k: int = 40,
+    news_options: Optional[Dict[str, Any]] = None,
+    fundamentals_store: Optional[FundamentalsStore] = None,
+    context: Optional[RunContext] = None,
 ) -> List[Dict[str, str]]:
-    candidates: List[Dict[str, str]] = []
+    return run_sub5_funnel(
+        client, symbols, max_out=max_out, store=store, pool=pool,
+        finnhub_concurrency=finnhub_concurrency, enrich_top_k=enrich_top_k, news_options=news_options,
+        fundamentals_store=fundamentals_store, context=context,
+    ).candidates
+
+
+def run_sub5_funnel(
+    client: FinnhubClient,
+    symbols: List[str],
+    max_out: int = 10,
+    store: Optional[PriceStore] = None,
+    pool: Optional[FetchPool] = None,
+    finnhub_concurrency: int = 32,
+    enrich_top_k: int = 40,
+    news_options: Optional[Dict[str, Any]] = None,
+    fundamentals_store: Optional[FundamentalsStore] = None,
+    context: Optional[RunContext] = None,
+) -> FunnelResult:
+    """Staged screener: cheap filters over the whole universe, expensive enrichment last.
+
+    1. prefilter  - price history only: sub-$5, enough bars, average volume
+    2. cheap rank - momentum + dollar-volume ranks; only the top `enrich_top_k` go on
+    3. enrich     - fundamentals (2 Finnhub calls) + 2 news feeds per survivor, score cut
+    4. rank       - final ordering, top `max_out`
+
+    Finnhub/RSS cost is bounded by enrich_top_k, whatever the size of the universe.
+    `news_options` are passed on to fetch_news_batch (workers, timeouts); with a
+    `fundamentals_store`, cached Finnhub payloads are used instead of fresh calls.
 
-    for sym in symbols:
-        # Fetch last ~30 days price from your existing source
-        hist = fetch_daily_history(client, sym, lookback_days=45)
-        if not hist or hist.df is None or hist.df.empty:
+    Pass the run's `context` to share its memoized data (the other data arguments are
+    then ignored); otherwise the funnel builds its own.
+    """
+    own_pool = context is None and pool is None
+    if context is None:
+        context = RunContext(
+            client,
+            pool or FetchPool(),
+            price_store=store,
+            fundamentals_store=fundamentals_store,
+            finnhub_concurrency=finnhub_concurrency,
+            news_options=news_options,
+        )
+    pool = context.pool
+    try:
+        stages: List[StageReport] = []
+        survivors = _timed_stage(stages, "prefilter", len(symbols), lambda: _prefilter(context, symbols))
+        shortlist = _timed_stage(stages, "cheap_rank", len(survivors), lambda: _cheap_rank(survivors, enrich_top_k))
+        enriched = _timed_stage(stages, "enrich", len(shortlist), lambda: _enrich(context, shortlist))
+        ranked = _timed_stage(stages, "rank", len(enriched), lambda: rank_candidates(enriched, max_out))
+        return FunnelResult(candidates=ranked, stages=stages, scored=enriched)
+    finally:
+        if own_pool:
+            pool.close()
+
+
+def _timed_stage(stages: List[StageReport], name: str, n_in: int, fn):
+    t0 = time.perf_counter()
+    out = fn()
+    stages.append(StageReport(name=name, n_in=n_in, n_out=len(out), seconds=time.perf_counter() - t0))
+    metrics.stage(f"sub5.{name}", stages[-1].seconds)
+    return out
+
+
+def _prefilter(context: RunContext, symbols: List[str]) -> List[_Survivor]:
+    # Fetch last ~30 days price from your existing source (all symbols in flight at once)
+    histories = context.histories(symbols, 45)
+
+    survivors: List[_Survivor] = []
+    for sym, hist in zip(symbols, histories):
+        if not hist:
             continue
 
-        close = hist.df["c"]
-        price = float(close.iloc[-1])
+        close = hist.c
+        price = float(close[-1])
         if price >= 5.0:
             continue
 
         # Momentum proxy (30 trading days-ish)
         if len(close) < 25:
             continue
-        mom = (price / float(close.iloc[-25]) - 1.0)
-
-        # Light liquidity proxy: need volume column? If you have volume in df, use it; otherwise skip.
-        # If df has 'v', prefer it:
-        vol_ok = True
-        if "v" in hist.df.columns:
-            avg_vol = float(hist.df["v"].tail(20).mean())
-            vol_ok = avg_vol >= 300_000  # tunable
-        if not vol_ok:
+        mom = (price / float(close[-25]) - 1.0)
+
+        # Light liquidity proxy: mean of the last 20 reported volumes
+        vol = hist.v[-20:]
+        vol = vol[~np.isnan(vol)]
+        avg_vol = float(vol.mean()) if len(vol) else 0.0
+        if avg_vol < 300_000:  # tunable
             continue
 
+        survivors.append(_Survivor(symbol=sym, price=price, mom=mom, dollar_vol=avg_vol * price))
+    return survivors
+
+
+def _cheap_rank(survivors: List[_Survivor], top_k: int) -> List[_Survivor]:
+    # Average of the momentum and dollar-volume percentile ranks: favours names that are
+    # moving and liquid enough to get covered. Ties keep universe order (stable sort).
+    n = len(survivors)
+    if n == 0:
+        return []
+    by_mom = sorted(range(n), key=lambda i: survivors[i].mom)
+    by_liq = sorted(range(n), key=lambda i: survivors[i].dollar_vol)
+    for rank, i in enumerate(by_mom):
+        survivors[i].cheap_score += rank / max(1, n - 1) / 2
+    for rank, i in enumerate(by_liq):
+        survivors[i].cheap_score += rank / max(1, n - 1) / 2
+    ordered = sorted(survivors, key=lambda x: x.cheap_score, reverse=True)
+    return ordered[: max(0, int(top_k))]
+
+
+def _enrich(context: RunContext, shortlist: List[_Survivor]) -> List[Dict[str, str]]:
+    candidates: List[Dict[str, str]] = []
+    syms = [x.symbol for x in shortlist]
+
+    # Fundamentals (one event loop for all symbols) run while the news batch downloads
+    funds_fut = context.pool.submit("finnhub", context.fundamentals, syms)
+    news = context.news(syms, 5)
+
+    funds = result_or(funds_fut) or [None] * len(shortlist)
+
+    for i, x in enumerate(shortlist):
         # Fundamentals score
-        f = fetch_fundamentals(client, sym)
+        f = funds[i]
         fund_s, fund_reason = _fund_score(f)
 
         # News score
-        cnbc = fetch_cnbc_mentions(sym, max_items=5)
-        buzz = fetch_web_buzz(sym, max_items=5)
+        cnbc = news[x.symbol]["cnbc"]
+        buzz = news[x.symbol]["buzz"]
         headlines = [h.title for h in (cnbc + buzz)]
         news_s = min(5, len(headlines))  # activity
         kw_s = _kw_score(headlines)
@@ -114,8 +247,8 @@ def build_sub5_candidates(
             continue
 
         reason_parts = []
-        if mom > 0:
-            reason_parts.append(f"{mom*100:.1f}% ~1M momentum")
+        if x.mom > 0:
+            reason_parts.append(f"{x.mom*100:.1f}% ~1M momentum")
         if fund_reason:
             reason_parts.append(fund_reason)
         if len(cnbc) > 0:
@@ -126,12 +259,15 @@ def build_sub5_candidates(
             reason_parts.append(f"Innovation keywords:{kw_s}")
 
         candidates.append({
-            "symbol": sym,
-            "price": f"{price:.2f}",
+            "symbol": x.symbol,
+            "price": f"{x.price:.2f}",
             "score": str(total),
             "reason": " | ".join(reason_parts),
         })
+    return candidates
+
 
+def rank_candidates(candidates: List[Dict[str, str]], max_out: int) -> List[Dict[str, str]]:
     # sort by score desc, then lowest price (optional)
-    candidates.sort(key=lambda x: (int(x["score"]), -float(x["price"])), reverse=True)
-    return candidates[:max_out]
+    ordered = sorted(candidates, key=lambda x: (int(x["score"]), -float(x["price"])), reverse=True)
+    return ordered[:max_out]
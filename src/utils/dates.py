@@ -1,7 +1,24 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import Optional
 import pytz
 
 def now_in_tz(tz_name: str) -> datetime:
     tz = pytz.timezone(tz_name)
     return datetime.now(tz)
+
+def last_completed_session(
+    tz_name: str = "America/New_York",
+    ready_hour: int = 18,
+    now: Optional[datetime] = None,
+) -> date:
+    # Most recent weekday whose daily bar should already be published.
+    # Before `ready_hour` (exchange time) today's bar isn't final yet, so we step back a day.
+    # Exchange holidays are not modelled; callers treat "no new bar" as a valid answer.
+    local = now.astimezone(pytz.timezone(tz_name)) if now is not None else now_in_tz(tz_name)
+    d = local.date()
+    if local.hour < ready_hour:
+        d -= timedelta(days=1)
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d
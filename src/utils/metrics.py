@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+T = TypeVar("T")
+
+# Error messages kept per endpoint (the counts are always complete)
+MAX_ERROR_SAMPLES = 5
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    # Nearest-rank percentile; None for no samples
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(q / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+class RunMetrics:
+    """Counters and timings for one digest run (thread-safe, process-wide via `metrics`).
+
+    - endpoints: call count, error count and latency samples per named call site
+    - stages: wall time and status per pipeline / screener stage
+    - caches: hits and misses per cache
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self._latencies: Dict[str, List[float]] = {}
+            self._errors: Dict[str, int] = {}
+            self._error_samples: Dict[str, List[str]] = {}
+            self._stages: Dict[str, Dict[str, Any]] = {}
+            self._caches: Dict[str, Dict[str, int]] = {}
+
+    def observe(self, endpoint: str, seconds: float, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._latencies.setdefault(endpoint, []).append(seconds)
+        if error is not None:
+            self.error(endpoint, error)
+
+    def error(self, endpoint: str, error: BaseException) -> None:
+        # Also used where callers swallow exceptions and fall back to a default
+        with self._lock:
+            self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+            samples = self._error_samples.setdefault(endpoint, [])
+            if len(samples) < MAX_ERROR_SAMPLES:
+                samples.append(f"{type(error).__name__}: {error}"[:200])
+
+    @contextmanager
+    def timed(self, endpoint: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.observe(endpoint, time.perf_counter() - t0, e)
+            raise
+        self.observe(endpoint, time.perf_counter() - t0)
+
+    def stage(self, name: str, seconds: float, status: str = "ok") -> None:
+        with self._lock:
+            self._stages[name] = {"seconds": round(seconds, 4), "status": status}
+
+    def cache(self, name: str, hit: bool) -> None:
+        with self._lock:
+            c = self._caches.setdefault(name, {"hits": 0, "misses": 0})
+            c["hits" if hit else "misses"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {}
+            for name in sorted(set(self._latencies) | set(self._errors)):
+                lat = self._latencies.get(name, [])
+                p50, p95 = percentile(lat, 50), percentile(lat, 95)
+                endpoints[name] = {
+                    "calls": len(lat),
+                    "errors": self._errors.get(name, 0),
+                    "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "total_s": round(sum(lat), 3),
+                    "error_samples": list(self._error_samples.get(name, [])),
+                }
+            caches = {}
+            for name, c in sorted(self._caches.items()):
+                total = c["hits"] + c["misses"]
+                caches[name] = dict(c, hit_rate=round(c["hits"] / total, 3) if total else None)
+            return {
+                "started_at": self.started,
+                "elapsed_s": round(time.time() - self.started, 3),
+                "stages": dict(self._stages),
+                "endpoints": endpoints,
+                "caches": caches,
+            }
+
+    def write_json(self, path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        report = self.snapshot()
+        report.update(extra or {})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, sort_keys=True, default=str)
+        os.replace(tmp, path)
+
+    def footer(self) -> str:
+        # One compact line for the bottom of the email
+        snap = self.snapshot()
+        groups: Dict[str, Dict[str, Any]] = {}
+        for name, e in snap["endpoints"].items():
+            g = groups.setdefault(name.split("/", 1)[0], {"calls": 0, "errors": 0, "p95": 0.0})
+            g["calls"] += e["calls"]
+            g["errors"] += e["errors"]
+            g["p95"] = max(g["p95"], e["p95_ms"] or 0.0)
+        parts = [f"run {snap['elapsed_s']:.0f}s"]
+        for name, g in groups.items():
+            if g["calls"] or g["errors"]:
+                parts.append(f"{name} {g['calls']} calls/{g['errors']} err/p95 {g['p95']:.0f}ms")
+        for name, c in snap["caches"].items():
+            if c["hit_rate"] is not None:
+                parts.append(f"{name} cache {c['hit_rate'] * 100:.0f}%")
+        return " · ".join(parts)
+
+
+metrics = RunMetrics()
+
+
+def timed(endpoint: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator form of metrics.timed()."""
+    def wrap(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def inner(*args: Any, **kwargs: Any) -> T:
+            with metrics.timed(endpoint):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
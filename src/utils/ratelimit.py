@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import Optional
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    `reserve()` never blocks: it books a slot and returns how long the caller must wait
+    before using it, so the same bucket can pace both threads (time.sleep) and
+    coroutines (asyncio.sleep).
+    """
+
+    def __init__(self, calls_per_minute: float, burst: Optional[int] = None):
+        self.rate = max(float(calls_per_minute), 1e-9) / 60.0  # tokens per second
+        self.capacity = float(burst if burst is not None else max(1, int(calls_per_minute // 6)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def block_for(self, seconds: float) -> None:
+        # Server told us to back off (429): hold every caller sharing this bucket.
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + max(0.0, seconds))